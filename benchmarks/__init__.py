@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""Performance benchmarks for coop_evolve, run from the project root."""
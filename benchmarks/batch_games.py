@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares the time to play a generation's games one at a time against playing
+every game in the grid together with BatchGames, for random initial sequences
+and for a grid where every agent has the same sequence. Compiling strategies
+costs both the same and isn't timed.
+
+Run from the project root with `python -m benchmarks.batch_games`.
+"""
+
+import time
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.interaction import InteractionCache
+from coop_evolve.population import Population
+from coop_evolve.random_stream import RandomStream
+
+GRID = (20, 20, 100)
+SEQUENCES = [None, "abcd:a/*:b/"]
+
+
+def measure(storage, sequence, batched):
+    """
+    Returns the seconds taken to play the games, with the strategies already
+    compiled by a first round of games but an empty game cache.
+    """
+    population = storage(*GRID, sequence = sequence, rng = RandomStream(1))
+    population.play_game(batched = batched)
+    population.reset()
+    InteractionCache._shared = None
+    start = time.perf_counter()
+    population.play_game(batched = batched)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'storage':>16} {'sequence':>12} {'scalar (s)':>11} {'batched (s)':>12} {'speedup':>8}")
+    for storage in [Population, ArrayPopulation]:
+        for sequence in SEQUENCES:
+            scalar = measure(storage, sequence, False)
+            batched = measure(storage, sequence, True)
+            print(f"{storage.__name__:>16} {str(sequence):>12} {scalar:>11.2f} "
+                  f"{batched:>12.2f} {scalar/batched:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Times taking a census of an evolving population from the counts it keeps up
+to date against recounting every agent, and checks the two agree.
+
+Run from the project root with `python -m benchmarks.census`.
+"""
+
+import timeit
+
+from coop_evolve.population import Population
+from coop_evolve.random_stream import RandomStream
+
+WIDTH = 10
+LENGTH = 10
+SUBPOP_SIZE = 50
+GENERATIONS = 10
+REPEATS = 5
+
+
+def main():
+    population = Population(WIDTH, LENGTH, SUBPOP_SIZE, rng = RandomStream(1))
+    
+    print(f"{'generation':>10} {'sequences':>10} {'census ms':>10} {'recount ms':>11} "
+          f"{'phenotypes ms':>14} {'recount ms':>11} {'agree':>6}")
+    for generation in range(1, GENERATIONS + 1):
+        population.generation()
+        if generation % 2 == 0:
+            times = [
+                min(timeit.repeat(count, number = 1, repeat = REPEATS)) * 1000
+                for count in [population.census, population.recount,
+                              lambda: population.census(phenotypes = True),
+                              lambda: population.recount(phenotypes = True)]
+            ]
+            agree = population.census() == population.recount()
+            print(f"{generation:>10} {len(population.census()['pop_data']):>10} "
+                  f"{times[0]:>10.2f} {times[1]:>11.2f} {times[2]:>14.2f} {times[3]:>11.2f} "
+                  f"{str(agree):>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares culling agents one at a time with drawing every subpopulation's
+survivors at once, after reproduction at increasing fecundity.
+
+Run from the project root with `python -m benchmarks.cull`.
+"""
+
+import time
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.population import Population
+from coop_evolve.random_stream import RandomStream
+
+WIDTH = 20
+LENGTH = 20
+SUBPOP_SIZE = 100
+FECUNDITIES = [1, 5, 20]
+SEQUENCE = "abcd:a/*:b/"
+
+
+def time_cull(storage, fecundity, batched):
+    population = storage(WIDTH, LENGTH, SUBPOP_SIZE, sequence = SEQUENCE, rng = RandomStream(1))
+    population.reproduce(fecundity)
+    start = time.perf_counter()
+    population.cull(batched = batched)
+    elapsed = time.perf_counter() - start
+    assert population.popsize() == WIDTH * LENGTH * SUBPOP_SIZE
+    return elapsed
+
+
+def main():
+    print(f"{'storage':>16} {'fecundity':>10} {'one at a time (s)':>18} {'batched (s)':>12} {'speedup':>8}")
+    for storage in [Population, ArrayPopulation]:
+        for fecundity in FECUNDITIES:
+            sequential = time_cull(storage, fecundity, False)
+            batched = time_cull(storage, fecundity, True)
+            print(f"{storage.__name__:>16} {fecundity:>10} {sequential:>18.3f} "
+                  f"{batched:>12.3f} {sequential/batched:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares the time per generation of an ArrayPopulation whose subpopulations
+take very different times to play, a quarter of them with genomes eight times
+as long, run in one process and with its subpopulation phases scheduled on
+worker processes, and shows how busy the workers were in each phase and how
+many tasks they stole. The speedup is bounded by the number of cores.
+
+Run from the project root with `python -m benchmarks.deme_scheduler`.
+"""
+
+import os
+import time
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.deme_scheduler import DemeScheduler
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.random_stream import RandomStream
+
+GRID = (16, 16, 20)
+WORKERS = [1, 2, 4, 8]
+GENERATIONS = 3
+
+
+def population(scheduler = None):
+    """ Returns the grid with long genomes in every fourth subpopulation. """
+    population = ArrayPopulation(*GRID, streams = DemeStreams(1), scheduler = scheduler)
+    rng = RandomStream(2)
+    for i in range(GRID[0]):
+        for j in range(0, GRID[1], 4):
+            for agent in population[i][j]:
+                agent.sequence = ''.join(Chromosome(rng = rng).sequence for _ in range(8))
+    return population
+
+
+def measure(population):
+    """ Returns the mean seconds per generation after a first, untimed, one. """
+    population.generation()
+    start = time.perf_counter()
+    for _ in range(GENERATIONS):
+        population.generation()
+    return (time.perf_counter() - start)/GENERATIONS
+
+
+def main():
+    print(f"{os.cpu_count()} cores")
+    serial = measure(population())
+    print(f"{'workers':>8} {'time (s)':>9} {'speedup':>8} "
+          + ' '.join(f"{phase + ' use':>9} {'steals':>7}" for phase in DemeScheduler.phases))
+    print(f"{'serial':>8} {serial:>9.2f} {1:>8.1f}")
+    for workers in WORKERS:
+        with DemeScheduler(workers) as scheduler:
+            seconds = measure(population(scheduler))
+            stats = scheduler.stats
+            print(f"{workers:>8} {seconds:>9.2f} {serial/seconds:>8.1f} " + ' '.join(
+                f"{stats[phase]['utilization']:>9.0%} {int(stats[phase]['steals'].sum()):>7}"
+                for phase in DemeScheduler.phases))
+
+
+if __name__ == '__main__':
+    main()
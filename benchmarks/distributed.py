@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares the size of the migrant messages nodes send each other with
+MigrantCodec against pickling the same migrants, and the time per generation
+of tiles run by node processes over TCP against tiles run by worker processes
+on one host.
+
+Migrants sharing a sequence in a generation's message go as numbers, which
+pays off as agents come to share sequences. With the development settings'
+mutation rate nearly every migrant's sequence is distinct, so the saving
+shown is mostly from packing sequences at 4 bits a character.
+
+Run from the project root with `python -m benchmarks.distributed`.
+"""
+
+import pickle
+import time
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.distributed import GridCoordinator
+from coop_evolve.distributed import MigrantCodec
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.tiled_population import TiledPopulation
+
+GRID = (40, 40, 20)
+TILES = (2, 2)
+GENERATIONS = 3
+
+
+def message_sizes():
+    """ Prints the bytes each generation's migrants take, pickled and encoded. """
+    population = ArrayPopulation(*GRID, streams = DemeStreams(1))
+    codec = MigrantCodec(population.config.nucleotides)
+    print(f"{'generation':>10} {'migrants':>9} {'pickled (B)':>12} {'encoded (B)':>12}")
+    for generation in range(GENERATIONS):
+        population.reset()
+        population.play_game(1)
+        population.mutate()
+        population.reproduce(1, True)
+        migrants = population.emigrate(survival = 0.1, distance = 1, origin = (0, 0),
+                                       grid = (GRID[0], GRID[1]))
+        population.immigrate(migrants, (0, 0), (GRID[0], GRID[1]))
+        population.cull()
+        population.mate()
+        print(f"{generation:>10} {len(migrants):>9} {len(pickle.dumps(migrants)):>12} "
+              f"{len(codec.encode(migrants)):>12}")
+
+
+def measure(population):
+    """ Returns the mean seconds per generation after a first, untimed, one. """
+    population.generation()
+    start = time.perf_counter()
+    for _ in range(GENERATIONS):
+        population.generation()
+    return (time.perf_counter() - start)/GENERATIONS
+
+
+def main():
+    message_sizes()
+    print(f"\n{'runner':>8} {'time (s)':>9}")
+    for name, runner in [('workers', TiledPopulation), ('nodes', GridCoordinator)]:
+        with runner(*GRID, streams = DemeStreams(1), tiles = TILES) as population:
+            print(f"{name:>8} {measure(population):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
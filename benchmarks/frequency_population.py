@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares the time per generation of ArrayPopulation, with an entry per agent,
+against FrequencyPopulation, with a count per genotype, for subpopulations of
+increasing size.
+
+The game, reproduction, migration and culling work on counts and are timed
+together. Mutation and mating are timed apart, at least a quarter of agents
+mutate every generation whatever the mutation settings, so they stay per agent.
+
+Run from the project root with `python -m benchmarks.frequency_population`.
+"""
+
+import time
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.frequency_population import FrequencyPopulation
+from coop_evolve.random_stream import RandomStream
+
+GRIDS = [(5, 5, 100), (5, 5, 1000), (5, 5, 10000)]
+SEQUENCE = "abcd:a/*:b/"
+
+
+def measure(storage, width, length, subpop_size):
+    """ Returns the seconds taken by the phases on counts and by mutation and mating. """
+    population = storage(width, length, subpop_size, sequence = SEQUENCE, rng = RandomStream(1))
+
+    start = time.perf_counter()
+    population.reset()
+    population.play_game()
+    population.reproduce()
+    population.migrate()
+    population.cull()
+    counted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    population.mutate()
+    population.mate()
+    return counted, time.perf_counter() - start
+
+
+def main():
+    print(f"{'grid':>12} {'agents':>8} {'arrays (s)':>11} {'counts (s)':>11} {'speedup':>8} "
+          f"{'arrays mutate (s)':>18} {'counts mutate (s)':>18}")
+    for width, length, subpop_size in GRIDS:
+        array_time, array_mutate = measure(ArrayPopulation, width, length, subpop_size)
+        count_time, count_mutate = measure(FrequencyPopulation, width, length, subpop_size)
+        print(f"{f'{width}x{length}x{subpop_size}':>12} {width * length * subpop_size:>8} "
+              f"{array_time:>11.3f} {count_time:>11.3f} {array_time/count_time:>8.1f} "
+              f"{array_mutate:>18.2f} {count_mutate:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
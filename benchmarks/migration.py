@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Times a migration over a 1000 x 1000 grid with Migration.migrate, for small
+subpopulations that have just doubled in size by reproducing.
+
+Run from the project root with `python -m benchmarks.migration`.
+"""
+
+import numpy
+import time
+
+from coop_evolve.migration import Migration
+from coop_evolve.random_stream import RandomStream
+
+WIDTH = 1000
+LENGTH = 1000
+SUBPOP_SIZES = [1, 2, 5]
+REPS = 3
+
+
+def main():
+    rng = RandomStream(1)
+    print(f"{'grid':>10} {'subpop':>7} {'agents':>10} {'seconds':>8}")
+    for subpop_size in SUBPOP_SIZES:
+        sizes = numpy.full(WIDTH * LENGTH, 2 * subpop_size)
+        times = []
+        for _ in range(REPS):
+            start = time.perf_counter()
+            Migration.migrate(sizes, subpop_size, WIDTH, LENGTH, 0.1, 1, rng)
+            times.append(time.perf_counter() - start)
+        print(f"{f'{WIDTH}x{LENGTH}':>10} {subpop_size:>7} {int(sizes.sum()):>10} "
+              f"{min(times):>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
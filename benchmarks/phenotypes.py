@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Counts the distinct sequences and phenotypes in an evolving population, and
+the strategy and interaction cache counters keyed by phenotype.
+
+Run from the project root with `python -m benchmarks.phenotypes`.
+"""
+
+from coop_evolve.interaction import InteractionCache
+from coop_evolve.population import Population
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.strategy import StrategyCache
+
+WIDTH = 10
+LENGTH = 10
+SUBPOP_SIZE = 20
+GENERATIONS = 20
+
+
+def hit_rate(stats):
+    lookups = stats['hits'] + stats['misses']
+    return stats['hits']/lookups if lookups else 0
+
+
+def main():
+    StrategyCache.shared().clear()
+    InteractionCache.shared().clear()
+    population = Population(WIDTH, LENGTH, SUBPOP_SIZE, rng = RandomStream(1))
+    
+    print(f"{'generation':>10} {'sequences':>10} {'phenotypes':>11} {'strategies':>11} "
+          f"{'strategy hits':>14} {'outcome hits':>13} {'monomorphic':>12}")
+    for generation in range(1, GENERATIONS + 1):
+        data = population.generation()
+        if generation % 5 == 0:
+            strategies = StrategyCache.shared().stats()
+            outcomes = InteractionCache.shared().stats()
+            print(f"{generation:>10} {len(population.census()['pop_data']):>10} "
+                  f"{len(population.census(phenotypes = True)['pop_data']):>11} "
+                  f"{strategies['size']:>11} {hit_rate(strategies):>14.1%} "
+                  f"{hit_rate(outcomes):>13.1%} {data['monomorphic_demes']:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares the memory and time per generation of Population, with an Agent
+object per agent, against ArrayPopulation, with genotype ids in arrays, for
+grids of increasing size.
+
+Run from the project root with `python -m benchmarks.population_memory`.
+"""
+
+import gc
+import time
+import tracemalloc
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.population import Population
+from coop_evolve.random_stream import RandomStream
+
+GRIDS = [(5, 5, 100), (10, 10, 100), (20, 20, 100)]
+SEQUENCE = "abcd:a/*:b/"
+
+
+def measure(storage, width, length, subpop_size):
+    """ Returns the bytes held after a game and the seconds taken by a generation. """
+    gc.collect()
+    tracemalloc.start()
+    population = storage(width, length, subpop_size, sequence = SEQUENCE, rng = RandomStream(1))
+    population.play_game()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    population.generation()
+    return held, time.perf_counter() - start
+
+
+def main():
+    print(f"{'grid':>12} {'agents':>8} {'agents (KB)':>12} {'arrays (KB)':>12} "
+          f"{'ratio':>6} {'agents (s)':>11} {'arrays (s)':>11}")
+    for width, length, subpop_size in GRIDS:
+        agent_bytes, agent_time = measure(Population, width, length, subpop_size)
+        array_bytes, array_time = measure(ArrayPopulation, width, length, subpop_size)
+        print(f"{f'{width}x{length}x{subpop_size}':>12} {width * length * subpop_size:>8} "
+              f"{agent_bytes/1024:>12.0f} {array_bytes/1024:>12.0f} "
+              f"{agent_bytes/array_bytes:>6.1f} {agent_time:>11.2f} {array_time:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares handing a 1M agent ArrayPopulation to a worker process by pickling
+its arrays and genotype table against putting them in shared memory and
+sending the handle. The worker counts the agents of each genotype, as census
+does, and adds to every payoff sum, so it both reads and writes the
+population.
+
+Run from the project root with `python -m benchmarks.shared_memory`.
+"""
+
+import multiprocessing
+import pickle
+import time
+
+import numpy
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.shared_arrays import SharedArrays
+
+GRID = (100, 100, 100)
+ROUNDS = 5
+
+
+def census(arrays):
+    """
+    Counts the agents of each genotype in the whole population, and the
+    longest sequence.
+    """
+    counts = numpy.bincount(arrays['genotypes'], minlength = len(arrays['sequence_offsets']) - 1)
+    arrays['payoff_sums'] += 1
+    return int(numpy.count_nonzero(counts)), int(numpy.diff(arrays['sequence_offsets']).max())
+
+
+def work(connection):
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        kind, payload = message
+        if kind == 'pickled':
+            arrays = pickle.loads(payload)
+            result = census(arrays)
+            connection.send(pickle.dumps(arrays['payoff_sums'], protocol = pickle.HIGHEST_PROTOCOL))
+        else:
+            shared = SharedArrays.attach(payload)
+            result = census(shared.arrays)
+            shared.close()
+            connection.send(result)
+
+
+def main():
+    # Mutating one random sequence gives most agents a genotype of their own
+    # without generating a million random sequences.
+    rng = RandomStream(1)
+    population = ArrayPopulation(*GRID, sequence = Chromosome(rng = rng).sequence, rng = rng)
+    population.mutate()
+    codes, offsets = population.table.packed()
+    print(f"{population.popsize()} agents, {len(population.table)} genotypes")
+
+    # Sharing before the worker starts gives it the resource tracker that
+    # owns the blocks, see SharedArrays.attach.
+    population.share()
+    connection, worker_connection = multiprocessing.Pipe()
+    worker = multiprocessing.Process(target = work, args = (worker_connection,))
+    worker.start()
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        payload = pickle.dumps({
+            'genotypes': population.genotypes, 'payoff_sums': population.payoff_sums,
+            'play_counts': population.play_counts, 'sizes': population.sizes,
+            'sequence_codes': codes, 'sequence_offsets': offsets
+        }, protocol = pickle.HIGHEST_PROTOCOL)
+        connection.send(('pickled', payload))
+        population.payoff_sums[:] = pickle.loads(connection.recv())
+    pickled = (time.perf_counter() - start)/ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        handle = population.share()
+        connection.send(('shared', handle))
+        connection.recv()
+    shared = (time.perf_counter() - start)/ROUNDS
+
+    connection.send(None)
+    worker.join()
+    population.unshare()
+
+    print(f"{'':>8} {'round trip (s)':>15} {'bytes sent':>12}")
+    print(f"{'pickled':>8} {pickled:>15.3f} {len(payload):>12}")
+    print(f"{'shared':>8} {shared:>15.3f} {len(pickle.dumps(handle)):>12}")
+    print(f"speedup {pickled/shared:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares looking up a response with the receptor trie against scanning the
+genes linearly with one anchored regular expression per receptor, for
+chromosomes of increasing length.
+
+Run from the project root with `python -m benchmarks.strategy_lookup`.
+"""
+
+import random
+import re
+import time
+
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.strategy import Strategy
+
+LENGTHS = [100, 1000, 10000]
+CHROMOSOMES = 10
+HISTORIES = 200
+HISTORY_LENGTH = 10
+
+
+class LinearScan:
+    """ The strategy as a list of compiled receptors checked in gene order. """
+    
+    wildcard_regex = re.compile("([?*+])")
+    
+    def __init__(self, sequence):
+        genes = re.findall(Strategy.regex, sequence)
+        self.receptors = [
+            (re.compile("^" + re.sub(self.wildcard_regex, r"[abcd]\g<1>", receptor) + "$"), 
+             effector)
+            for receptor, effector in genes
+        ]
+        self.default = Chromosome.default_behavior()
+        
+    def response(self, history):
+        for receptor, effector in self.receptors:
+            if receptor.match(history) is not None:
+                return effector
+        return self.default
+
+
+def random_sequence(length):
+    nucleotides = Chromosome.nucleotides()
+    return "".join(random.choice(nucleotides) for _ in range(length))
+
+
+def time_responses(strategy, histories):
+    start = time.perf_counter()
+    for history in histories:
+        strategy.response(history)
+    return (time.perf_counter() - start)/len(histories)
+
+
+def main():
+    print(f"{'length':>8} {'genes':>8} {'linear (us)':>12} {'trie cold (us)':>15} {'trie warm (us)':>15}")
+    for length in LENGTHS:
+        genes = []
+        linear = []
+        cold = []
+        warm = []
+        for _ in range(CHROMOSOMES):
+            sequence = random_sequence(length)
+            histories = [
+                "".join(random.choice("abcd") for _ in range(HISTORY_LENGTH))
+                for _ in range(HISTORIES)
+            ]
+            
+            scan = LinearScan(sequence)
+            trie = Strategy(sequence)
+            
+            for history in histories:
+                assert scan.response(history) == trie.response(history)
+            
+            genes.append(len(scan.receptors))
+            linear.append(time_responses(scan, histories))
+            
+            # Cold lookups build the automaton's states as they go, warm 
+            # lookups find them already built.
+            trie = Strategy(sequence)
+            cold.append(time_responses(trie, histories))
+            warm.append(time_responses(trie, histories))
+            
+        print(f"{length:>8} {sum(genes)/len(genes):>8.0f} "
+              f"{sum(linear)/len(linear) * 1e6:>12.1f} "
+              f"{sum(cold)/len(cold) * 1e6:>15.1f} "
+              f"{sum(warm)/len(warm) * 1e6:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
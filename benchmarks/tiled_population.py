@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compares the time per generation of one ArrayPopulation against the same grid
+split into tiles run by worker processes, and shows how evenly the work is
+spread over the tiles. The speedup is bounded by the number of cores.
+
+Run from the project root with `python -m benchmarks.tiled_population`.
+"""
+
+import os
+import time
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.tiled_population import TiledPopulation
+
+GRID = (40, 40, 20)
+TILES = [(1, 2), (2, 2), (2, 4), (4, 4)]
+GENERATIONS = 3
+
+
+def measure(population):
+    """ Returns the mean seconds per generation after a first, untimed, one. """
+    population.generation()
+    start = time.perf_counter()
+    for _ in range(GENERATIONS):
+        data = population.generation()
+    return (time.perf_counter() - start)/GENERATIONS, data
+
+
+def main():
+    print(f"{os.cpu_count()} cores")
+    serial, _ = measure(ArrayPopulation(*GRID, streams = DemeStreams(1)))
+    print(f"{'tiles':>8} {'time (s)':>9} {'speedup':>8} {'slowest tile (s)':>17} "
+          f"{'fastest tile (s)':>17} {'mean wait (s)':>14}")
+    print(f"{'serial':>8} {serial:>9.2f} {1:>8.1f}")
+    for tiles in TILES:
+        with TiledPopulation(*GRID, streams = DemeStreams(1), tiles = tiles) as population:
+            seconds, data = measure(population)
+        print(f"{f'{tiles[0]}x{tiles[1]}':>8} {seconds:>9.2f} {serial/seconds:>8.1f} "
+              f"{data['tile_times'].max():>17.2f} {data['tile_times'].min():>17.2f} "
+              f"{data['tile_waits'].mean():>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
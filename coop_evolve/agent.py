@@ -1,22 +1,34 @@
 # -*- coding: utf-8 -*-
 
-import random
 import re
 
-from app_settings import AppSettings
-
 from coop_evolve.chromosome import Chromosome
+from coop_evolve.interaction import InteractionCache
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.simulation_config import SimulationConfig
+from coop_evolve.strategy import Strategy
 
 class Agent:
     """
     The things that play the game with each other.
+    
+    Parameters
+    ----------
+    sequence: String, default = None
+        The agent's dna sequence, random if not given.
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    rng: RandomStream, default = None
+        The random numbers for a random sequence, RandomStream.default() if 
+        not given.
     """
     
-    strategy_regex = '(?P<receptor>[abcd?*+]+):[*?+:]*(?P<effector>[abcd])[abcd?*+:]*/'
+    strategy_regex = Strategy.regex
     
-    def __init__(self, sequence = None):
-        self.dna = Chromosome(sequence)
-        self.payoffs = []
+    def __init__(self, sequence = None, config = None, rng = None):
+        self.config = SimulationConfig.default() if config is None else config
+        self.dna = Chromosome(sequence, self.config, rng)
+        self.reset()
         
         
         
@@ -28,23 +40,57 @@ class Agent:
         The chromosome is parses using the regular expression 
         (?P<receptor>[abcd?*+]+):[*?+:]*(?P<effector>[abcd])[abcd?*+:]*/
         
-        
+        Every gene is kept, including ones the phenotype drops as they can
+        never respond, see Strategy.phenotype.
         """
         return re.findall(self.strategy_regex, self.dna.sequence)
         
     def response(self, history):
-        """ Gets the agent's response based on the provided history based on the agent's dna."""
+        """ 
+        Gets the agent's response based on the provided history based on the agent's dna.
         
-        strategy = self.strategy()
-        receptor_regex = re.compile("([?*+])")
-        for move in strategy:
-            move_regex = "^" + re.sub(receptor_regex, r"[abcd]\g<1>", move[0]) + "$"
-            
-            if re.match(move_regex, history) != None:
-                return move[1]
-                
+        The compiled strategy is shared between all agents with the same sequence,
+        see StrategyCache.
+        """
+        
+        return self.dna.strategy().response(history)
+        
+    def record(self, count, total, squares):
+        """
+        Adds the payoffs from *count* moves to the agent's running totals.
+        
+        Only the number of moves, the sum of the payoffs and the sum of squares
+        used by the variance are kept, merged with Welford's method, so an
+        agent's memory doesn't grow with the number of moves it plays.
+        
+        Parameters
+        ----------
+        count: Integer
+            The number of moves.
+        total: Number
+            The sum of the payoffs.
+        squares: Number
+            The sum of the squared payoffs.
+        """
+        if count == 0:
+            return
+        
+        mean = total/count
+        delta = mean - (self.payoff_sum/self.play_count if self.play_count else mean)
+        combined = self.play_count + count
+        self.payoff_m2 += (squares - total * mean) + delta * delta * self.play_count * count/combined
+        self.payoff_sum += total
+        self.play_count = combined
+        
+    def add_payoffs(self, payoffs):
+        """
+        Adds a list of per move payoffs to the agent's running totals.
         
-        return Chromosome.default_behavior()
+        Parameters
+        ----------
+        payoffs: List[Number]
+        """
+        self.record(len(payoffs), sum(payoffs), sum(payoff * payoff for payoff in payoffs))
         
     def fitness(self):
         """ 
@@ -58,35 +104,67 @@ class Agent:
         
         """
         
-        cfg = AppSettings()
-        if len(self.payoffs) == 0:
-            return sum(cfg.payoffs.values())/len(cfg.payoffs)
+        if self.play_count == 0:
+            return self.config.mean_payoff
         else:
-            return sum(self.payoffs)/len(self.payoffs)
+            return self.payoff_sum/self.play_count
+            
+    def payoff_variance(self):
+        """
+        The sample variance of the agent's per move payoffs, zero with fewer
+        than two moves.
+        
+        Returns
+        -------
+        
+        variance: Float
+        """
+        if self.play_count < 2:
+            return 0.0
+        return self.payoff_m2/(self.play_count - 1)
             
     def reset(self):
         """
-        Resets the agent to the expected state at the start of a generation. 
+        Resets the agent to the expected state at the start of a generation,
+        with no payoffs.
+        
+        """
+        
+        self.payoff_sum = 0
+        self.play_count = 0
+        self.payoff_m2 = 0.0
         
+    def offspring(self):
         """
+        Returns a child of the agent.
         
-        self.payoffs = []
+        The child shares its parent's chromosome and compiled strategy until 
+        either of them is changed, see Chromosome.copy, and starts with no
+        payoffs of its own.
+        """
+        child = Agent.__new__(Agent)
+        child.config = self.config
+        child.dna = self.dna.copy()
+        child.reset()
+        return child
         
-    def mutate(self):
-        self.dna.mutate()
+    def mutate(self, rng = None):
+        self.dna.mutate(rng)
         
     @staticmethod
-    def mate(agent1, agent2):
-        Chromosome.crossover(agent1.dna, agent2.dna)
+    def mate(agent1, agent2, rng = None):
+        Chromosome.crossover(agent1.dna, agent2.dna, rng)
         
     @staticmethod
-    def interact(agent1, agent2):
+    def interact(agent1, agent2, rng = None):
         """ 
         Has the agents play the game. 
         
         The agents play the game based on the interaction_length specified
         in settings. The length is a random number drawn from the negative 
-        binomial distribution.
+        binomial distribution. Since the moves are determined by the agents'
+        sequences, the game is looked up in the shared InteractionCache and only
+        played out the first time a pair of sequences meet.
         
          Parameters
         ----------
@@ -94,29 +172,31 @@ class Agent:
             One agent to interact
         agent2: Agent
             The other interacting agent. 
+        rng: RandomStream, default = None
+            The random numbers to use, RandomStream.default() if not given.
             
         Returns
         -------
         histories <List>:
             the histories of each agent [history1, history2]
         """
-        cfg = AppSettings()
-        p = cfg.interaction_length/(1 + cfg.interaction_length)
+        if rng is None:
+            rng = RandomStream.default()
         
-        history1 = ""
-        history2 = ""
+        # Number of plays before the game ends, which continues each move 
+        # with probability interaction_p
+        length = rng.geometric(1 - agent1.config.interaction_p) - 1
         
-        while(random.random() <= p):
-            history1 += agent1.response(history2)
-            history2 += agent2.response(history1)
-            
-            agent1.payoffs.append(Agent.payoff(history2[-1] + history1[-1]))
-            agent2.payoffs.append(Agent.payoff(history1[-1] + history2[-1]))
+        outcome = InteractionCache.shared().get(agent1.dna, agent2.dna)
+        history1, history2, _, _ = outcome.play(length)
+        
+        agent1.record(length, outcome.totals1[length], outcome.squares1[length])
+        agent2.record(length, outcome.totals2[length], outcome.squares2[length])
             
         return [history1, history2]
     
     @staticmethod
-    def payoff(moves):
+    def payoff(moves, config = None):
         """ 
         Gets the payoff from a pair of moves.
         
@@ -129,13 +209,13 @@ class Agent:
         ----------
         moves: String
             The moves by the opponent, then the agent as a character string.
+        config: SimulationConfig, default = None
+            The run's settings, SimulationConfig.default() if not given.
         """
-        cfg = AppSettings()
+        if config is None:
+            config = SimulationConfig.default()
         
-        if moves in cfg.payoffs:
-            return cfg.payoffs[moves]
-        else:
-            return 0
+        return config.payoff(moves)
         
         
         
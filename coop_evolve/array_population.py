@@ -0,0 +1,935 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+
+import numpy
+
+from coop_evolve.batch_games import BatchGames
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.culling import Culling
+from coop_evolve.genotype_table import GenotypeTable
+from coop_evolve.migration import Migration
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.reproduction import Reproduction
+from coop_evolve.shared_arrays import SharedArrays
+from coop_evolve.simulation_config import SimulationConfig
+from coop_evolve.strategy import Strategy
+
+class ArrayPopulation:
+    """
+    A width by length grid of subpopulations stored as arrays.
+
+    The same model as Population, but rather than an Agent object each agent is
+    an entry in three parallel arrays, its genotype's id in a shared
+    GenotypeTable, the sum of its payoffs and the number of moves it has been
+    paid for. Agents are kept grouped by subpopulation in grid order, so each
+    subpopulation is a contiguous slice of the arrays and `sizes` holds their
+    lengths. Indexing returns views that read and write the arrays like the
+    rows, subpopulations and agents of a Population.
+
+    The phases draw the same random numbers in the same order as Population's,
+    so with the same seed both give the same results.
+
+    Parameters
+    ----------
+    width, length: Integer
+        The dimensions of the grid.
+    subpop_size: Integer
+        The number of agents in each subpopulation.
+    sequence: String, default = None
+        The initial sequence of every agent, random if not given.
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    rng: RandomStream, default = None
+        The source of every random number the population uses,
+        RandomStream.default() if not given.
+    streams: DemeStreams, default = None
+        If given each subpopulation draws from its own stream for each phase
+        instead of sharing *rng*.
+    batched_games: Boolean, default = False
+        If true play_game plays every game in the grid together with
+        BatchGames instead of one game at a time.
+    monomorphic_games: Boolean, default = False
+        If true play_game plays monomorphic subpopulations as one shared
+        outcome, as Population.
+    shared: Boolean, default = False
+        If true the arrays are kept in shared memory, see `share`, so worker
+        processes can use them without their being pickled.
+    scheduler: DemeScheduler, default = None
+        If given it plays, mutates and mates the subpopulations on worker
+        processes. Needs *streams*.
+    """
+
+    def __init__(self, width, length, subpop_size, sequence = None, config = None, rng = None,
+                 streams = None, batched_games = False, monomorphic_games = False,
+                 shared = False, scheduler = None):
+        if scheduler is not None and streams is None:
+            raise ValueError("A scheduler needs each subpopulation to have its own streams")
+        self.width = width
+        self.length = length
+        self.subpop_size = subpop_size
+        self.config = SimulationConfig.default() if config is None else config
+        self.rng = RandomStream.default() if rng is None else rng
+        self.streams = streams
+        self.batched_games = batched_games
+        self.monomorphic_games = monomorphic_games
+        self.scheduler = scheduler
+        self.table = GenotypeTable(self.config)
+
+        genotypes = []
+        for i in range(self.width):
+            for j in range(self.length):
+                rng = self.__rng(i, j, 'init')
+                for k in range(self.subpop_size):
+                    genotypes.append(
+                        self.table.intern(Chromosome(sequence, self.config, rng).sequence))
+
+        self.shared = SharedArrays() if shared else None
+        self._packed = None
+        self.__store(
+            genotypes = numpy.array(genotypes, dtype = numpy.int32),
+            payoff_sums = numpy.zeros(len(genotypes)),
+            play_counts = numpy.zeros(len(genotypes), dtype = numpy.int32),
+            sizes = numpy.full(self.width * self.length, self.subpop_size, dtype = numpy.int64))
+        self._compacted = len(self.table)
+
+    @classmethod
+    def attached(cls, arrays, table, width, length, subpop_size, config, streams):
+        """
+        Returns a population over the arrays of one shared by another process,
+        see `share`, for a worker to run the phases of some subpopulations
+        on. Its phases change the shared arrays in place.
+
+        Parameters
+        ----------
+        arrays: SharedArrays
+            Attached to the handle from `share`.
+        table: GenotypeTable
+            A copy of the population's table, with the same ids.
+        width, length, subpop_size, config, streams
+            As the population's.
+
+        Returns
+        -------
+        population: ArrayPopulation
+        """
+        population = cls.__new__(cls)
+        population.width = width
+        population.length = length
+        population.subpop_size = subpop_size
+        population.config = config
+        population.rng = None
+        population.streams = streams
+        population.batched_games = False
+        population.monomorphic_games = False
+        population.scheduler = None
+        population.table = table
+        population.shared = None
+        population._packed = None
+        population.__store(**{name: arrays[name] for name in
+                              ('genotypes', 'payoff_sums', 'play_counts', 'sizes')})
+        population._compacted = len(table)
+        return population
+
+    def offsets(self):
+        """
+        Returns where each subpopulation starts in the arrays, in grid order,
+        followed by the total number of agents.
+        """
+        if self._offsets is None:
+            self._offsets = numpy.concatenate(([0], numpy.cumsum(self.sizes)))
+        return self._offsets
+
+    def popsize(self):
+        """
+        The number of agents currently in the population.
+
+        Returns
+        -------
+        popsize: Integer
+        """
+        return int(self.sizes.sum())
+
+    def fitness(self):
+        """
+        Returns every agent's mean payoff per move, or the mean of the payoffs
+        for agents that haven't played.
+
+        Returns
+        -------
+        fitness: numpy.ndarray
+        """
+        fitness = numpy.full(len(self.genotypes), float(self.config.mean_payoff))
+        played = self.play_counts > 0
+        fitness[played] = self.payoff_sums[played]/self.play_counts[played]
+        return fitness
+
+    def play_game(self, interactions = 1, batched = None, monomorphic = None):
+        """
+        Agents play the game with others from the same subpopulation.
+
+        Parameters
+        ---------
+        interactions: Integer, default = 1
+            The number of interactions per agent.
+        batched: Boolean, default = None
+            If true every game in the grid is played at once, see BatchGames.
+            Defaults to the population's batched_games.
+        monomorphic: Boolean, default = None
+            If true monomorphic subpopulations have their games played together
+            and shared out evenly, as Population.play_game. Defaults to the
+            population's monomorphic_games.
+
+        Returns
+        -------
+        dict{subpop_counts: List[List[Dict]], pop_counts[Dict], monomorphic_demes: Integer}
+            A tally of how many times each behavior was exhibited, and how
+            many subpopulations were played as monomorphic, as
+            Population.play_game.
+        """
+        if batched is None:
+            batched = self.batched_games
+        if monomorphic is None:
+            monomorphic = self.monomorphic_games
+        if self.scheduler is not None and not batched:
+            return self.__behavior_data(
+                self.scheduler.run(self, 'play', interactions, monomorphic))
+
+        shared = self.__play_monomorphic(interactions) if monomorphic else {}
+        if batched:
+            return self.__play_batched(interactions, shared)
+        return self.__behavior_data([
+            (shared[i * self.length + j].tolist(), True) if i * self.length + j in shared
+            else (self._play_games(i, j, interactions), False)
+            for i in range(self.width) for j in range(self.length)
+        ])
+
+    def _play_games(self, i, j, interactions):
+        """
+        Plays the games of subpopulation (i, j) one at a time, adding the
+        payoffs to the arrays.
+
+        Returns
+        -------
+        counts: List[Integer]
+            How many times each behavior was exhibited, in config.behaviors order.
+        """
+        cfg = self.config
+        p = 1 - cfg.interaction_p
+        offsets = self.offsets()
+        counts = dict.fromkeys(cfg.behaviors, 0)
+
+        start = offsets[i * self.length + j]
+        end = offsets[i * self.length + j + 1]
+        genotypes = self.genotypes[start:end].tolist()
+        sums = self.payoff_sums[start:end].tolist()
+        plays = self.play_counts[start:end].tolist()
+
+        rng = self.__rng(i, j, 'play')
+        for _ in range(interactions * self.subpop_size):
+            index1 = rng.integers(0, self.subpop_size)
+            index2 = rng.integers(0, self.subpop_size)
+            while index1 == index2:
+                index2 = rng.integers(0, self.subpop_size)
+            length = rng.geometric(p) - 1
+
+            outcome = self.table.outcome(genotypes[index1], genotypes[index2])
+            history1, history2, total1, total2 = outcome.play(length)
+            sums[index1] += total1
+            sums[index2] += total2
+            plays[index1] += length
+            plays[index2] += length
+
+            for behavior in cfg.behaviors:
+                counts[behavior] += history1.count(behavior) + history2.count(behavior)
+
+        self.payoff_sums[start:end] = sums
+        self.play_counts[start:end] = plays
+        return [counts[behavior] for behavior in cfg.behaviors]
+
+    def _play_shared(self, i, j, interactions):
+        """
+        Plays the games of subpopulation (i, j) with PairOutcome.play_shared
+        if every agent in it has the same phenotype, adding the payoffs to
+        the arrays.
+
+        Returns
+        -------
+        counts: numpy.ndarray
+            How many times each behavior was exhibited, in config.behaviors
+            order, or None if the subpopulation isn't monomorphic.
+        """
+        offsets = self.offsets()
+        start = offsets[i * self.length + j]
+        end = min(offsets[i * self.length + j + 1], start + self.subpop_size)
+        genotypes = self.genotypes[start:end]
+        if len(genotypes) < 2:
+            return None
+        phenotypes = {self.table.phenotype(genotype)
+                      for genotype in numpy.unique(genotypes).tolist()}
+        if len(phenotypes) > 1:
+            return None
+
+        genotype = int(genotypes[0])
+        results = self.table.outcome(genotype, genotype).play_shared(
+            interactions * self.subpop_size, len(genotypes), self.__rng(i, j, 'play'))
+        self.payoff_sums[start:end] += results['totals']
+        self.play_counts[start:end] += results['counts'].astype(self.play_counts.dtype)
+        return results['behaviors']
+
+    def __behavior_data(self, results):
+        # The data play_game returns from each subpopulation's behavior counts
+        # and whether it was monomorphic, in grid order.
+        behaviors = self.config.behaviors
+        pop_counts = dict.fromkeys(behaviors, 0)
+        for counts, _ in results:
+            for behavior, count in zip(behaviors, counts):
+                pop_counts[behavior] += count
+        subpop_counts = [dict(zip(behaviors, counts)) for counts, _ in results]
+        return {
+            'subpop_counts': [subpop_counts[i * self.length:(i + 1) * self.length]
+                              for i in range(self.width)],
+            'pop_counts': pop_counts,
+            'monomorphic_demes': sum(1 for _, monomorphic in results if monomorphic)
+        }
+
+    def __play_monomorphic(self, interactions):
+        # Plays the monomorphic subpopulations, returning the behavior counts
+        # of each by its index in grid order.
+        shared = {}
+        for i in range(self.width):
+            for j in range(self.length):
+                counts = self._play_shared(i, j, interactions)
+                if counts is not None:
+                    shared[i * self.length + j] = counts
+        return shared
+
+    def __play_batched(self, interactions, shared):
+        # Plays every game in the grid outside the monomorphic subpopulations
+        # at once, with one strategy per genotype present, and adds the totals
+        # to the payoff arrays.
+        behaviors = self.config.behaviors
+        present, kinds = numpy.unique(self.genotypes, return_inverse = True)
+        results = BatchGames(self.config).play_demes(
+            [self.table.strategy(genotype) for genotype in present.tolist()], self.offsets(),
+            self.subpop_size, interactions, self.__rngs('play'), kinds = kinds,
+            demes = [deme for deme in range(self.width * self.length) if deme not in shared])
+        for deme, counts in shared.items():
+            results['behaviors'][deme] = counts
+
+        self.payoff_sums += results['totals']
+        self.play_counts += results['counts'].astype(self.play_counts.dtype)
+
+        subpop_counts = [dict(zip(behaviors, counts))
+                         for counts in results['behaviors'].tolist()]
+        return {
+            'subpop_counts': [subpop_counts[i * self.length:(i + 1) * self.length]
+                              for i in range(self.width)],
+            'pop_counts': dict(zip(behaviors, results['behaviors'].sum(axis = 0).tolist())),
+            'monomorphic_demes': len(shared)
+        }
+
+    def mutate(self, batched = True):
+        """
+        Mutates each agent in the population.
+
+        Each agent's sequence is copied into a Chromosome, mutated as in
+        Population.mutate, and the agents that changed are given the id of
+        their new sequence.
+
+        Parameters
+        ----------
+        batched: Boolean, default = True
+            If true the chromosomes are mutated together with Chromosome.mutate_all,
+            the whole population at once or, with per subpopulation streams, a
+            subpopulation at a time. If false each is mutated in turn.
+        """
+        if batched and self.streams is None:
+            self.__mutate(numpy.arange(len(self.genotypes)), self.rng)
+            return
+
+        if batched and self.scheduler is not None:
+            self.__assign(self.scheduler.run(self, 'mutate'))
+            return
+
+        offsets = self.offsets()
+        for i in range(self.width):
+            for j in range(self.length):
+                if batched:
+                    self.__assign([self._mutations(i, j)])
+                    continue
+                rng = self.__rng(i, j, 'mutate')
+                for index in range(offsets[i * self.length + j],
+                                   offsets[i * self.length + j + 1]):
+                    dna = Chromosome(self.table.sequence(self.genotypes[index]), self.config)
+                    dna.mutate(rng)
+                    self.genotypes[index] = self.table.intern(dna.sequence)
+
+    def _mutations(self, i, j):
+        """
+        Mutates the agents of subpopulation (i, j) together, see
+        Chromosome.mutate_all, without changing the population.
+
+        Returns
+        -------
+        changes: List[(Integer, String)]
+            The index and new sequence of each agent that changed.
+        """
+        offsets = self.offsets()
+        return self.__mutations(
+            numpy.arange(offsets[i * self.length + j], offsets[i * self.length + j + 1]),
+            self.__rng(i, j, 'mutate'))
+
+    def mate(self):
+        """
+        Individuals within each subpopulation can swap slices of their chromosome
+        with subpopulation mates.
+        """
+        if self.scheduler is not None:
+            self.__assign(self.scheduler.run(self, 'mate'))
+            return
+        for i in range(self.width):
+            for j in range(self.length):
+                self.__assign([self._crossovers(i, j)])
+
+    def _crossovers(self, i, j):
+        """
+        Crosses over pairs of agents in subpopulation (i, j), without changing
+        the population.
+
+        Returns
+        -------
+        changes: List[(Integer, String)]
+            The index and new sequence of each agent crossed over, in the order
+            they were, an agent coming up again for each later crossover.
+        """
+        cfg = self.config
+        start = self.offsets()[i * self.length + j]
+        rng = self.__rng(i, j, 'mate')
+        sequences = {}
+        changes = []
+        for _ in range(int(round(self.subpop_size * cfg.mating_rate * 0.5))):
+            index1 = rng.integers(0, self.subpop_size)
+            index2 = rng.integers(0, self.subpop_size)
+            while index1 == index2:
+                index2 = rng.integers(0, self.subpop_size)
+            dna1, dna2 = (
+                Chromosome(sequences.get(index, self.table.sequence(self.genotypes[index])), cfg)
+                for index in (start + index1, start + index2)
+            )
+            Chromosome.crossover(dna1, dna2, rng)
+            for index, dna in ((start + index1, dna1), (start + index2, dna2)):
+                sequences[index] = dna.sequence
+                changes.append((index, dna.sequence))
+        return changes
+
+    def reproduce(self, fecundity = 1, relative_fitnesses = True):
+        """
+        Agents reproduce based on their fitness, as Population.reproduce. Offspring
+        are appended to their parent's subpopulation with its genotype and no payoffs.
+
+        Parameters
+        ----------
+        fecundity: Integer, default = 1
+            The average number of offspring per agent.
+        relative_fitnesses: Boolean, default = True
+            If true agents reproduce in proportion to their fitness relative to their
+            subpopulation, if false with probability fitness/max_payoff.
+
+        Returns
+        -------
+        mean_fitnesses: numpy.ndarray
+            The mean fitness of each subpopulation, indexed [x][y].
+        """
+
+        if(relative_fitnesses):
+            return self.__reproduce_with_relative_fitness(fecundity)
+        else:
+            return self.__reproduce_with_absolute_fitness(fecundity)
+
+    def migrate(self, survival = 0.1, distance = 1):
+        """
+        Surplus agents leave their subpopulation and, if they survive, move a
+        poisson distributed distance in both x and y, as Population.migrate. The
+        survivors are moved by index arrays, see Migration.
+
+        Parameters
+        ----------
+        survival: Float, default = 0.1
+            The probability the agent survives migration.
+        distance: Integer, default = 1
+            The average distance an agent moves in both X and Y directions.
+        """
+        order, sizes = Migration.migrate(
+            self.sizes, self.subpop_size, self.width, self.length, survival, distance,
+            self.__rngs('migrate'))
+        self.__reorder(order, sizes)
+
+    def emigrate(self, survival = 0.1, distance = 1, origin = (0, 0), grid = None):
+        """
+        Migrates the population as one tile of a larger grid, returning the
+        survivors to be passed to `immigrate` of the tile they land in, as
+        Population.emigrate.
+        """
+        destinations, migrants = Migration.destinations(
+            self.sizes, self.subpop_size, self.width, self.length, survival, distance,
+            self.__rngs('migrate'), origin, grid)
+
+        grid_length = self.length if grid is None else grid[1]
+        homes = numpy.repeat(numpy.arange(self.width * self.length), self.sizes)
+        sources = (homes // self.length + origin[0]) * grid_length + homes % self.length + origin[1]
+        leaving = numpy.flatnonzero(migrants)
+        sequences = [self.table.sequence(genotype)
+                     for genotype in self.genotypes[leaving].tolist()]
+
+        staying = numpy.flatnonzero(~migrants & (destinations >= 0))
+        self.__reorder(staying, numpy.bincount(homes[staying], minlength = len(self.sizes)))
+        return list(zip(destinations[leaving].tolist(), sources[leaving].tolist(), sequences))
+
+    def immigrate(self, migrants, origin = (0, 0), grid = None):
+        """
+        Adds the migrants that landed in this tile after the residents of
+        their subpopulations, as Population.immigrate.
+        """
+        migrants = sorted(migrants, key = lambda migrant: migrant[1])
+        grid_length = self.length if grid is None else grid[1]
+        destinations = numpy.array([migrant[0] for migrant in migrants], dtype = numpy.int64)
+        demes = (destinations // grid_length - origin[0]) * self.length + \
+            destinations % grid_length - origin[1]
+
+        count = self.width * self.length
+        keys = numpy.concatenate((numpy.repeat(numpy.arange(count), self.sizes), demes))
+        sort = numpy.argsort(keys, kind = 'stable')
+        self.__store(
+            genotypes = numpy.concatenate((
+                self.genotypes,
+                numpy.array([self.table.intern(sequence) for _, _, sequence in migrants],
+                            dtype = self.genotypes.dtype)))[sort],
+            payoff_sums = numpy.concatenate(
+                (self.payoff_sums, numpy.zeros(len(migrants))))[sort],
+            play_counts = numpy.concatenate(
+                (self.play_counts, numpy.zeros(len(migrants), dtype = self.play_counts.dtype)))[sort],
+            sizes = self.sizes + numpy.bincount(demes, minlength = count))
+
+    def cull(self, batched = True):
+        """
+        Randomly removes agents from subpopulations until they are down to carrying capacity
+
+        Parameters
+        ----------
+        batched: Boolean, default = True
+            If true the survivors of every subpopulation are drawn at once, see
+            Culling. If false agents are removed one at a time.
+        """
+        if batched:
+            self.__reorder(*Culling.survivors(self.sizes, self.subpop_size, self.__rngs('cull')))
+            return
+
+        offsets = self.offsets()
+        survivors = []
+        for i in range(self.width):
+            for j in range(self.length):
+                rng = self.__rng(i, j, 'cull')
+                remaining = list(range(offsets[i * self.length + j],
+                                       offsets[i * self.length + j + 1]))
+                while(len(remaining) > self.subpop_size):
+                    remaining.pop(rng.integers(0, len(remaining)))
+                survivors.append(remaining)
+        self.__select(survivors)
+
+    def generation(self, interactions = 1,
+                         fecundity = 1,
+                         relative_fitnesses = True,
+                         migration_distance = 1,
+                         migration_survival = 0.1,
+                         migrate = None):
+        """
+        Goes through one full lifecycle of a population, as Population.generation,
+        and tidies up the genotype table, see `tidy`.
+        """
+
+        if self.streams is not None:
+            self.streams.next_generation()
+        self.reset()
+        behavior_data = self.play_game(interactions)
+        self.mutate()
+        fitness_data = self.reproduce(fecundity, relative_fitnesses)
+        if migrate is None:
+            self.migrate(survival = migration_survival, distance = migration_distance)
+        else:
+            migrate(self)
+        self.cull()
+        self.mate()
+        self.tidy()
+
+        return {
+            'behavior_data': behavior_data,
+            'fitness_data': fitness_data,
+            'monomorphic_demes': behavior_data['monomorphic_demes']
+        }
+
+    def tidy(self):
+        """
+        Drops genotypes that have died out from the table, see `compact`, once
+        it has doubled in size since it was last compacted. Called at the end
+        of each generation.
+        """
+        if len(self.table) > 2 * self._compacted:
+            self.compact()
+
+    def compact(self):
+        """ Drops genotypes no agent has any more from the genotype table. """
+        self.__store(genotypes = self.table.compact(self.genotypes))
+        self._compacted = len(self.table)
+        self._packed = None
+
+    def share(self):
+        """
+        Puts the population in shared memory, if it isn't already, and
+        returns the handle worker processes attach to it with, see
+        SharedArrays.attach.
+
+        The arrays `genotypes`, `payoff_sums`, `play_counts` and `sizes` are
+        kept in shared memory from then on, so workers read and write the
+        population's own arrays. The genotype table is copied in as
+        `sequence_codes` and `sequence_offsets`, see GenotypeTable.packed,
+        when it has changed since the last handle was taken. A handle is only
+        good until the population next changes size, take a new one each
+        generation.
+
+        Returns
+        -------
+        handle: Dict
+        """
+        if self.shared is None:
+            self.shared = SharedArrays()
+            self.__store(genotypes = self.genotypes, payoff_sums = self.payoff_sums,
+                         play_counts = self.play_counts, sizes = self.sizes)
+        # Genotypes are only ever added between compactions, so an unchanged
+        # length means an unchanged table.
+        if self._packed != len(self.table):
+            self.shared['sequence_codes'], self.shared['sequence_offsets'] = self.table.packed()
+            self._packed = len(self.table)
+        return self.shared.handle()
+
+    def unshare(self):
+        """
+        Moves the arrays back into the process's own memory and frees the
+        shared memory, so handles already given out are no longer good.
+        """
+        if self.shared is None:
+            return
+        shared = self.shared
+        self.shared = None
+        self._packed = None
+        self.__store(genotypes = self.genotypes.copy(), payoff_sums = self.payoff_sums.copy(),
+                     play_counts = self.play_counts.copy(), sizes = self.sizes.copy())
+        shared.close()
+
+    def close(self):
+        """
+        Frees the shared memory the population is kept in, if it is, see
+        `unshare`. The population can still be used afterwards.
+        """
+        self.unshare()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def census(self, phenotypes = False):
+        """
+        Counts the agents with each sequence.
+
+        Parameters
+        ----------
+        phenotypes: Boolean, default = False
+            Counts the agents with each phenotype instead, see
+            Strategy.phenotype.
+
+        Returns
+        -------
+        dict{subpop_data: List[List[Dict]], pop_data: Dict}
+            The counts by sequence or phenotype in each subpopulation and in
+            the whole population.
+        """
+        key = self.table.phenotype if phenotypes else self.table.sequence
+        offsets = self.offsets()
+        subpop_data = []
+        for i in range(self.width):
+            row = []
+            for j in range(self.length):
+                genotypes, counts = numpy.unique(
+                    self.genotypes[offsets[i * self.length + j]:offsets[i * self.length + j + 1]],
+                    return_counts = True)
+                row.append(self.__tally(key, genotypes, counts))
+            subpop_data.append(row)
+
+        genotypes, counts = numpy.unique(self.genotypes, return_counts = True)
+        pop_data = self.__tally(key, genotypes, counts)
+
+        return({'subpop_data': subpop_data, 'pop_data': pop_data})
+
+    def reset(self):
+        """
+        Resets the population to starting state for the next generation in the simulation.
+        """
+        self.payoff_sums[:] = 0
+        self.play_counts[:] = 0
+
+    @staticmethod
+    def __tally(key, genotypes, counts):
+        # Adds up the *counts* of *genotypes* by their *key*.
+        tally = {}
+        for genotype, count in zip(genotypes.tolist(), counts.tolist()):
+            tally[key(genotype)] = tally.get(key(genotype), 0) + count
+        return tally
+
+    def __rng(self, i, j, phase):
+        # The stream subpopulation (i, j) draws from in *phase*.
+        if self.streams is None:
+            return self.rng
+        return self.streams.stream(i, j, phase)
+
+    def __rngs(self, phase):
+        # The stream for drawing for the whole grid at once in *phase*, or each
+        # subpopulation's stream in grid order.
+        if self.streams is None:
+            return self.rng
+        return [self.streams.stream(i, j, phase)
+                for i in range(self.width) for j in range(self.length)]
+
+    def __mutate(self, indices, rng):
+        self.__assign([self.__mutations(indices, rng)])
+
+    def __mutations(self, indices, rng):
+        chromosomes = [
+            Chromosome(self.table.sequence(genotype), self.config)
+            for genotype in self.genotypes[indices].tolist()
+        ]
+        return [(int(indices[changed]), chromosomes[changed].sequence)
+                for changed in Chromosome.mutate_all(chromosomes, self.config, rng)]
+
+    def __assign(self, changes):
+        # Gives agents their new sequences, from lists of (index, sequence)
+        # changes, interning them in order.
+        for deme in changes:
+            for index, sequence in deme:
+                self.genotypes[index] = self.table.intern(sequence)
+
+    def __select(self, demes):
+        """
+        Rebuilds the arrays from a list of agent indices for each subpopulation
+        in grid order. Indices can repeat to copy an agent.
+        """
+        sizes = numpy.array([len(deme) for deme in demes], dtype = numpy.int64)
+        self.__reorder(
+            numpy.fromiter((index for deme in demes for index in deme),
+                           dtype = numpy.int64, count = int(sizes.sum())),
+            sizes)
+
+    def __append(self, agents, demes):
+        """
+        Appends offspring of *agents*, with their genotypes and no payoffs, to
+        the ends of the subpopulations *demes*, keeping the order they are given in.
+        """
+        count = self.width * self.length
+        residents = numpy.arange(len(self.genotypes))
+        keys = numpy.concatenate((numpy.repeat(numpy.arange(count), self.sizes), demes))
+        sort = numpy.argsort(keys, kind = 'stable')
+        self.__reorder(
+            numpy.concatenate((residents, agents))[sort],
+            self.sizes + numpy.bincount(demes, minlength = count))
+
+        born = sort >= len(residents)
+        self.payoff_sums[born] = 0
+        self.play_counts[born] = 0
+
+    def __reorder(self, order, sizes):
+        # The agents at *order* become the population, *sizes* to a subpopulation.
+        self.__store(genotypes = self.genotypes[order], payoff_sums = self.payoff_sums[order],
+                     play_counts = self.play_counts[order], sizes = sizes)
+
+    def __store(self, **arrays):
+        # Replaces the named arrays, copying them into shared memory if the
+        # population is shared.
+        for name, array in arrays.items():
+            if self.shared is not None:
+                self.shared[name] = array
+                array = self.shared[name]
+            setattr(self, name, array)
+        self._offsets = None
+
+    def __reproduce_with_relative_fitness(self, fecundity):
+        """
+        Each subpopulation produces exactly *fecundity* * *subpop_size* new agents,
+        each with a parent drawn in proportion to its fitness, see
+        Reproduction.relative.
+        """
+        demes = self.width * self.length
+        agents = self.offsets()[:-1, None] + numpy.arange(self.subpop_size)
+        counts, mean_fitnesses = Reproduction.relative(
+            self.fitness()[agents], fecundity, self.__rngs('reproduce'))
+
+        self.__append(
+            numpy.repeat(agents.ravel(), counts.ravel()),
+            numpy.repeat(numpy.arange(demes), fecundity * self.subpop_size))
+        return mean_fitnesses.reshape(self.width, self.length)
+
+    def __reproduce_with_absolute_fitness(self, fecundity):
+        """
+        Each agent gets *fecundity* chances to reproduce, each succeeding with
+        probability fitness/max_payoff, see Reproduction.absolute.
+        """
+        counts, mean_fitnesses = Reproduction.absolute(
+            self.fitness(), self.sizes, fecundity, self.config.max_payoff,
+            self.__rngs('reproduce'))
+
+        demes = numpy.repeat(numpy.arange(self.width * self.length), self.sizes)
+        self.__append(
+            numpy.repeat(numpy.arange(len(self.genotypes)), counts),
+            numpy.repeat(demes, counts))
+        return mean_fitnesses.reshape(self.width, self.length)
+
+    @property
+    def population(self):
+        """ The rows of the grid as views. """
+        return [RowView(self, i) for i in range(self.width)]
+
+    def __len__(self):
+        return self.width
+
+    def __getitem__(self, key):
+        """
+        Returns a view of row *key*, or a list of views for a slice, so the
+        population can be indexed like Population, `pop[i][j][k]`.
+        """
+        if isinstance(key, slice):
+            return [RowView(self, i) for i in range(self.width)[key]]
+        if key < 0:
+            key += self.width
+        if not 0 <= key < self.width:
+            raise IndexError("population index out of range")
+        return RowView(self, key)
+
+
+class RowView:
+    """ A row of subpopulations in an ArrayPopulation. """
+
+    def __init__(self, population, i):
+        self.population = population
+        self.i = i
+
+    def __len__(self):
+        return self.population.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [DemeView(self.population, self.i, j)
+                    for j in range(self.population.length)[key]]
+        if key < 0:
+            key += self.population.length
+        if not 0 <= key < self.population.length:
+            raise IndexError("row index out of range")
+        return DemeView(self.population, self.i, key)
+
+
+class DemeView:
+    """
+    A subpopulation in an ArrayPopulation. Its agents can be read as AgentViews
+    and replaced by assigning an Agent.
+    """
+
+    def __init__(self, population, i, j):
+        self.population = population
+        self.i = i
+        self.j = j
+
+    @property
+    def deme(self):
+        """ The subpopulation's index in grid order. """
+        return self.i * self.population.length + self.j
+
+    def __len__(self):
+        return int(self.population.sizes[self.deme])
+
+    def index(self, k):
+        """ The position of agent *k* of the subpopulation in the arrays. """
+        size = len(self)
+        if k < 0:
+            k += size
+        if not 0 <= k < size:
+            raise IndexError("subpopulation index out of range")
+        return int(self.population.offsets()[self.deme]) + k
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [AgentView(self, k) for k in range(len(self))[key]]
+        self.index(key)
+        return AgentView(self, key)
+
+    def __setitem__(self, key, agent):
+        index = self.index(key)
+        self.population.genotypes[index] = self.population.table.intern(agent.dna.sequence)
+        self.population.payoff_sums[index] = agent.payoff_sum
+        self.population.play_counts[index] = agent.play_count
+
+
+class AgentView:
+    """
+    An agent in an ArrayPopulation, read and written through the population's
+    arrays.
+    """
+
+    def __init__(self, deme, k):
+        self.deme = deme
+        self.k = k
+
+    @property
+    def genotype(self):
+        return int(self.deme.population.genotypes[self.deme.index(self.k)])
+
+    @property
+    def sequence(self):
+        return self.deme.population.table.sequence(self.genotype)
+
+    @sequence.setter
+    def sequence(self, sequence):
+        population = self.deme.population
+        population.genotypes[self.deme.index(self.k)] = population.table.intern(sequence)
+
+    @property
+    def dna(self):
+        """ A copy of the agent's chromosome, changing it doesn't change the agent. """
+        return Chromosome(self.sequence, self.deme.population.config)
+
+    @property
+    def payoff_sum(self):
+        return float(self.deme.population.payoff_sums[self.deme.index(self.k)])
+
+    @property
+    def play_count(self):
+        return int(self.deme.population.play_counts[self.deme.index(self.k)])
+
+    def set_payoffs(self, payoff_sum, play_count):
+        """ Sets the agent's total payoff and the number of moves it was paid for. """
+        index = self.deme.index(self.k)
+        self.deme.population.payoff_sums[index] = payoff_sum
+        self.deme.population.play_counts[index] = play_count
+
+    def fitness(self):
+        """ The agent's mean payoff per move, see Agent.fitness. """
+        if self.play_count == 0:
+            return self.deme.population.config.mean_payoff
+        return self.payoff_sum/self.play_count
+
+    def strategy(self):
+        """ The agent's (receptor, effector) pairs, every gene, as Agent.strategy. """
+        return re.findall(Strategy.regex, self.sequence)
+
+    def response(self, history):
+        """ The agent's response to the opponent's *history*. """
+        return self.deme.population.table.strategy(self.genotype).response(history)
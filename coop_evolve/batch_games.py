@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from coop_evolve.simulation_config import SimulationConfig
+
+
+class StateTable:
+    """
+    The states of a set of compiled strategies numbered together, with integer
+    transition and output tables so many games can be advanced at once with
+    array lookups.
+
+    Each state is a state of one strategy's automaton. States are numbered as
+    games reach them and a transition is filled in the first time any game
+    takes it, so the tables only cover the states actually played.
+
+    Parameters
+    ----------
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    """
+
+    def __init__(self, config = None):
+        self.config = SimulationConfig.default() if config is None else config
+        self.behaviors = self.config.behaviors
+
+        self.ids = {}
+        self.strategies = []
+        self.locals = []
+        self.outputs = numpy.zeros(16, dtype = numpy.int64)
+        self.transitions = numpy.full((16, len(self.behaviors)), -1, dtype = numpy.int64)
+
+    def state(self, strategy, local):
+        """
+        Returns the number of *strategy*'s state *local*, numbering it if it
+        is new.
+        """
+        key = (id(strategy), local)
+        state = self.ids.get(key)
+        if state is None:
+            state = len(self.strategies)
+            self.ids[key] = state
+            self.strategies.append(strategy)
+            self.locals.append(local)
+            if state == len(self.outputs):
+                self.outputs = numpy.concatenate((self.outputs, numpy.zeros_like(self.outputs)))
+                self.transitions = numpy.concatenate(
+                    (self.transitions, numpy.full_like(self.transitions, -1)))
+            self.outputs[state] = self.config.behavior_index[strategy.output(local)]
+        return state
+
+    def start(self, strategy):
+        """ Returns the number of *strategy*'s start state. """
+        return self.state(strategy, strategy.start)
+
+    def advance(self, states, moves):
+        """
+        Returns the states reached from *states* by each of *moves*.
+
+        Parameters
+        ----------
+        states: numpy.ndarray
+            State numbers.
+        moves: numpy.ndarray
+            The index in behaviors of the move each state sees.
+        """
+        following = self.transitions[states, moves]
+        missing = following < 0
+        if missing.any():
+            for state, move in set(zip(states[missing].tolist(), moves[missing].tolist())):
+                strategy = self.strategies[state]
+                local = strategy.advance(self.locals[state], self.behaviors[move])
+                self.transitions[state, move] = self.state(strategy, local)
+            following[missing] = self.transitions[states[missing], moves[missing]]
+        return following
+
+
+class BatchGames:
+    """
+    Plays many games at once, advancing every game one move at a time in
+    lock step over arrays.
+
+    Gives the same moves and payoffs as PairOutcome for each game, so it can
+    replace playing games one at a time. Games are sorted by length so the
+    games still running are always a prefix of the arrays.
+
+    Parameters
+    ----------
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    """
+
+    def __init__(self, config = None):
+        self.config = SimulationConfig.default() if config is None else config
+        self.payoffs = numpy.array(self.config.payoff_table, dtype = float)
+
+    def play_demes(self, strategies, offsets, subpop_size, interactions, rngs, kinds = None,
+                   demes = None):
+        """
+        Plays *interactions* * *subpop_size* games in each subpopulation of a
+        grid, between pairs of distinct agents among the first *subpop_size*
+        agents, chosen uniformly.
+
+        The pairings and game lengths are drawn for the whole grid at once,
+        or for each subpopulation from its own stream, then every game is
+        played together by `play`.
+
+        Parameters
+        ----------
+        strategies: List[Strategy]
+            The strategy of each agent or, with *kinds*, of each kind of agent.
+        offsets: numpy.ndarray
+            Where each subpopulation's agents start, in grid order, with the
+            total number of agents last.
+        subpop_size: Integer
+            The number of agents in each subpopulation taking part.
+        interactions: Integer
+            The number of games per agent.
+        rngs: RandomStream or List[RandomStream]
+            A stream for the whole grid, or one for each subpopulation.
+        kinds: numpy.ndarray, default = None
+            The index in *strategies* of each agent's strategy, if not one
+            strategy per agent.
+        demes: List[Integer], default = None
+            The subpopulations that play, every one if not given. The others
+            are left with no moves.
+
+        Returns
+        -------
+        dict{counts, totals, squares, behaviors}
+            Arrays with the number of moves each agent played, its total
+            payoff and sum of squared payoffs, and the number of times each
+            behavior was played in each subpopulation, a row per
+            subpopulation.
+        """
+        offsets = numpy.asarray(offsets, dtype = numpy.int64)
+        count = len(offsets) - 1
+        agents = offsets[-1]
+        games = interactions * subpop_size if subpop_size > 1 else 0
+        if demes is None:
+            demes = list(range(count))
+
+        if isinstance(rngs, list):
+            draws = [self.pairings(subpop_size, games, 1, rngs[deme]) for deme in demes]
+            empty = numpy.zeros(0, dtype = numpy.int64)
+            index1, index2, lengths = (
+                numpy.concatenate([empty] + [draw[n] for draw in draws]) for n in range(3))
+        else:
+            index1, index2, lengths = self.pairings(subpop_size, games, len(demes), rngs)
+
+        deme_of_game = numpy.repeat(numpy.asarray(demes, dtype = numpy.int64), games)
+        players1 = offsets[deme_of_game] + index1
+        players2 = offsets[deme_of_game] + index2
+        if kinds is None:
+            results = self.play(strategies, players1, players2, lengths)
+        else:
+            kinds = numpy.asarray(kinds, dtype = numpy.int64)
+            results = self.play(strategies, kinds[players1], kinds[players2], lengths)
+
+        players = numpy.concatenate((players1, players2))
+        behaviors = numpy.stack([
+            numpy.bincount(deme_of_game, weights = results['counts'][:, behavior],
+                           minlength = count)
+            for behavior in range(len(self.config.behaviors))
+        ], axis = 1).astype(numpy.int64)
+
+        return {
+            'counts': numpy.bincount(
+                players, weights = numpy.concatenate((lengths, lengths)),
+                minlength = agents).astype(numpy.int64),
+            'totals': numpy.bincount(
+                players, weights = numpy.concatenate((results['totals1'], results['totals2'])),
+                minlength = agents),
+            'squares': numpy.bincount(
+                players, weights = numpy.concatenate((results['squares1'], results['squares2'])),
+                minlength = agents),
+            'behaviors': behaviors
+        }
+
+    def pairings(self, subpop_size, games, demes, rng):
+        """
+        Draws the players and length of *games* games in each of *demes*
+        subpopulations.
+
+        Parameters
+        ----------
+        subpop_size: Integer
+            The number of agents to choose from in each subpopulation.
+        games: Integer
+            The number of games in each subpopulation.
+        demes: Integer
+        rng: RandomStream
+
+        Returns
+        -------
+        (index1, index2, lengths): (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+            The two players of each game as indices within their
+            subpopulation, which are never the same, and the number of moves
+            in each game, grouped by subpopulation.
+        """
+        size = games * demes
+        index1 = rng.integers(0, subpop_size, size)
+        index2 = (index1 + rng.integers(1, subpop_size, size)) % subpop_size if size else index1
+        lengths = rng.geometric(1 - self.config.interaction_p, size) - 1
+        return index1, index2, lengths
+
+    def play(self, strategies, players1, players2, lengths):
+        """
+        Plays a game between each pair of players.
+
+        Parameters
+        ----------
+        strategies: List[Strategy]
+            The strategy of each player.
+        players1, players2: numpy.ndarray
+            The players in each game, indices into *strategies*. The first
+            moves first.
+        lengths: numpy.ndarray
+            The number of moves in each game.
+
+        Returns
+        -------
+        dict{totals1, totals2, squares1, squares2, counts}
+            Arrays with each player's total payoff and sum of squared payoffs
+            in each game, and the number of times each behavior was played in
+            each game, by either player.
+        """
+        table = StateTable(self.config)
+        starts = numpy.array([table.start(strategy) for strategy in strategies], dtype = numpy.int64)
+
+        lengths = numpy.asarray(lengths, dtype = numpy.int64)
+        games = len(lengths)
+        order = numpy.argsort(-lengths, kind = 'stable')
+        state1 = starts[numpy.asarray(players1, dtype = numpy.int64)[order]]
+        state2 = starts[numpy.asarray(players2, dtype = numpy.int64)[order]]
+
+        # running[step] is how many games last longer than step moves, always
+        # the first ones since they're sorted longest first.
+        running = numpy.searchsorted(
+            -lengths[order], -numpy.arange(lengths.max(initial = 0)), side = 'left').tolist()
+
+        totals1 = numpy.zeros(games)
+        totals2 = numpy.zeros(games)
+        squares1 = numpy.zeros(games)
+        squares2 = numpy.zeros(games)
+        counts = numpy.zeros((games, len(self.config.behaviors)), dtype = numpy.int64)
+
+        for k in running:
+            move1 = table.outputs[state1[:k]]
+            state2[:k] = table.advance(state2[:k], move1)
+            move2 = table.outputs[state2[:k]]
+            state1[:k] = table.advance(state1[:k], move2)
+
+            payoff1 = self.payoffs[move2, move1]
+            payoff2 = self.payoffs[move1, move2]
+            totals1[:k] += payoff1
+            totals2[:k] += payoff2
+            squares1[:k] += payoff1 * payoff1
+            squares2[:k] += payoff2 * payoff2
+
+            games_running = numpy.arange(k)
+            counts[games_running, move1] += 1
+            counts[games_running, move2] += 1
+
+        unsort = numpy.empty(games, dtype = numpy.int64)
+        unsort[order] = numpy.arange(games)
+        return {
+            'totals1': totals1[unsort],
+            'totals2': totals2[unsort],
+            'squares1': squares1[unsort],
+            'squares2': squares2[unsort],
+            'counts': counts[unsort]
+        }
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from coop_evolve.simulation_config import SimulationConfig
+from coop_evolve.strategy import Strategy
+
+
+class Census:
+    """
+    The number of agents with each sequence in every subpopulation and in the
+    whole population, kept up to date as agents are born, die, move and
+    change, so a census costs the number of distinct sequences rather than a
+    pass over every agent.
+
+    Agents are counted by their chromosomes. Births, deaths and moves are
+    passed on by the population. A counted chromosome tells the census
+    whenever it changes, by mutation, crossover or having its sequence set,
+    and the changes are counted on the next `update`, so one changed several
+    times is only recounted once.
+
+    Parameters
+    ----------
+    demes: Integer
+        The number of subpopulations, indexed in grid order.
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    """
+
+    def __init__(self, demes, config = None):
+        self.config = SimulationConfig.default() if config is None else config
+        self.demes = [{} for _ in range(demes)]
+        self.totals = {}
+        self.phenotypes = {}
+        self.changes = []
+
+    def add(self, dna, deme):
+        """
+        Counts *dna* in subpopulation *deme*.
+
+        Parameters
+        ----------
+        dna: Chromosome
+        deme: Integer
+        """
+        sequence = dna.sequence
+        dna._census = self
+        dna._deme = deme
+        dna._counted = sequence
+        self.__count(deme, sequence, 1)
+
+    def remove(self, dna):
+        """
+        Stops counting *dna*, whose agent has died or left. Chromosomes not
+        counted here are ignored, as by `move`.
+        """
+        if dna._census is not self:
+            return
+        self.__count(dna._deme, dna._counted, -1)
+        dna._census = None
+
+    def move(self, dna, deme):
+        """ Counts *dna* in subpopulation *deme* instead of its own. """
+        if dna._census is not self:
+            return
+        self.__count(dna._deme, dna._counted, -1)
+        self.__count(deme, dna._counted, 1)
+        dna._deme = deme
+
+    def changed(self, dna):
+        """ Notes that *dna* has changed, called by the chromosome. """
+        self.changes.append(dna)
+
+    def update(self):
+        """ Counts the chromosomes that have changed since the last update. """
+        for dna in self.changes:
+            if dna._census is not self:
+                continue
+            sequence = dna.sequence
+            if sequence != dna._counted:
+                self.__count(dna._deme, dna._counted, -1)
+                self.__count(dna._deme, sequence, 1)
+                dna._counted = sequence
+        self.changes = []
+
+    def data(self, length, phenotypes = False):
+        """
+        Returns the counts, as Population.census. Changes should be counted
+        with `update` first.
+
+        Parameters
+        ----------
+        length: Integer
+            The length of the grid, to lay the subpopulations out in rows.
+        phenotypes: Boolean, default = False
+            Counts by phenotype instead, see Strategy.phenotype.
+
+        Returns
+        -------
+        dict{subpop_data: List[List[Dict]], pop_data: Dict}
+        """
+        if phenotypes:
+            subpops = [self.__phenotypes(counts) for counts in self.demes]
+            pop_data = self.__phenotypes(self.totals)
+        else:
+            subpops = [dict(counts) for counts in self.demes]
+            pop_data = dict(self.totals)
+        return {
+            'subpop_data': [subpops[start:(start + length)]
+                            for start in range(0, len(subpops), length)],
+            'pop_data': pop_data
+        }
+
+    def __count(self, deme, sequence, change):
+        for counts in (self.demes[deme], self.totals):
+            count = counts.get(sequence, 0) + change
+            if count:
+                counts[sequence] = count
+            else:
+                del counts[sequence]
+        if sequence not in self.totals:
+            self.phenotypes.pop(sequence, None)
+
+    def __phenotypes(self, counts):
+        tally = {}
+        for sequence, count in counts.items():
+            phenotype = self.phenotypes.get(sequence)
+            if phenotype is None:
+                phenotype = Strategy.phenotype(sequence, self.config)
+                self.phenotypes[sequence] = phenotype
+            tally[phenotype] = tally.get(phenotype, 0) + count
+        return tally
@@ -1,174 +1,490 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import random
+import math
 
-from app_settings import AppSettings
-from numpy import random as nrand
-from scipy.stats import nbinom
-from scipy.stats import poisson
+import numpy
 
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.simulation_config import SimulationConfig
+from coop_evolve.strategy import Strategy, StrategyCache
 
 class Chromosome:
-    """The genetics of the system."""
+    """
+    The genetics of the system.
+
+    The sequence is stored as a bytearray of nucleotide codes so mutations can
+    splice it in place. The `sequence` string is only built when it is read.
+    Copies share their codes as immutable bytes until one of them is changed,
+    see `copy`.
     
-    def __init__(self, sequence = None):
-        if sequence is not None: 
+    Parameters
+    ----------
+    sequence: String, default = None
+        The dna sequence, random if not given.
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    rng: RandomStream, default = None
+        The random numbers for a random sequence, RandomStream.default() if 
+        not given. The mutation operators take one the same way.
+    """
+
+    # The Census counting the chromosome, told of every change, see Census.add.
+    _census = None
+
+    def __init__(self, sequence = None, config = None, rng = None):
+        self.config = SimulationConfig.default() if config is None else config
+        
+        if sequence is not None:
             self.sequence = sequence
             return
+
+        if rng is None:
+            rng = RandomStream.default()
+
+        # The number of nucleotides added while each draw is <= chromosome_p
+        length = rng.geometric(1 - self.config.chromosome_p) - 1
+        self.codes = self.random_nucleotides(length, self.config, rng)
+        self.__changed()
+
+    @property
+    def sequence(self):
+        if self._sequence is None:
+            self._sequence = self.codes.decode('ascii')
+        return self._sequence
+
+    @sequence.setter
+    def sequence(self, sequence):
+        self.codes = bytearray(sequence, 'ascii')
+        self.__changed()
+        self._sequence = sequence
+
+    def copy(self):
+        """
+        Returns a copy of the chromosome that shares its codes, sequence string,
+        phenotype and compiled strategy.
         
-        cfg = AppSettings()
-        self.sequence = ""
-        p = cfg.chromosome_length/(1 + cfg.chromosome_length)
-        
-        while(random.random() <= p):
-            self.sequence += random.choice(self.nucleotides())
-    
-    def substitutions(self):
+        The shared codes are frozen as bytes and whichever chromosome changes
+        first takes its own bytearray, so copies that are never changed cost
+        no more than the object itself.
         """
-        Randomly changes charcters in the dna. 
+        if type(self.codes) is not bytes:
+            self.codes = bytes(self.codes)
         
-        The number of substitutions us drawn from the poisson 
-        distribution where mu = chromosome_length * mutation_rate.
+        copy = Chromosome.__new__(Chromosome)
+        copy.config = self.config
+        copy.codes = self.codes
+        copy._sequence = self._sequence
+        copy._phenotype = self._phenotype
+        copy._strategy = self._strategy
+        return copy
         
+    def __own(self):
+        # Codes shared with a copy are frozen, take a private copy before changing them.
+        if type(self.codes) is bytes:
+            self.codes = bytearray(self.codes)
+            
+    def __changed(self):
+        # Any change to the codes invalidates the sequence string, phenotype
+        # and compiled strategy.
+        self._sequence = None
+        self._phenotype = None
+        self._strategy = None
+        if self._census is not None:
+            self._census.changed(self)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def phenotype(self):
+        """
+        Returns the canonical sequence of the strategy this sequence encodes, 
+        shared by every sequence that responds the same way, see 
+        Strategy.phenotype. It is kept until the sequence changes.
+        """
+        if self._phenotype is None:
+            self._phenotype = Strategy.phenotype(self.sequence, self.config)
+        return self._phenotype
+
+    def strategy(self):
+        """
+        Returns the compiled Strategy for this sequence.
+
+        The strategy is looked up by phenotype in the process wide StrategyCache 
+        and kept until the sequence changes.
+        """
+        if self._strategy is None:
+            self._strategy = StrategyCache.shared().get(self.phenotype(), self.config)
+        return self._strategy
+
+    def substitutions(self, rng = None):
+        """
+        Randomly changes charcters in the dna.
+
+        The number of substitutions us drawn from the poisson
+        distribution where mu = chromosome_length * mutation_rate.
+
+        """
+
+        if rng is None:
+            rng = RandomStream.default()
+
+        num = rng.poisson(self.config.mutation_rate * len(self.codes))
+        if len(self.codes) > 0 and num > 0:
+            positions = rng.integers(0, len(self.codes), size=num).tolist()
+            self.__own()
+            for pos, code in zip(positions, self.random_nucleotides(num, self.config, rng)):
+                self.codes[pos] = code
+            self.__changed()
+
+    def deletion(self, rng = None):
         """
-           
-        cfg = AppSettings()
-        num = poisson.rvs(cfg.mutation_rate * len(self.sequence))
-        if len(self.sequence) > 0:
-            positions = nrand.randint(0, len(self.sequence), size=num)
-            for pos in positions:
-                self.sequence = self.sequence[:pos] + \
-                                random.choice(self.nucleotides()) + \
-                                self.sequence[(pos + 1):]
-                            
-    def deletion(self):
-        """
-        Deletes a random sequence of characters from a random position on the string. 
-           
+        Deletes a random sequence of characters from a random position on the string.
+
         The lengt of the deletion h is taken from the negative binomial distribution.
         """
-           
-        # Prevents an out of bounds error for random.randint()
-        if(len(self.sequence) == 0):
+
+        # Prevents an out of bounds error for rng.integers()
+        if(len(self.codes) == 0):
             return
-        
-        pos = random.randint(0, len(self.sequence) - 1)
-        
-        cfg = AppSettings()
-        p = cfg.mutation_length/(1 + cfg.mutation_length)
-        
-        while(random.random() <= p):
-            self.sequence = self.sequence[:pos] + self.sequence[(pos + 1):]
-            
-        
-    def insertion(self):
+
+        if rng is None:
+            rng = RandomStream.default()
+
+        pos = rng.integers(0, len(self.codes))
+
+        length = rng.geometric(1 - self.config.mutation_p) - 1
+        if length > 0:
+            self.__own()
+            del self.codes[pos:(pos + length)]
+            self.__changed()
+
+
+    def insertion(self, rng = None):
         """
-        
+
         Inserts a random length of random nucleotide characters into a sequence
-        at a random location. 
-        
-        The position of the insertion is uniformly random across the sequence. The length 
+        at a random location.
+
+        The position of the insertion is uniformly random across the sequence. The length
         of the insertion is drawn from the negative binomial distribution.
-        
+
         """
-           
-        if(len(self.sequence) <= 1):
+
+        if rng is None:
+            rng = RandomStream.default()
+
+        if(len(self.codes) <= 1):
             pos = 0
         else:
-            pos = random.randint(0, len(self.sequence) - 1)
-        
-        cfg = AppSettings()
-        p = cfg.mutation_length/(1 + cfg.mutation_length)
-            
-        while(random.random() <= p):
-            self.sequence = self.sequence[:pos] + \
-            random.choice(self.nucleotides()) + \
-            self.sequence[pos:]
-            
-    
-    def inversion(self):
+            pos = rng.integers(0, len(self.codes))
+
+        length = rng.geometric(1 - self.config.mutation_p) - 1
+        if length > 0:
+            self.__own()
+            self.codes[pos:pos] = self.random_nucleotides(length, self.config, rng)
+            self.__changed()
+
+
+    def inversion(self, rng = None):
         """
-        Reverses the order of a random slice of the sequence. 
-        
+        Reverses the order of a random slice of the sequence.
+
         The position
         on the string is randomly chosen from a uniform distribution. The length
         conforms to the negative binomial distribution.
-        
+
         """
-        
-        if(len(self.sequence) <= 1):
+
+        if rng is None:
+            rng = RandomStream.default()
+
+        if(len(self.codes) <= 1):
             pos = 0
         else:
-            pos = random.randint(0, len(self.sequence) - 1)
-            
-        cfg = AppSettings()
-        p = cfg.mutation_length/(1 + cfg.mutation_length)
+            pos = rng.integers(0, len(self.codes))
+
+        # nbinom(1, p), the number of failures before the first success
+        length = rng.geometric(self.config.mutation_p) - 1
+
+        if length > 1:
+            self.__own()
+            self.codes[pos:(pos + length)] = self.codes[pos:(pos + length)][::-1]
+            self.__changed()
+
+
+    def mutate(self, rng = None):
+        self.substitutions(rng)
+        self.insertion(rng)
+        self.deletion(rng)
+        self.inversion(rng)
+
+    def mutant(self, rng = None):
+        """
+        Returns a mutated copy of the chromosome, drawn from the distribution
+        of mutate given that at least one of its operators acts.
         
-        length = nbinom.rvs(
-            1, 
-            cfg.mutation_length/(1 + cfg.mutation_length)
-        )
+        Mutating a share of identical chromosomes drawn with 
+        mutation_probability this way gives the same distribution as mutating
+        each of them, without any draws for the ones left alone.
+        """
+        while True:
+            child = self.copy()
+            child.mutate(rng)
+            # Every operator that acts takes its own codes first.
+            if type(child.codes) is not bytes:
+                return child
+                
+    @staticmethod
+    def mutants(chromosomes, counts, config = None, rng = None):
+        """
+        Returns *counts[k]* mutants of each of *chromosomes*, each drawn as
+        by mutant.
         
-        self.sequence = self.sequence[:pos] + \
-                        self.sequence[pos:(pos + length)][::-1] + \
-                        self.sequence[(pos + length):]
-                        
-    
-    def mutate(self):
-        self.substitutions()
-        self.insertion()
-        self.deletion()
-        self.inversion()
+        Copies are mutated together with mutate_all, about enough for the
+        mutants wanted given mutation_probability, and the ones it acted on
+        kept, repeating for any still short. Chromosomes shorter than two are
+        mutated with mutant, since mutate_all passes over inversions of them.
         
+        Parameters
+        ----------
+        chromosomes: List[Chromosome]
+        counts: List[Integer]
+            The number of mutants of each chromosome.
+        config: SimulationConfig, default = None
+            The run's settings, SimulationConfig.default() if not given.
+        rng: RandomStream, default = None
+            The random numbers to use, RandomStream.default() if not given.
+            
+        Returns
+        -------
+        mutants: List[List[Chromosome]]
+            The mutants of each chromosome.
+        """
+        if config is None:
+            config = SimulationConfig.default()
+        if rng is None:
+            rng = RandomStream.default()
+            
+        mutants = [[] for _ in chromosomes]
+        wanted = {}
+        for index, (dna, count) in enumerate(zip(chromosomes, counts)):
+            if len(dna) < 2:
+                mutants[index] = [dna.mutant(rng) for _ in range(count)]
+            elif count > 0:
+                wanted[index] = count
+                
+        while wanted:
+            copies = []
+            owners = []
+            for index, count in wanted.items():
+                dna = chromosomes[index]
+                tries = math.ceil(count/Chromosome.mutation_probability(len(dna), config))
+                copies.extend(dna.copy() for _ in range(tries))
+                owners.extend([index] * tries)
+                
+            for changed in Chromosome.mutate_all(copies, config, rng):
+                index = owners[changed]
+                if wanted.get(index):
+                    mutants[index].append(copies[changed])
+                    wanted[index] -= 1
+            wanted = {index: count for index, count in wanted.items() if count > 0}
+            
+        return mutants
 
+    @staticmethod
+    def mutation_probability(length, config = None):
+        """
+        The probability that at least one of mutate's operators acts on a
+        chromosome *length* long.
+        
+        An operator acts when it draws a change, even if the change leaves the
+        sequence the same.
+        """
+        if config is None:
+            config = SimulationConfig.default()
+        p = config.mutation_p
         
+        # Insertions and inversions act whatever the length, substitutions 
+        # and deletions need something to act on.
+        unchanged = (1 - p) * (1 - (1 - p)**2)
+        if length > 0:
+            unchanged *= math.exp(-config.mutation_rate * length) * (1 - p)
+        return 1 - unchanged
+
+
+
     @staticmethod
-    def crossover(dna1, dna2):
+    def mutate_all(chromosomes, config = None, rng = None):
         """
-        Swaps slices of sequence between the two sequences. 
+        Mutates a whole population of chromosomes at once.
         
-        The number of swaps isinstance
-        drawn from the poisson distribution, the position of each swap is random across the 
-        shortest sequence.
+        Gives the same distribution of mutations as calling mutate on each
+        chromosome, but each operator draws its random numbers for the whole
+        population in a few bulk draws and only touches the chromosomes that
+        actually change. The total number of substitutions is drawn once from the
+        poisson distribution for the combined length and scattered uniformly over
+        every position in the population.
+        
+        Parameters
+        ----------
+        chromosomes: List[Chromosome]
+            The chromosomes to mutate.
+        config: SimulationConfig, default = None
+            The run's settings, SimulationConfig.default() if not given.
+        rng: RandomStream, default = None
+            The random numbers to use, RandomStream.default() if not given.
+            
+        Returns
+        -------
+        changed: List[Integer]
+            The indices of the chromosomes that were changed, in order.
+        """
+        
+        if len(chromosomes) == 0:
+            return []
+        
+        if config is None:
+            config = SimulationConfig.default()
+        if rng is None:
+            rng = RandomStream.default()
+        p = config.mutation_p
+        changed = set()
         
+        # Substitutions
+        sizes = numpy.fromiter((len(dna.codes) for dna in chromosomes), 
+                               dtype=numpy.int64, count=len(chromosomes))
+        ends = numpy.cumsum(sizes)
+        num = rng.poisson(config.mutation_rate * ends[-1])
+        if num > 0:
+            positions = rng.integers(0, ends[-1], size=num)
+            owners = numpy.searchsorted(ends, positions, side='right')
+            offsets = positions - (ends[owners] - sizes[owners])
+            for owner, offset, code in zip(owners.tolist(), offsets.tolist(), 
+                                           Chromosome.random_nucleotides(num, config, rng)):
+                chromosomes[owner].__own()
+                chromosomes[owner].codes[offset] = code
+            for owner in set(owners.tolist()):
+                chromosomes[owner].__changed()
+                changed.add(owner)
+        
+        # Insertions
+        lengths = rng.geometric(1 - p, size=len(chromosomes)) - 1
+        mutants = numpy.flatnonzero(lengths).tolist()
+        inserted = Chromosome.random_nucleotides(int(lengths.sum()), config, rng)
+        start = 0
+        for index, u in zip(mutants, rng.random(len(mutants)).tolist()):
+            dna = chromosomes[index]
+            pos = 0 if len(dna.codes) <= 1 else int(u * len(dna.codes))
+            length = int(lengths[index])
+            dna.__own()
+            dna.codes[pos:pos] = inserted[start:(start + length)]
+            start += length
+            dna.__changed()
+            changed.add(index)
+            
+        # Deletions
+        lengths = rng.geometric(1 - p, size=len(chromosomes)) - 1
+        mutants = numpy.flatnonzero(lengths).tolist()
+        for index, u in zip(mutants, rng.random(len(mutants)).tolist()):
+            dna = chromosomes[index]
+            if len(dna.codes) > 0:
+                pos = int(u * len(dna.codes))
+                dna.__own()
+                del dna.codes[pos:(pos + int(lengths[index]))]
+                dna.__changed()
+                changed.add(index)
+                
+        # Inversions, only slices of two or more change anything
+        lengths = rng.geometric(p, size=len(chromosomes)) - 1
+        mutants = numpy.flatnonzero(lengths > 1).tolist()
+        for index, u in zip(mutants, rng.random(len(mutants)).tolist()):
+            dna = chromosomes[index]
+            if len(dna.codes) > 1:
+                pos = int(u * len(dna.codes))
+                length = int(lengths[index])
+                dna.__own()
+                dna.codes[pos:(pos + length)] = dna.codes[pos:(pos + length)][::-1]
+                dna.__changed()
+                changed.add(index)
+                
+        return sorted(changed)
+
+    @staticmethod
+    def crossover(dna1, dna2, rng = None):
+        """
+        Swaps slices of sequence between the two sequences.
+
+        The number of swaps isinstance
+        drawn from the poisson distribution, the position of each swap is random across the
+        shortest sequence. Each swap exchanges everything after its position, so
+        the new sequences are built in one pass over the sorted positions,
+        alternating which parent each slice comes from.
+
         Parameters
         ----------
         dna1: Chromosome
             A chromosome to be crosse dover
         dna2: Chromosome
             A chromosome to be crossed over
+        rng: RandomStream, default = None
+            The random numbers to use, RandomStream.default() if not given.
         """
-        
-        cfg = AppSettings()
-        min_len =  len(min([dna1.sequence, dna2.sequence], key=len)) 
-        num = poisson.rvs(cfg.crossover_rate * min_len)
-        
-        if min_len > 0:
-            
-             
-            positions = nrand.randint(0, min_len , size=num)
-            
-            for pos in positions:
-                seq1 = dna1.sequence
-                dna1.sequence = dna1.sequence[:pos] + dna2.sequence[pos:]
-                dna2.sequence = dna2.sequence[:pos] + seq1[pos:]
-        
+
+        if rng is None:
+            rng = RandomStream.default()
+
+        min_len = min(len(dna1.codes), len(dna2.codes))
+        num = rng.poisson(dna1.config.crossover_rate * min_len)
+
+        if min_len > 0 and num > 0:
+            positions = numpy.sort(rng.integers(0, min_len , size=num)).tolist()
+
+            codes1 = bytearray()
+            codes2 = bytearray()
+            swapped = False
+            for start, end in zip([0] + positions, positions + [None]):
+                if swapped:
+                    codes1 += dna2.codes[start:end]
+                    codes2 += dna1.codes[start:end]
+                else:
+                    codes1 += dna1.codes[start:end]
+                    codes2 += dna2.codes[start:end]
+                swapped = not swapped
+
+            dna1.codes = codes1
+            dna2.codes = codes2
+            dna1.__changed()
+            dna2.__changed()
 
     @staticmethod
-    def nucleotides():
+    def random_nucleotides(length, config = None, rng = None):
+        """
+        Returns *length* nucleotides drawn uniformly at random as a bytearray of codes.
+
+        Parameters
+        ----------
+        length: Integer
+        config: SimulationConfig, default = None
+        rng: RandomStream, default = None
+        """
+        if config is None:
+            config = SimulationConfig.default()
+        if rng is None:
+            rng = RandomStream.default()
+        alphabet = config.nucleotide_codes
+        return bytearray(alphabet[rng.integers(0, len(alphabet), size=length)].tobytes())
+
+    @staticmethod
+    def nucleotides(config = None):
         """Returns all the nucleotides that can be used in a dna string"""
-        cfg = AppSettings()
-        return(
-            cfg.behaviors + 
-            cfg.gene_delimiter + 
-            cfg.receptor_delimiter + 
-            cfg.wildcards
-            )
-    
+        if config is None:
+            config = SimulationConfig.default()
+        return config.nucleotides
+
     @staticmethod
-    def default_behavior():
+    def default_behavior(config = None):
         """Returns the last nucleotide which is the default behavior."""
-        cfg = AppSettings()
-        return cfg.behaviors[-1]
-        
\ No newline at end of file
+        if config is None:
+            config = SimulationConfig.default()
+        return config.default_behavior
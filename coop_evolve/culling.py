@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+
+
+class Culling:
+    """
+    Decides which agents survive culling, for Population and ArrayPopulation.
+
+    Each subpopulation over carrying capacity keeps a uniformly random subset
+    of *subpop_size* of its agents, picked in one draw rather than by removing
+    agents one at a time.
+    """
+
+    @staticmethod
+    def survivors(sizes, subpop_size, rngs):
+        """
+        Draws the survivors of every subpopulation.
+
+        Parameters
+        ----------
+        sizes: numpy.ndarray
+            The number of agents in each subpopulation in grid order. Agents
+            are numbered by subpopulation in the same order.
+        subpop_size: Integer
+            The carrying capacity.
+        rngs: RandomStream or List[RandomStream]
+            A stream for the whole grid, or one for each subpopulation.
+
+        Returns
+        -------
+        (order, sizes): (numpy.ndarray, numpy.ndarray)
+            The surviving agents in their original order and the new size of
+            each subpopulation.
+        """
+        sizes = numpy.asarray(sizes, dtype = numpy.int64)
+        crowded = sizes > subpop_size
+        keep = numpy.ones(sizes.sum(), dtype = bool)
+
+        if isinstance(rngs, list):
+            offsets = numpy.cumsum(sizes) - sizes
+            for deme in numpy.flatnonzero(crowded).tolist():
+                culled = rngs[deme].permutation(sizes[deme])[subpop_size:]
+                keep[offsets[deme] + culled] = False
+        else:
+            candidates = numpy.repeat(crowded, sizes)
+            keep[candidates] = rngs.group_ranks(sizes[crowded]) < subpop_size
+
+        return numpy.flatnonzero(keep), numpy.minimum(sizes, subpop_size)
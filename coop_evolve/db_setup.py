@@ -89,7 +89,8 @@ class DB_Setup:
                  relative_fitnesses BOOLEAN, \
                  migration_distance INTEGER, \
                  migration_survival REAL, \
-                 initial_sequence VARCHAR(256)\
+                 initial_sequence VARCHAR(256), \
+                 seed NUMERIC(40) \
                 )"
         
         cur.execute(query)
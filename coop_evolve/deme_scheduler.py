@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import heapq
+import multiprocessing
+import os
+import pickle
+import time
+import traceback
+
+import numpy
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.genotype_table import GenotypeTable
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.shared_arrays import SharedArrays
+
+
+class DemeScheduler:
+    """
+    Runs the subpopulation phases of an ArrayPopulation, playing, mutating and
+    mating, on worker processes, a task per subpopulation, with idle workers
+    stealing tasks from busy ones.
+
+    How long a subpopulation takes varies a lot, with its agents' genome
+    lengths and numbers of genes and, under absolute fitness, its size, so a
+    fixed split of the grid leaves workers idle. Before each phase the tasks
+    are dealt out longest first, each to the worker with the least work so
+    far, by how long they took in the phase's last run, or by subpopulation
+    size the first time. Each worker works through its own tasks from the
+    longest, and once out of them takes the shortest task left of the worker
+    with the most left, so what was misjudged evens out at the end of the
+    phase with as few steals as possible. The tasks are kept in shared memory
+    under a lock.
+
+    Workers read and write the population's arrays in shared memory, see
+    ArrayPopulation.share. Each subpopulation's random stream goes with its
+    task and is handed back, and sequences are interned in grid order, so the
+    results are the population's own whichever worker ran which task.
+
+    Reproduction, migration and culling are left to the population. Each is
+    drawn for the whole grid at once, see Reproduction, Migration and
+    Culling, and changes the subpopulations' sizes, so it lays the arrays
+    out anew, and migration moves agents between subpopulations, so none of
+    them splits into independent tasks.
+
+    `stats` holds for each phase's last run its `seconds`, each worker's
+    `busy` seconds, `tasks` and `steals`, and the `utilization`, the share of
+    the workers' time spent on tasks.
+
+    Parameters
+    ----------
+    workers: Integer, default = None
+        The number of worker processes, os.cpu_count() if not given. They are
+        started on first use.
+    """
+
+    phases = ('play', 'mutate', 'mate')
+
+    def __init__(self, workers = None):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.costs = {}
+        self.stats = {}
+        self.queue = None
+        self.lock = None
+        self.connections = []
+        self.processes = []
+        self.population = None
+        self.shared = []
+
+    def run(self, population, phase, *args):
+        """
+        Runs *phase* on every subpopulation of *population*.
+
+        Parameters
+        ----------
+        population: ArrayPopulation
+            With streams. It is put in shared memory, if it isn't already,
+            until the scheduler is closed.
+        phase: String
+            One of `phases`.
+        args
+            The phase's arguments, for play the number of interactions and
+            whether to play monomorphic subpopulations as one outcome.
+
+        Returns
+        -------
+        results: List
+            Each subpopulation's results in grid order. For play its behavior
+            counts and whether it was monomorphic, see ArrayPopulation._play_games
+            and _play_shared, otherwise the (index, sequence) changes to make,
+            see ArrayPopulation._mutations and _crossovers.
+        """
+        if phase not in self.phases:
+            raise ValueError(f"Unknown phase {phase}, expected one of {self.phases}")
+        start = time.perf_counter()
+        demes = population.width * population.length
+        if population.shared is None:
+            self.shared.append(population)
+        handle = population.share()
+
+        costs = self.costs.get(phase)
+        if costs is None or len(costs) != demes:
+            costs = population.sizes.astype(float)
+        tasks, ends = self.__deal(costs)
+
+        streams = [pickle.dumps(population.streams.stream(i, j, phase))
+                   for i in range(population.width) for j in range(population.length)]
+        if self.queue is None:
+            self.queue = SharedArrays()
+        self.queue['tasks'] = tasks
+        self.queue['ends'] = ends
+        self.queue['streams'] = numpy.frombuffer(b''.join(streams), dtype = numpy.uint8)
+        self.queue['stream_offsets'] = numpy.concatenate(
+            ([0], numpy.cumsum([len(stream) for stream in streams])))
+        if not self.processes:
+            self.__start()
+
+        setup = None
+        if population is not self.population:
+            setup = (population.width, population.length, population.subpop_size,
+                     population.config, population.streams.seed, population.streams.origin)
+            self.population = population
+        for connection in self.connections:
+            connection.send(('run', phase, args, handle, self.queue.handle(),
+                             population.table.compactions, setup))
+
+        results = [None] * demes
+        costs = numpy.zeros(demes)
+        stats = {name: numpy.zeros(self.workers) for name in ('busy', 'tasks', 'steals')}
+        for worker, connection in enumerate(self.connections):
+            status, reply = connection.recv()
+            if status == 'error':
+                self.close()
+                raise RuntimeError(f"A worker failed:\n{reply}")
+            for deme, (result, stream, seconds) in reply['results'].items():
+                i, j = divmod(deme, population.length)
+                population.streams.replace(i, j, phase, pickle.loads(stream))
+                results[deme] = result
+                costs[deme] = seconds
+            for name in stats:
+                stats[name][worker] = reply[name]
+
+        self.costs[phase] = costs
+        stats['seconds'] = time.perf_counter() - start
+        stats['utilization'] = float(stats['busy'].sum()) / (self.workers * stats['seconds'])
+        self.stats[phase] = stats
+        return results
+
+    def close(self):
+        """
+        Stops the worker processes, frees the task queue and moves the
+        populations it put in shared memory back out.
+        """
+        for connection, process in zip(self.connections, self.processes):
+            if process.is_alive():
+                try:
+                    connection.send(('close',))
+                except (BrokenPipeError, OSError):
+                    pass
+            process.join(timeout = 5)
+            if process.is_alive():
+                process.terminate()
+        self.connections = []
+        self.processes = []
+        self.population = None
+        if self.queue is not None:
+            self.queue.close()
+            self.queue = None
+        for population in self.shared:
+            population.unshare()
+        self.shared = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __deal(self, costs):
+        # Deals the tasks out longest first to the least loaded worker,
+        # returning every worker's tasks back to back, longest first, and
+        # where each worker's start and end.
+        loads = [(0.0, worker) for worker in range(self.workers)]
+        dealt = [[] for _ in range(self.workers)]
+        for deme in numpy.argsort(-costs, kind = 'stable').tolist():
+            load, worker = heapq.heappop(loads)
+            dealt[worker].append(deme)
+            heapq.heappush(loads, (load + costs[deme], worker))
+
+        ends = numpy.cumsum([0] + [len(tasks) for tasks in dealt])
+        return (numpy.array([deme for tasks in dealt for deme in tasks], dtype = numpy.int64),
+                numpy.stack((ends[:-1], ends[1:]), axis = 1).astype(numpy.int64))
+
+    def __start(self):
+        # Workers are started once shared memory is in use, see
+        # SharedArrays.attach.
+        context = multiprocessing.get_context()
+        self.lock = context.Lock()
+        for worker in range(self.workers):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(target = DemeScheduler._work,
+                                      args = (worker_connection, worker, self.lock),
+                                      daemon = True)
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    @staticmethod
+    def _work(connection, worker, lock):
+        # The loop each worker process runs, keeping a copy of the genotype
+        # table up to date between phases.
+        setup = None
+        table = None
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                return
+            if message[0] == 'close':
+                return
+            _, phase, args, handle, queue_handle, compactions, new_setup = message
+            try:
+                if new_setup is not None:
+                    setup = new_setup
+                    table = None
+                if table is None or table.compactions != compactions:
+                    table = GenotypeTable(setup[3])
+                    table.compactions = compactions
+                reply = DemeScheduler._phase(
+                    worker, lock, phase, args, handle, queue_handle, setup, table)
+                connection.send(('ok', reply))
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+
+    @staticmethod
+    def _phase(worker, lock, phase, args, handle, queue_handle, setup, table):
+        # Attaches to the population and the queue for the phase's tasks.
+        arrays = SharedArrays.attach(handle)
+        queue = SharedArrays.attach(queue_handle)
+        try:
+            return DemeScheduler._tasks(worker, lock, phase, args, arrays, queue, setup, table)
+        finally:
+            arrays.close()
+            queue.close()
+
+    @staticmethod
+    def _tasks(worker, lock, phase, args, arrays, queue, setup, table):
+        # Runs tasks until none are left, its own and then stolen ones.
+        width, length, subpop_size, config, seed, origin = setup
+        codes, offsets = arrays['sequence_codes'], arrays['sequence_offsets']
+        known = len(table)
+        if len(offsets) - 1 > known:
+            start = offsets[known]
+            for sequence in GenotypeTable.unpacked(codes[start:offsets[-1]],
+                                                   offsets[known:] - start):
+                table.intern(sequence)
+
+        streams = DemeStreams(seed, origin = origin)
+        population = ArrayPopulation.attached(arrays, table, width, length, subpop_size,
+                                              config, streams)
+        reply = {'results': {}, 'busy': 0.0, 'tasks': 0, 'steals': 0}
+        stream_offsets = queue['stream_offsets']
+        while True:
+            deme, stolen = DemeScheduler._take(lock, queue['tasks'], queue['ends'], worker)
+            if deme is None:
+                return reply
+            start = time.perf_counter()
+            i, j = divmod(deme, length)
+            streams.replace(i, j, phase, pickle.loads(
+                queue['streams'][stream_offsets[deme]:stream_offsets[deme + 1]].tobytes()))
+            if phase == 'play':
+                interactions, monomorphic = args
+                counts = population._play_shared(i, j, interactions) if monomorphic else None
+                result = ((population._play_games(i, j, interactions), False) if counts is None
+                          else (counts.tolist(), True))
+            elif phase == 'mutate':
+                result = population._mutations(i, j)
+            else:
+                result = population._crossovers(i, j)
+            seconds = time.perf_counter() - start
+            reply['results'][deme] = (result, pickle.dumps(streams.stream(i, j, phase)), seconds)
+            reply['busy'] += seconds
+            reply['tasks'] += 1
+            reply['steals'] += stolen
+
+    @staticmethod
+    def _take(lock, tasks, ends, worker):
+        # Returns the worker's next task, or the shortest left of the worker
+        # with the most left and True for a steal, or None once all are taken.
+        with lock:
+            head, tail = ends[worker].tolist()
+            if head < tail:
+                ends[worker, 0] += 1
+                return int(tasks[head]), False
+            left = ends[:, 1] - ends[:, 0]
+            victim = int(left.argmax())
+            if left[victim] == 0:
+                return None, False
+            ends[victim, 1] -= 1
+            return int(tasks[ends[victim, 1]]), True
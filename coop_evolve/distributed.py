@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from multiprocessing.connection import Client
+from multiprocessing.connection import Listener
+
+import numpy
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.tiled_population import TiledPopulation
+
+AUTHKEY_VARIABLE = 'COOP_EVOLVE_AUTHKEY'
+
+
+class MigrantCodec:
+    """
+    Packs the migrants one node sends another into compact binary messages.
+
+    A message carries each distinct sequence once, numbered in the order
+    it first appears, and a migrant goes as its destination and source
+    subpopulations and the number of its sequence. Numbering restarts with
+    every message, one a generation, so neither end keeps sequences from
+    earlier generations. Sequences written with at most 16 nucleotides, as
+    the config's are, go at 4 bits a character. A message is
+
+        sequences and migrants        2 uint32
+        sequences' lengths            uint32 each
+        sequences                     back to back, 4 bits a character and
+                                      padded to a whole byte, or ascii
+        destinations                  int32 each
+        sources                       int32 each
+        sequence numbers              uint32 each
+
+    all little endian. One codec encodes a link's messages, another with the
+    same nucleotides decodes them at the far end.
+
+    Parameters
+    ----------
+    nucleotides: String, default = None
+        The characters sequences are written with, as SimulationConfig's. If
+        not given, or more than 16, sequences are sent as ascii.
+    """
+
+    def __init__(self, nucleotides = None):
+        self.alphabet = None
+        if nucleotides is not None and len(nucleotides) <= 16:
+            self.alphabet = numpy.frombuffer(nucleotides.encode('ascii'), dtype = numpy.uint8)
+            self.codes = numpy.full(256, 255, dtype = numpy.uint8)
+            self.codes[self.alphabet] = numpy.arange(len(self.alphabet))
+
+    def encode(self, migrants):
+        """
+        Packs migrants, as returned by emigrate.
+
+        Parameters
+        ----------
+        migrants: List[(Integer, Integer, String)]
+            The destination and source subpopulations and sequence of each
+            migrant.
+
+        Returns
+        -------
+        message: Bytes
+        """
+        known = {}
+        new = []
+        numbers = numpy.empty(len(migrants), dtype = '<u4')
+        for i, (_, _, sequence) in enumerate(migrants):
+            number = known.get(sequence)
+            if number is None:
+                number = len(known)
+                known[sequence] = number
+                new.append(sequence)
+            numbers[i] = number
+
+        demes = numpy.array([migrant[:2] for migrant in migrants],
+                            dtype = '<i4').reshape(-1, 2)
+        return b''.join([
+            struct.pack('<II', len(new), len(migrants)),
+            numpy.array([len(sequence) for sequence in new], dtype = '<u4').tobytes(),
+            self.__pack(''.join(new)),
+            demes[:, 0].tobytes(),
+            demes[:, 1].tobytes(),
+            numbers.tobytes()
+        ])
+
+    def decode(self, message):
+        """
+        Unpacks a message from the encoding end of the link.
+
+        Parameters
+        ----------
+        message: Bytes
+
+        Returns
+        -------
+        migrants: List[(Integer, Integer, String)]
+        """
+        new, count = struct.unpack_from('<II', message)
+        offset = 8
+        lengths = numpy.frombuffer(message, dtype = '<u4', count = new, offset = offset)
+        offset += 4 * new
+        characters = int(lengths.sum())
+        size = characters if self.alphabet is None else (characters + 1) // 2
+        text = self.__unpack(message[offset:offset + size], characters)
+        offset += size
+        sequences = []
+        start = 0
+        for length in lengths.tolist():
+            sequences.append(text[start:start + length])
+            start += length
+
+        destinations, sources, numbers = (
+            numpy.frombuffer(message, dtype = dtype, count = count, offset = offset + 4 * count * k)
+            for k, dtype in enumerate(['<i4', '<i4', '<u4'])
+        )
+        return [(destination, source, sequences[number])
+                for destination, source, number
+                in zip(destinations.tolist(), sources.tolist(), numbers.tolist())]
+
+    def __pack(self, text):
+        data = text.encode('ascii')
+        if self.alphabet is None:
+            return data
+        codes = self.codes[numpy.frombuffer(data, dtype = numpy.uint8)]
+        if (codes == 255).any():
+            raise ValueError("Sequences have characters other than the nucleotides")
+        if len(codes) % 2:
+            codes = numpy.append(codes, 0)
+        return (codes[0::2] << 4 | codes[1::2]).astype(numpy.uint8).tobytes()
+
+    def __unpack(self, data, characters):
+        if self.alphabet is None:
+            return data.decode('ascii')
+        packed = numpy.frombuffer(data, dtype = numpy.uint8)
+        codes = numpy.empty(2 * len(packed), dtype = numpy.uint8)
+        codes[0::2] = packed >> 4
+        codes[1::2] = packed & 15
+        return self.alphabet[codes[:characters]].tobytes().decode('ascii')
+
+
+class GridCoordinator(TiledPopulation):
+    """
+    A TiledPopulation whose tiles are run by node processes, on this host or
+    others, connected over TCP.
+
+    The coordinator listens on *address*. Each node connects to it, is given
+    a tile, builds the tile's population and connects to every other node.
+    Nodes send each other their migrants directly, see MigrantCodec, and
+    the coordinator sends the commands, waits for every node to finish a
+    generation before starting the next and aggregates their data as
+    TiledPopulation does, so a run gives the same results as one on a single
+    host with the same seed.
+
+    Connections are authenticated with a shared key, and messages other than
+    migrants are pickled, so nodes should only be run on trusted hosts. Nodes
+    on other hosts are started with
+
+        COOP_EVOLVE_AUTHKEY=<key in hex> python -m coop_evolve.distributed HOST PORT
+
+    pointing at the coordinator's address, and must have the same version of
+    coop_evolve installed.
+
+    Parameters
+    ----------
+    width, length, subpop_size, sequence, config, streams, tiles, storage, batched_games,
+    monomorphic_games
+        As TiledPopulation. There is one node for each tile.
+    address: (String, Integer), default = ('127.0.0.1', 0)
+        The address to listen for nodes on, a free port if 0.
+    authkey: Bytes, default = None
+        The key nodes must have, random if not given.
+    launch: Boolean, default = True
+        If true the nodes are started as processes on this host, otherwise
+        they are waited for.
+    timeout: Float, default = None
+        The seconds to wait for all nodes to connect, by default a minute if
+        they were launched and indefinitely otherwise.
+    """
+
+    def __init__(self, width, length, subpop_size, sequence = None, config = None,
+                 streams = None, tiles = (2, 2), storage = ArrayPopulation,
+                 batched_games = False, monomorphic_games = False,
+                 address = ('127.0.0.1', 0), authkey = None, launch = True, timeout = None):
+        self.authkey = os.urandom(16) if authkey is None else authkey
+        self.listener = Listener(address, authkey = self.authkey)
+        self.address = self.listener.address
+        self.launch = launch
+        self.timeout = 60 if timeout is None and launch else timeout
+        super().__init__(width, length, subpop_size, sequence = sequence, config = config,
+                         streams = streams, tiles = tiles, storage = storage,
+                         batched_games = batched_games, monomorphic_games = monomorphic_games)
+
+    def _start(self, sequence, storage, options):
+        if self.launch:
+            environment = dict(os.environ)
+            environment[AUTHKEY_VARIABLE] = self.authkey.hex()
+            package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            environment['PYTHONPATH'] = os.pathsep.join(
+                [package] + [path for path in [os.environ.get('PYTHONPATH')] if path])
+            host, port = self.address
+            for _ in self.bounds:
+                self.workers.append(subprocess.Popen(
+                    [sys.executable, '-m', 'coop_evolve.distributed', host, str(port)],
+                    env = environment))
+
+        # Accepting blocks, so it's done aside to give up on missing nodes.
+        nodes = []
+
+        def accept():
+            for _ in self.bounds:
+                nodes.append(self.listener.accept())
+
+        acceptor = threading.Thread(target = accept, daemon = True)
+        acceptor.start()
+        acceptor.join(self.timeout)
+        if len(nodes) < len(self.bounds):
+            self.connections = nodes
+            self.close()
+            raise TimeoutError(f"{len(nodes)} of {len(self.bounds)} nodes connected")
+
+        self.connections = nodes
+        try:
+            peers = [connection.recv() for connection in nodes]
+            for tile, (connection, bounds) in enumerate(zip(nodes, self.bounds)):
+                connection.send((tile, bounds, self.owners, self.subpop_size, sequence,
+                                 self.config, self.streams.seed, storage, options, peers))
+        except (EOFError, OSError):
+            self.close()
+            raise
+
+    def close(self):
+        """ Stops the nodes and the listener. """
+        for connection in self.connections:
+            try:
+                connection.send(('close',))
+                connection.close()
+            except (BrokenPipeError, OSError):
+                pass
+        for node in self.workers:
+            try:
+                node.wait(timeout = 5)
+            except subprocess.TimeoutExpired:
+                node.kill()
+        self.connections = []
+        self.workers = []
+        self.listener.close()
+
+    @staticmethod
+    def node(address, authkey, timeout = 60):
+        """
+        Runs a node: connects to the coordinator at *address*, holds the
+        tile it is given and serves its commands until it closes.
+
+        Parameters
+        ----------
+        address: (String, Integer)
+            The coordinator's address.
+        authkey: Bytes
+            The coordinator's key.
+        timeout: Float, default = 60
+            The seconds to keep trying to reach the coordinator, so nodes can
+            be started before it.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                coordinator = Client(tuple(address), authkey = authkey)
+                break
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+        # Other nodes reach this one on the interface it reaches the
+        # coordinator through.
+        with socket.socket(fileno = os.dup(coordinator.fileno())) as connected:
+            host = connected.getsockname()[0]
+        listener = Listener((host, 0), authkey = authkey)
+        coordinator.send(listener.address)
+        try:
+            (tile, bounds, owners, subpop_size, sequence, config, seed, storage,
+             options, addresses) = coordinator.recv()
+        except EOFError:
+            listener.close()
+            return
+
+        peers = {}
+        try:
+            # Connecting to lower tiles and accepting the higher ones can't
+            # deadlock, the lowest tile only accepts.
+            for other in range(tile):
+                peer = Client(addresses[other], authkey = authkey)
+                peer.send(tile)
+                peers[other] = peer
+            for _ in range(tile + 1, len(addresses)):
+                peer = listener.accept()
+                peers[peer.recv()] = peer
+        except Exception:
+            coordinator.send(('error', traceback.format_exc()))
+            return
+        finally:
+            listener.close()
+
+        encoders = {other: MigrantCodec(config.nucleotides) for other in peers}
+        decoders = {other: MigrantCodec(config.nucleotides) for other in peers}
+
+        def exchange(outgoing):
+            # Sending aside, so two nodes sending each other large messages
+            # don't both block.
+            def send():
+                for other, peer in peers.items():
+                    peer.send_bytes(encoders[other].encode(outgoing[other]))
+
+            sender = threading.Thread(target = send)
+            sender.start()
+            arrivals = []
+            for other, peer in peers.items():
+                arrivals.extend(decoders[other].decode(peer.recv_bytes()))
+            sender.join()
+            return arrivals
+
+        try:
+            TiledPopulation._serve(coordinator, tile, bounds, owners, subpop_size, sequence,
+                                   config, seed, storage, options, exchange)
+        finally:
+            for peer in peers.values():
+                peer.close()
+            coordinator.close()
+
+
+if __name__ == '__main__':
+    GridCoordinator.node((sys.argv[1], int(sys.argv[2])),
+                         bytes.fromhex(os.environ[AUTHKEY_VARIABLE]))
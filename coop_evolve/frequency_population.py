@@ -0,0 +1,501 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.genotype_table import GenotypeTable
+from coop_evolve.migration import Migration
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.simulation_config import SimulationConfig
+
+class FrequencyPopulation:
+    """
+    A width by length grid of subpopulations stored as genotype counts.
+
+    Agents within a subpopulation are exchangeable, so each subpopulation is
+    kept as a map from genotype id, see GenotypeTable, to the number of agents
+    with it, and every phase draws on the counts. The cost of a phase grows
+    with the number of distinct genotypes rather than the number of agents,
+    except for mutation and mating, which act on individual agents.
+
+    Payoffs are kept per genotype, so every agent with a genotype has the
+    genotype's mean payoff per move as its fitness.
+
+    Parameters
+    ----------
+    width, length: Integer
+        The dimensions of the grid.
+    subpop_size: Integer
+        The number of agents in each subpopulation.
+    sequence: String, default = None
+        The initial sequence of every agent, random if not given.
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    rng: RandomStream, default = None
+        The source of every random number the population uses,
+        RandomStream.default() if not given.
+    streams: DemeStreams, default = None
+        If given each subpopulation draws from its own stream for each phase
+        instead of sharing *rng*.
+    """
+
+    def __init__(self, width, length, subpop_size, sequence = None, config = None, rng = None,
+                 streams = None):
+        self.width = width
+        self.length = length
+        self.subpop_size = subpop_size
+        self.config = SimulationConfig.default() if config is None else config
+        self.rng = RandomStream.default() if rng is None else rng
+        self.streams = streams
+        self.table = GenotypeTable(self.config)
+
+        self.counts = []
+        for i in range(self.width):
+            for j in range(self.length):
+                rng = self.__rng(i, j, 'init')
+                counts = {}
+                for k in range(self.subpop_size):
+                    genotype = self.table.intern(Chromosome(sequence, self.config, rng).sequence)
+                    counts[genotype] = counts.get(genotype, 0) + 1
+                self.counts.append(counts)
+
+        self.reset()
+        self._compacted = len(self.table)
+
+    def popsize(self):
+        """
+        The number of agents currently in the population.
+
+        Returns
+        -------
+        popsize: Integer
+        """
+        return sum(sum(counts.values()) for counts in self.counts)
+
+    def fitness(self):
+        """
+        Returns the mean payoff per move of each genotype in each subpopulation,
+        or the mean of the payoffs for genotypes that haven't played.
+
+        Returns
+        -------
+        fitness: List[Dict{Integer: Float}]
+            The fitness of each genotype id, a dict per subpopulation in grid
+            order.
+        """
+        fitness = []
+        for counts, sums, plays in zip(self.counts, self.payoff_sums, self.play_counts):
+            fitness.append({
+                genotype: sums[genotype]/plays[genotype] if plays.get(genotype) else
+                          self.config.mean_payoff
+                for genotype in counts
+            })
+        return fitness
+
+    def play_game(self, interactions = 1):
+        """
+        Agents play the game with others from the same subpopulation.
+
+        Each subpopulation plays *interactions* * *subpop_size* games between
+        pairs of distinct agents, as Population.play_game. Games are tallied by
+        the ordered pair of genotypes playing, see `__pairings`, and each
+        pair's games played together with PairOutcome.play_many, so a
+        monomorphic subpopulation only plays out one pair. Genotypes with the
+        same phenotype share their outcomes, so a subpopulation with one
+        phenotype is counted as monomorphic.
+
+        Parameters
+        ---------
+        interactions: Integer, default = 1
+            The number of interactions per agent.
+
+        Returns
+        -------
+        dict{subpop_counts: List[List[Dict]], pop_counts[Dict], monomorphic_demes: Integer}
+            A tally of how many times each behavior was exhibited, and how
+            many subpopulations were monomorphic, as Population.play_game.
+        """
+        behaviors = self.config.behaviors
+        monomorphic = sum(
+            len({self.table.phenotype(genotype) for genotype in counts}) == 1
+            for counts in self.counts)
+
+        behavior_counts = []
+        pop_counts = numpy.zeros(len(behaviors), dtype = numpy.int64)
+        for i in range(self.width):
+            row = []
+            for j in range(self.length):
+                deme = i * self.length + j
+                genotypes = list(self.counts[deme])
+                counts = numpy.array([self.counts[deme][genotype] for genotype in genotypes])
+                sums = self.payoff_sums[deme]
+                plays = self.play_counts[deme]
+                tally = numpy.zeros(len(behaviors), dtype = numpy.int64)
+
+                rng = self.__rng(i, j, 'play')
+                for (genotype1, genotype2), games in self.__pairings(
+                        genotypes, counts, interactions * self.subpop_size, rng):
+                    results = self.table.outcome(genotype1, genotype2).play_many(games, rng)
+                    sums[genotype1] = sums.get(genotype1, 0) + results['totals1']
+                    sums[genotype2] = sums.get(genotype2, 0) + results['totals2']
+                    plays[genotype1] = plays.get(genotype1, 0) + results['moves']
+                    plays[genotype2] = plays.get(genotype2, 0) + results['moves']
+                    tally += results['counts']
+
+                pop_counts += tally
+                row.append(dict(zip(behaviors, tally.tolist())))
+            behavior_counts.append(row)
+
+        return {
+            'subpop_counts': behavior_counts,
+            'pop_counts': dict(zip(behaviors, pop_counts.tolist())),
+            'monomorphic_demes': monomorphic
+        }
+
+    def mutate(self):
+        """
+        Mutates each agent in the population.
+
+        The number of agents of each genotype that mutate is a binomial draw
+        with Chromosome.mutation_probability and only those are mutated, with
+        Chromosome.mutants. Each takes its share of its genotype's payoffs.
+        """
+        for i in range(self.width):
+            for j in range(self.length):
+                deme = i * self.length + j
+                counts = self.counts[deme]
+                sums = self.payoff_sums[deme]
+                plays = self.play_counts[deme]
+                rng = self.__rng(i, j, 'mutate')
+
+                mutating = []
+                for genotype, count in list(counts.items()):
+                    mutants = int(rng.binomial(count, Chromosome.mutation_probability(
+                        len(self.table.chromosome(genotype)), self.config)))
+                    if mutants == 0:
+                        continue
+
+                    share = (sums.get(genotype, 0)/count, plays.get(genotype, 0)/count)
+                    sums[genotype] = share[0] * (count - mutants)
+                    plays[genotype] = share[1] * (count - mutants)
+                    self.__remove(deme, genotype, mutants)
+                    mutating.append((genotype, mutants, share))
+
+                children = Chromosome.mutants(
+                    [self.table.chromosome(genotype) for genotype, _, _ in mutating],
+                    [mutants for _, mutants, _ in mutating], self.config, rng)
+                for (_, _, share), mutants in zip(mutating, children):
+                    for dna in mutants:
+                        mutant = self.table.intern(dna.sequence)
+                        counts[mutant] = counts.get(mutant, 0) + 1
+                        sums[mutant] = sums.get(mutant, 0) + share[0]
+                        plays[mutant] = plays.get(mutant, 0) + share[1]
+
+    def mate(self):
+        """
+        Individuals within each subpopulation can swap slices of their chromosome
+        with subpopulation mates, as Population.mate.
+        """
+        cfg = self.config
+        for i in range(self.width):
+            for j in range(self.length):
+                deme = i * self.length + j
+                counts = self.counts[deme]
+                agents = sum(counts.values())
+                if agents < 2:
+                    continue
+
+                rng = self.__rng(i, j, 'mate')
+                pairs = int(round(self.subpop_size * cfg.mating_rate * 0.5))
+                firsts = rng.integers(0, agents, pairs)
+                seconds = (firsts + rng.integers(1, agents, pairs)) % agents
+
+                # Agents are numbered through the genotypes in turn, those that
+                # have already crossed over are tracked on their own.
+                genotypes = list(counts)
+                ends = numpy.cumsum([counts[genotype] for genotype in genotypes])
+                crossed = {}
+                for index1, index2 in zip(firsts.tolist(), seconds.tolist()):
+                    parents = [
+                        crossed[index] if index in crossed else
+                        genotypes[int(numpy.searchsorted(ends, index, side = 'right'))]
+                        for index in (index1, index2)
+                    ]
+                    dna1 = Chromosome(self.table.sequence(parents[0]), cfg)
+                    dna2 = Chromosome(self.table.sequence(parents[1]), cfg)
+                    Chromosome.crossover(dna1, dna2, rng)
+                    crossed[index1] = self.table.intern(dna1.sequence)
+                    crossed[index2] = self.table.intern(dna2.sequence)
+                    for parent, child in zip(parents, (crossed[index1], crossed[index2])):
+                        self.__remove(deme, parent, 1)
+                        counts[child] = counts.get(child, 0) + 1
+
+    def reproduce(self, fecundity = 1, relative_fitnesses = True):
+        """
+        Agents reproduce based on their fitness, as Population.reproduce.
+
+        With relative fitnesses each subpopulation's *fecundity* * *subpop_size*
+        offspring are shared among its genotypes by one multinomial draw with
+        probabilities count * fitness/sum(count * fitness), or in proportion
+        to count if every genotype has zero fitness. With absolute fitness the
+        offspring of a genotype are a binomial draw from *fecundity* * count
+        chances, each succeeding with probability fitness/max_payoff.
+
+        Parameters
+        ----------
+        fecundity: Integer, default = 1
+            The average number of offspring per agent.
+        relative_fitnesses: Boolean, default = True
+            If true agents reproduce in proportion to their fitness relative to their
+            subpopulation, if false with probability fitness/max_payoff.
+
+        Returns
+        -------
+        mean_fitnesses: numpy.ndarray
+            The mean fitness of each subpopulation, indexed [x][y], as
+            Reproduction.relative and Reproduction.absolute.
+        """
+        fitness = self.fitness()
+        mean_fitnesses = numpy.zeros(self.width * self.length)
+        for i in range(self.width):
+            for j in range(self.length):
+                deme = i * self.length + j
+                genotypes = list(self.counts[deme])
+                counts = numpy.array([self.counts[deme][genotype] for genotype in genotypes],
+                                     dtype = numpy.int64)
+                fitnesses = numpy.array([fitness[deme][genotype] for genotype in genotypes])
+                rng = self.__rng(i, j, 'reproduce')
+
+                if relative_fitnesses:
+                    total = (counts * fitnesses).sum()
+                    if len(genotypes) == 0 or total == 0:
+                        mean_fitnesses[deme] = 1/self.subpop_size
+                        if len(genotypes) == 0:
+                            continue
+                        probabilities = counts/counts.sum()
+                    else:
+                        mean_fitnesses[deme] = total/self.subpop_size
+                        probabilities = counts * fitnesses/total
+                    births = rng.multinomial(fecundity * self.subpop_size, probabilities)
+                else:
+                    probabilities = numpy.minimum(fitnesses/self.config.max_payoff, 1)
+                    if len(genotypes) > 0:
+                        mean_fitnesses[deme] = (counts * probabilities).sum()/counts.sum()
+                    births = rng.binomial(fecundity * counts, probabilities)
+
+                for genotype, born in zip(genotypes, births.tolist()):
+                    self.counts[deme][genotype] += born
+
+        return mean_fitnesses.reshape(self.width, self.length)
+
+    def migrate(self, survival = 0.1, distance = 1):
+        """
+        Surplus agents leave their subpopulation and, if they survive, move a
+        poisson distributed distance in both x and y, as Population.migrate.
+
+        The leavers of each genotype are a multivariate hypergeometric draw and
+        the survivors among them a binomial draw. Only the survivors are moved
+        one by one, with displacements drawn as in Migration.
+
+        Parameters
+        ----------
+        survival: Float, default = 0.1
+            The probability the agent survives migration.
+        distance: Integer, default = 1
+            The average distance an agent moves in both X and Y directions.
+
+        Raises
+        ------
+        ValueError
+            If *survival* is not a probability.
+        """
+        Migration.check_survival(survival)
+        arrivals = [{} for _ in self.counts]
+        for i in range(self.width):
+            for j in range(self.length):
+                deme = i * self.length + j
+                genotypes = list(self.counts[deme])
+                counts = numpy.array([self.counts[deme][genotype] for genotype in genotypes],
+                                     dtype = numpy.int64)
+                surplus = int(counts.sum()) - self.subpop_size
+                if surplus <= 0:
+                    continue
+
+                rng = self.__rng(i, j, 'migrate')
+                leaving = rng.multivariate_hypergeometric(counts, surplus)
+                survivors = rng.binomial(leaving, survival)
+                for genotype, left in zip(genotypes, leaving.tolist()):
+                    self.__remove(deme, genotype, left)
+
+                movers = numpy.repeat(numpy.array(genotypes, dtype = numpy.int64), survivors)
+                x = i + Migration.displacements(distance, len(movers), rng)
+                y = j + Migration.displacements(distance, len(movers), rng)
+                landed = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.length)
+                for genotype, destination in zip(movers[landed].tolist(),
+                                                 (x[landed] * self.length + y[landed]).tolist()):
+                    arrived = arrivals[destination]
+                    arrived[genotype] = arrived.get(genotype, 0) + 1
+
+        for counts, arrived in zip(self.counts, arrivals):
+            for genotype, count in arrived.items():
+                counts[genotype] = counts.get(genotype, 0) + count
+
+    def cull(self):
+        """
+        Randomly removes agents from subpopulations until they are down to
+        carrying capacity, keeping a multivariate hypergeometric draw of each
+        genotype.
+        """
+        for i in range(self.width):
+            for j in range(self.length):
+                deme = i * self.length + j
+                genotypes = list(self.counts[deme])
+                counts = numpy.array([self.counts[deme][genotype] for genotype in genotypes],
+                                     dtype = numpy.int64)
+                if counts.sum() <= self.subpop_size:
+                    continue
+
+                rng = self.__rng(i, j, 'cull')
+                kept = rng.multivariate_hypergeometric(counts, self.subpop_size)
+                for genotype, count, remaining in zip(genotypes, counts.tolist(), kept.tolist()):
+                    self.__remove(deme, genotype, count - remaining)
+
+    def generation(self, interactions = 1,
+                         fecundity = 1,
+                         relative_fitnesses = True,
+                         migration_distance = 1,
+                         migration_survival = 0.1,
+                         migrate = None):
+        """
+        Goes through one full lifecycle of a population, as Population.generation,
+        and tidies up the genotype table, see `tidy`.
+        """
+
+        if self.streams is not None:
+            self.streams.next_generation()
+        self.reset()
+        behavior_data = self.play_game(interactions)
+        self.mutate()
+        fitness_data = self.reproduce(fecundity, relative_fitnesses)
+        if migrate is None:
+            self.migrate(survival = migration_survival, distance = migration_distance)
+        else:
+            migrate(self)
+        self.cull()
+        self.mate()
+        self.tidy()
+
+        return {
+            'behavior_data': behavior_data,
+            'fitness_data': fitness_data,
+            'monomorphic_demes': behavior_data['monomorphic_demes']
+        }
+
+    def tidy(self):
+        """
+        Drops genotypes that have died out from the table, see `compact`, once
+        it has doubled in size since it was last compacted. Called at the end
+        of each generation.
+        """
+        if len(self.table) > 2 * self._compacted:
+            self.compact()
+
+    def compact(self):
+        """ Drops genotypes no agent has any more from the genotype table. """
+        genotypes = numpy.array(sorted(set().union(*self.counts)), dtype = numpy.int64)
+        renumbered = dict(zip(genotypes.tolist(), self.table.compact(genotypes).tolist()))
+        self.counts = [
+            {renumbered[genotype]: count for genotype, count in counts.items()}
+            for counts in self.counts
+        ]
+        self.reset()
+        self._compacted = len(self.table)
+
+    def census(self, phenotypes = False):
+        """
+        Counts the agents with each sequence.
+
+        Parameters
+        ----------
+        phenotypes: Boolean, default = False
+            Counts the agents with each phenotype instead, see
+            Strategy.phenotype.
+
+        Returns
+        -------
+        dict{subpop_data: List[List[Dict]], pop_data: Dict}
+            The counts by sequence or phenotype in each subpopulation and in
+            the whole population.
+        """
+        subpop_data = []
+        pop_data = {}
+        for i in range(self.width):
+            row = []
+            for j in range(self.length):
+                subpop_counts = {}
+                for genotype, count in self.counts[i * self.length + j].items():
+                    key = self.table.phenotype(genotype) if phenotypes \
+                        else self.table.sequence(genotype)
+                    subpop_counts[key] = subpop_counts.get(key, 0) + count
+                    pop_data[key] = pop_data.get(key, 0) + count
+                row.append(subpop_counts)
+            subpop_data.append(row)
+
+        return({'subpop_data': subpop_data, 'pop_data': pop_data})
+
+    def reset(self):
+        """
+        Resets the population to starting state for the next generation in the simulation.
+        """
+        self.payoff_sums = [{} for _ in self.counts]
+        self.play_counts = [{} for _ in self.counts]
+
+    def __rng(self, i, j, phase):
+        # The stream subpopulation (i, j) draws from in *phase*.
+        if self.streams is None:
+            return self.rng
+        return self.streams.stream(i, j, phase)
+
+    def __remove(self, deme, genotype, count):
+        # Takes *count* agents of *genotype* out of *deme*, dropping the
+        # genotype when none are left.
+        counts = self.counts[deme]
+        counts[genotype] -= count
+        if counts[genotype] == 0:
+            del counts[genotype]
+
+    def __pairings(self, genotypes, counts, games, rng):
+        """
+        Draws the genotypes of the players in *games* games between distinct
+        agents, returning the number of games between each ordered pair of
+        genotypes that play.
+
+        With few genotypes the games are shared among every ordered pair by
+        one multinomial draw, with many the players are drawn game by game.
+        """
+        agents = int(counts.sum())
+        if agents < 2 or games == 0:
+            return []
+
+        if len(genotypes)**2 <= games:
+            pairs = (numpy.outer(counts, counts) - numpy.diag(counts)).ravel()
+            tallies = rng.multinomial(games, pairs/(agents * (agents - 1)))
+            played = numpy.flatnonzero(tallies)
+            firsts, seconds = numpy.divmod(played, len(genotypes))
+            tallies = tallies[played]
+        else:
+            # Agents are numbered through the genotypes in turn.
+            ends = numpy.cumsum(counts)
+            index1 = rng.integers(0, agents, games)
+            index2 = (index1 + rng.integers(1, agents, games)) % agents
+            firsts = numpy.searchsorted(ends, index1, side = 'right')
+            seconds = numpy.searchsorted(ends, index2, side = 'right')
+            played, tallies = numpy.unique(
+                firsts * len(genotypes) + seconds, return_counts = True)
+            firsts, seconds = numpy.divmod(played, len(genotypes))
+
+        return [
+            ((genotypes[first], genotypes[second]), games)
+            for first, second, games in zip(firsts.tolist(), seconds.tolist(), tallies.tolist())
+        ]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.interaction import InteractionCache
+from coop_evolve.simulation_config import SimulationConfig
+
+
+class GenotypeTable:
+    """
+    The distinct sequences in a population, each interned once and referred to
+    by an integer id.
+
+    Agents stored as ids share their genotype's chromosome and compiled
+    strategy, so the per agent cost is one integer. Ids are handed out in the
+    order sequences are first seen and stay valid until the table is
+    compacted, which `compactions` counts.
+
+    Parameters
+    ----------
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    """
+
+    def __init__(self, config = None):
+        self.config = SimulationConfig.default() if config is None else config
+        self.ids = {}
+        self.sequences = []
+        self.chromosomes = []
+        self.compactions = 0
+
+    def intern(self, sequence):
+        """
+        Returns the id of *sequence*, adding it to the table if it is new.
+
+        Parameters
+        ----------
+        sequence: String
+
+        Returns
+        -------
+        genotype: Integer
+        """
+        genotype = self.ids.get(sequence)
+        if genotype is None:
+            genotype = len(self.sequences)
+            self.ids[sequence] = genotype
+            self.sequences.append(sequence)
+            self.chromosomes.append(None)
+        return genotype
+
+    def sequence(self, genotype):
+        """ Returns the sequence of *genotype*. """
+        return self.sequences[genotype]
+
+    def chromosome(self, genotype):
+        """
+        Returns the chromosome of *genotype*, shared by every agent with it.
+
+        It must not be changed, mutate or cross over a copy made with
+        `Chromosome(table.sequence(genotype))` instead.
+        """
+        chromosome = self.chromosomes[genotype]
+        if chromosome is None:
+            chromosome = Chromosome(self.sequences[genotype], self.config)
+            self.chromosomes[genotype] = chromosome
+        return chromosome
+
+    def phenotype(self, genotype):
+        """ Returns the phenotype of *genotype*, see Strategy.phenotype. """
+        return self.chromosome(genotype).phenotype()
+
+    def strategy(self, genotype):
+        """ Returns the compiled Strategy of *genotype*. """
+        return self.chromosome(genotype).strategy()
+
+    def outcome(self, genotype1, genotype2):
+        """
+        Returns the PairOutcome of a game between two genotypes, the first of
+        which moves first, from the shared InteractionCache.
+        """
+        return InteractionCache.shared().get(
+            self.chromosome(genotype1), self.chromosome(genotype2))
+
+    def packed(self):
+        """
+        Returns every sequence as one array of nucleotide codes and where
+        each sequence starts in it, followed by the total length, so the
+        table can be put in shared memory, see ArrayPopulation.share.
+
+        Returns
+        -------
+        (codes, offsets): (numpy.ndarray, numpy.ndarray)
+        """
+        codes = numpy.frombuffer(''.join(self.sequences).encode('ascii'), dtype = numpy.uint8)
+        offsets = numpy.zeros(len(self.sequences) + 1, dtype = numpy.int64)
+        offsets[1:] = numpy.cumsum([len(sequence) for sequence in self.sequences])
+        return codes, offsets
+
+    @staticmethod
+    def unpacked(codes, offsets):
+        """ Returns the sequences packed by `packed`, in genotype order. """
+        text = codes.tobytes().decode('ascii')
+        offsets = offsets.tolist()
+        return [text[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def compact(self, genotypes):
+        """
+        Drops the genotypes no longer in use and renumbers the rest in order.
+
+        Parameters
+        ----------
+        genotypes: numpy.ndarray
+            Every id in use.
+
+        Returns
+        -------
+        genotypes: numpy.ndarray
+            The same ids renumbered for the compacted table.
+        """
+        live, renumbered = numpy.unique(genotypes, return_inverse = True)
+
+        self.sequences = [self.sequences[genotype] for genotype in live.tolist()]
+        self.chromosomes = [self.chromosomes[genotype] for genotype in live.tolist()]
+        self.ids = {sequence: genotype for genotype, sequence in enumerate(self.sequences)}
+        self.compactions += 1
+        return renumbered.astype(genotypes.dtype).reshape(genotypes.shape)
+
+    def __len__(self):
+        return len(self.sequences)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+
+from collections import OrderedDict
+
+import numpy
+
+from coop_evolve.simulation_config import SimulationConfig
+
+
+class PairOutcome:
+    """
+    The moves and payoffs of a game between two genotypes.
+
+    Given the two strategies the moves are fully deterministic, only the length
+    of the game is random. The outcome is played out once, as far as any game
+    between the pair has gone, and longer games extend it.
+
+    Parameters
+    ----------
+    strategy1: Strategy
+        The strategy of the first agent, who moves first.
+    strategy2: Strategy
+        The strategy of the second agent.
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    """
+
+    _lengths = {}
+
+    def __init__(self, strategy1, strategy2, config = None):
+        self.strategy1 = strategy1
+        self.strategy2 = strategy2
+        self.config = SimulationConfig.default() if config is None else config
+
+        self.history1 = ""
+        self.history2 = ""
+
+        # Each agent's strategy state for the opponent's history so far,
+        # advanced one move at a time as the game is extended.
+        self.state1 = strategy1.start
+        self.state2 = strategy2.start
+
+        # Per move payoffs and prefix sums of them and of their squares,
+        # totals[k] is the payoff accumulated over the first k moves.
+        self.payoffs1 = []
+        self.payoffs2 = []
+        self.totals1 = [0]
+        self.totals2 = [0]
+        self.squares1 = [0]
+        self.squares2 = [0]
+
+    def extend(self, length):
+        """
+        Plays the game out until it is at least *length* moves long.
+
+        Parameters
+        ----------
+        length: Integer
+            The number of moves needed.
+        """
+        if length <= len(self.history1):
+            return
+
+        payoffs = self.config.payoff_table
+        index = self.config.behavior_index
+        strategy1 = self.strategy1
+        strategy2 = self.strategy2
+        history1 = self.history1
+        history2 = self.history2
+        state1 = self.state1
+        state2 = self.state2
+
+        while len(history1) < length:
+            move1 = strategy1.output(state1)
+            history1 += move1
+            state2 = strategy2.advance(state2, move1)
+
+            move2 = strategy2.output(state2)
+            history2 += move2
+            state1 = strategy1.advance(state1, move2)
+
+            payoff1 = payoffs[index[move2]][index[move1]]
+            payoff2 = payoffs[index[move1]][index[move2]]
+            self.payoffs1.append(payoff1)
+            self.payoffs2.append(payoff2)
+            self.totals1.append(self.totals1[-1] + payoff1)
+            self.totals2.append(self.totals2[-1] + payoff2)
+            self.squares1.append(self.squares1[-1] + payoff1 * payoff1)
+            self.squares2.append(self.squares2[-1] + payoff2 * payoff2)
+
+        self.history1 = history1
+        self.history2 = history2
+        self.state1 = state1
+        self.state2 = state2
+
+    def play(self, length):
+        """
+        Returns the outcome of a game of *length* moves.
+
+        Parameters
+        ----------
+        length: Integer
+            The number of moves in the game.
+
+        Returns
+        -------
+        (history1, history2, total1, total2)
+            Each agent's moves and the total payoff each received.
+        """
+        self.extend(length)
+        return (
+            self.history1[:length],
+            self.history2[:length],
+            self.totals1[length],
+            self.totals2[length]
+        )
+
+    def play_many(self, games, rng):
+        """
+        Plays *games* games with lengths drawn as in Agent.interact and returns
+        their combined outcome.
+
+        Only the number of games lasting more than each number of moves is
+        needed, so few games have their lengths drawn one by one and many
+        have the number of each length drawn together, making the cost grow
+        with the longest game rather than the number of games.
+
+        Parameters
+        ----------
+        games: Integer
+            The number of games.
+        rng: RandomStream
+
+        Returns
+        -------
+        dict{moves, totals1, totals2, squares1, squares2, counts}
+            The number of moves each agent made over all the games, each
+            agent's total payoff and sum of squared payoffs, and the number of
+            times each behavior was played by either agent.
+        """
+        behaviors = self.config.behaviors
+        lengths = self.game_lengths(self.config.interaction_p)
+
+        # running[t] is how many of the games last more than t moves.
+        if games < len(lengths):
+            ends = rng.geometric(1 - self.config.interaction_p, games) - 1
+            running = games - numpy.cumsum(numpy.bincount(ends, minlength = 1))
+        else:
+            running = games - numpy.cumsum(rng.multinomial(games, lengths))
+        moves = numpy.count_nonzero(running)
+        running = running[:moves]
+        self.extend(moves)
+
+        counts = numpy.zeros(len(behaviors))
+        for history in [self.history1, self.history2]:
+            moved = numpy.frombuffer(history[:moves].encode('ascii'), dtype = numpy.uint8)
+            counts += numpy.bincount(
+                self.config.behavior_codes[moved], weights = running, minlength = len(behaviors))
+
+        payoffs1 = numpy.array(self.payoffs1[:moves], dtype = float)
+        payoffs2 = numpy.array(self.payoffs2[:moves], dtype = float)
+        return {
+            'moves': int(running.sum()),
+            'totals1': float(running @ payoffs1),
+            'totals2': float(running @ payoffs2),
+            'squares1': float(running @ (payoffs1 * payoffs1)),
+            'squares2': float(running @ (payoffs2 * payoffs2)),
+            'counts': counts.astype(numpy.int64)
+        }
+
+    def play_shared(self, games, agents, rng):
+        """
+        Plays *games* games among *agents* agents who all have the same
+        genotype, as play_many, and shares the moves and payoffs out evenly.
+
+        Agents with the same genotype are interchangeable, so rather than
+        track who played whom each agent is given an equal share of the moves,
+        as near as whole moves allow, and payoffs in proportion, so every
+        agent has the same payoff per move.
+
+        Parameters
+        ----------
+        games: Integer
+            The number of games.
+        agents: Integer
+            The number of agents sharing them.
+        rng: RandomStream
+
+        Returns
+        -------
+        dict{counts, totals, squares, behaviors}
+            Arrays with the number of moves, total payoff and sum of squared
+            payoffs of each agent, and the number of times each behavior was
+            played.
+        """
+        results = self.play_many(games, rng)
+        moves = 2 * results['moves']
+
+        counts = numpy.full(agents, moves // agents, dtype = numpy.int64)
+        counts[:moves % agents] += 1
+        shares = counts/moves if moves > 0 else numpy.zeros(agents)
+        return {
+            'counts': counts,
+            'totals': (results['totals1'] + results['totals2']) * shares,
+            'squares': (results['squares1'] + results['squares2']) * shares,
+            'behaviors': results['counts']
+        }
+
+    @classmethod
+    def game_lengths(cls, interaction_p):
+        """
+        The probability of each game length, up to the length where the
+        remaining tail is negligible.
+
+        Parameters
+        ----------
+        interaction_p: Float
+            The probability a game goes on after each move.
+        """
+        probabilities = cls._lengths.get(interaction_p)
+        if probabilities is None:
+            longest = int(math.ceil(math.log(1e-12)/math.log(interaction_p))) \
+                if interaction_p > 0 else 0
+            probabilities = (1 - interaction_p) * interaction_p**numpy.arange(longest + 1)
+            probabilities /= probabilities.sum()
+            cls._lengths[interaction_p] = probabilities
+        return probabilities
+
+
+class InteractionCache:
+    """
+    A bounded, least recently used cache of PairOutcomes keyed by the ordered
+    pair of phenotypes and the config they were played under.
+
+    Within a subpopulation most pairings are repeats of the same pair of
+    genotypes, or of genotypes with the same phenotypes, so each pair is only
+    played out once.
+
+    Parameters
+    ----------
+    maxsize: Integer, default = None
+        The maximum number of outcomes held. Defaults to
+        `interaction_cache_size` in settings.
+    """
+
+    _shared = None
+
+    def __init__(self, maxsize = None):
+        if maxsize is None:
+            maxsize = SimulationConfig.default().interaction_cache_size
+        self.maxsize = maxsize
+        self.outcomes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, dna1, dna2):
+        """
+        Returns the outcome for a game between two chromosomes, the first of
+        which moves first.
+
+        Parameters
+        ----------
+        dna1: Chromosome
+        dna2: Chromosome
+
+        Returns
+        -------
+        outcome: PairOutcome
+        """
+        # Outcomes depend on the payoffs so the config is part of the key.
+        key = (dna1.phenotype(), dna2.phenotype(), dna1.config)
+        outcome = self.outcomes.get(key)
+        if outcome is not None:
+            self.hits += 1
+            self.outcomes.move_to_end(key)
+            return outcome
+
+        self.misses += 1
+        outcome = PairOutcome(dna1.strategy(), dna2.strategy(), dna1.config)
+        self.outcomes[key] = outcome
+        if len(self.outcomes) > self.maxsize:
+            self.outcomes.popitem(last = False)
+            self.evictions += 1
+        return outcome
+
+    def clear(self):
+        """ Empties the cache and resets the counters. """
+        self.outcomes.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns
+        -------
+        Dict{hits, misses, evictions, size, maxsize}
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.outcomes),
+            'maxsize': self.maxsize
+        }
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    @classmethod
+    def shared(cls):
+        """ Returns the process wide cache, creating it on first use. """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from scipy.stats import poisson
+
+
+class Migration:
+    """
+    Decides where every agent in a grid of subpopulations ends up after
+    migration, for Population and ArrayPopulation.
+
+    A subpopulation's surplus over *subpop_size* leaves, chosen uniformly at
+    random. The number of them surviving migration is a binomial draw and each
+    survivor moves a poisson distributed distance in each of x and y, in a
+    random direction. Displacements are drawn in bulk from the distribution
+    for the migration distance, which is computed once. Survivors that move
+    off the grid are lost.
+    """
+
+    _displacements = {}
+
+    @classmethod
+    def displacement_distribution(cls, distance):
+        """
+        Returns the possible displacements along one axis and their cumulative
+        probabilities for the given mean distance.
+
+        The distance is poisson distributed and equally likely to be in either
+        direction. The distribution is cut off where the remaining tail is
+        negligible.
+
+        Parameters
+        ----------
+        distance: Float
+            The mean distance moved.
+
+        Returns
+        -------
+        (displacements, cdf): (numpy.ndarray, numpy.ndarray)
+        """
+        distribution = cls._displacements.get(distance)
+        if distribution is None:
+            steps = int(poisson.isf(1e-15, distance)) + 1
+            pmf = poisson.pmf(numpy.arange(steps + 1), distance)
+
+            displacements = numpy.arange(-steps, steps + 1)
+            cdf = numpy.cumsum(numpy.concatenate((pmf[:0:-1]/2, pmf[:1], pmf[1:]/2)))
+            cdf /= cdf[-1]
+            distribution = (displacements, cdf)
+            cls._displacements[distance] = distribution
+        return distribution
+
+    @staticmethod
+    def check_survival(survival):
+        """ Raises ValueError unless *survival* is a probability. """
+        if not 0 <= survival <= 1:
+            raise ValueError(f"Migration survival must be between 0 and 1, got {survival}")
+
+    @classmethod
+    def displacements(cls, distance, size, rng):
+        """
+        Returns *size* displacements along one axis.
+
+        Parameters
+        ----------
+        distance: Float
+            The mean distance moved.
+        size: Integer
+        rng: RandomStream
+        """
+        displacements, cdf = cls.displacement_distribution(distance)
+        indices = numpy.searchsorted(cdf, rng.random(size), side = 'right')
+        return displacements[numpy.minimum(indices, len(displacements) - 1)]
+
+    @classmethod
+    def migrate(cls, sizes, subpop_size, width, length, survival, distance, rngs):
+        """
+        Draws where every agent ends up and returns the new arrangement of the
+        grid. The parameters are as for `destinations`.
+
+        Returns
+        -------
+        (order, sizes): (numpy.ndarray, numpy.ndarray)
+            The agents left in the grid, grouped by subpopulation in grid order
+            with residents before arrivals, and the new size of each
+            subpopulation.
+        """
+        destinations, migrants = cls.destinations(
+            sizes, subpop_size, width, length, survival, distance, rngs)
+
+        remaining = numpy.flatnonzero(destinations >= 0)
+        keys = destinations[remaining] * 2 + migrants[remaining]
+        order = remaining[numpy.argsort(keys, kind = 'stable')]
+        return order, numpy.bincount(destinations[remaining], minlength = width * length)
+
+    @classmethod
+    def destinations(cls, sizes, subpop_size, width, length, survival, distance, rngs,
+                     origin = (0, 0), grid = None):
+        """
+        Draws where every agent ends up.
+
+        The grid can be one tile of a larger grid, see TiledPopulation, with
+        *origin* and *grid* giving where it lies. Destinations are then
+        subpopulations of the whole grid and survivors can land outside the
+        tile.
+
+        Parameters
+        ----------
+        sizes: numpy.ndarray
+            The number of agents in each subpopulation in grid order. Agents
+            are numbered by subpopulation in the same order.
+        subpop_size: Integer
+            The carrying capacity, only the surplus over it migrates.
+        width, length: Integer
+            The dimensions of the grid.
+        survival: Float
+            The probability a migrant survives.
+        distance: Float
+            The mean distance moved in each of x and y.
+        rngs: RandomStream or List[RandomStream]
+            A stream for the whole grid, or one for each subpopulation.
+        origin: (Integer, Integer), default = (0, 0)
+            The coordinates in the whole grid of the tile's first
+            subpopulation.
+        grid: (Integer, Integer), default = None
+            The dimensions of the whole grid, *width* and *length* if not given.
+
+        Returns
+        -------
+        (destinations, migrants): (numpy.ndarray, numpy.ndarray)
+            The subpopulation of the whole grid, in its grid order, each agent
+            ends up in, or -1 if it dies, and whether it arrived by migrating.
+
+        Raises
+        ------
+        ValueError
+            If *survival* is not a probability.
+        """
+        cls.check_survival(survival)
+        grid_width, grid_length = (width, length) if grid is None else grid
+        demes = width * length
+        sizes = numpy.asarray(sizes, dtype = numpy.int64)
+        offsets = numpy.concatenate(([0], numpy.cumsum(sizes)))
+        surplus = numpy.maximum(sizes - subpop_size, 0)
+        homes = numpy.repeat(numpy.arange(demes), sizes)
+
+        if isinstance(rngs, list):
+            leaving = numpy.zeros(offsets[-1], dtype = bool)
+            movers = [numpy.zeros(0, dtype = numpy.int64)]
+            moves = [numpy.zeros((2, 0), dtype = numpy.int64)]
+            for deme in numpy.flatnonzero(surplus).tolist():
+                rng = rngs[deme]
+                survivors = int(rng.binomial(surplus[deme], survival))
+                order = offsets[deme] + rng.permutation(sizes[deme])
+                leaving[order[:surplus[deme]]] = True
+                movers.append(order[:survivors])
+                moves.append(numpy.stack((
+                    cls.displacements(distance, survivors, rng),
+                    cls.displacements(distance, survivors, rng))))
+            movers = numpy.concatenate(movers)
+            moves = numpy.concatenate(moves, axis = 1)
+        else:
+            rng = rngs
+            survivors = rng.binomial(surplus, survival)
+
+            # Ranking the agents of each subpopulation by a random key picks
+            # the leavers, and the survivors among them, uniformly. Only
+            # subpopulations with a surplus need ranking.
+            crowded = numpy.repeat(surplus > 0, sizes)
+            ranks = numpy.zeros(offsets[-1], dtype = numpy.int64)
+            ranks[crowded] = rng.group_ranks(sizes[surplus > 0])
+
+            leaving = crowded & (ranks < surplus[homes])
+            movers = numpy.flatnonzero(crowded & (ranks < survivors[homes]))
+            moves = numpy.stack((
+                cls.displacements(distance, len(movers), rng),
+                cls.displacements(distance, len(movers), rng)))
+
+        x = homes // length + origin[0]
+        y = homes % length + origin[1]
+        destinations = x * grid_length + y
+        destinations[leaving] = -1
+
+        x = x[movers] + moves[0]
+        y = y[movers] + moves[1]
+        landed = (x >= 0) & (x < grid_width) & (y >= 0) & (y < grid_length)
+        destinations[movers[landed]] = x[landed] * grid_length + y[landed]
+
+        migrants = numpy.zeros(offsets[-1], dtype = bool)
+        migrants[movers[landed]] = True
+        return destinations, migrants
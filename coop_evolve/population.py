@@ -1,30 +1,82 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import copy
 import numpy
-import random
-
-from app_settings import AppSettings
 
 from coop_evolve.agent import Agent
-
-from scipy.stats import poisson
+from coop_evolve.batch_games import BatchGames
+from coop_evolve.census import Census
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.culling import Culling
+from coop_evolve.interaction import InteractionCache
+from coop_evolve.migration import Migration
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.reproduction import Reproduction
+from coop_evolve.simulation_config import SimulationConfig
 
 class Population:
+    """
+    A width by length grid of subpopulations of agents.
     
-    def __init__(self, width, length, subpop_size, sequence = None):
+    Parameters
+    ----------
+    width, length: Integer
+        The dimensions of the grid.
+    subpop_size: Integer
+        The number of agents in each subpopulation.
+    sequence: String, default = None
+        The initial sequence of every agent, random if not given.
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    rng: RandomStream, default = None
+        The source of every random number the population uses, 
+        RandomStream.default() if not given.
+    streams: DemeStreams, default = None
+        If given each subpopulation draws from its own stream for each phase
+        instead of sharing *rng*, so a subpopulation's results don't depend on
+        the order the grid is worked through.
+    batched_games: Boolean, default = False
+        If true play_game plays every game in the grid together with
+        BatchGames instead of one game at a time.
+    monomorphic_games: Boolean, default = False
+        If true play_game plays the subpopulations where every agent has the
+        same phenotype as one shared outcome, see play_game, so their agents
+        get the same payoff per move rather than those of their own games.
+    check_census: Boolean, default = False
+        If true every census is checked against a full recount, see `check`.
+        
+    Attributes
+    ----------
+    counts: Census
+        The number of agents with each sequence, kept up to date as agents
+        are born, die, migrate and change. Agents put into the grid directly
+        rather than by the population's methods aren't counted.
+    """
+    
+    def __init__(self, width, length, subpop_size, sequence = None, config = None, rng = None,
+                 streams = None, batched_games = False, monomorphic_games = False,
+                 check_census = False):
         self.width = width
         self.length = length
         self.subpop_size = subpop_size
+        self.config = SimulationConfig.default() if config is None else config
+        self.rng = RandomStream.default() if rng is None else rng
+        self.streams = streams
+        self.batched_games = batched_games
+        self.monomorphic_games = monomorphic_games
+        self.check_census = check_census
+        self.counts = Census(width * length, self.config)
         
         self.population = []
         for i in range(self.width):
             row = []
             for j in range(self.length):
+                rng = self.__rng(i, j, 'init')
                 subpop = []
                 for k in range(self.subpop_size):
-                    subpop.append(Agent(sequence))
+                    agent = Agent(sequence, self.config, rng)
+                    self.counts.add(agent.dna, i * self.length + j)
+                    subpop.append(agent)
                 row.append(subpop)
             self.population.append(row)
         # needed to make population iterable
@@ -48,7 +100,7 @@ class Population:
         return popsize
                 
         
-    def play_game(self, interactions = 1):
+    def play_game(self, interactions = 1, batched = None, monomorphic = None):
         """
         Agents play the game with others from the same population.
         
@@ -61,11 +113,24 @@ class Population:
             The number of interactions per agent. If interactions = 2, and there are
             10 agents in the population, then there are 20 interactions and each agent
             is expected to take part in 40 interactions. 
+        batched: Boolean, default = None
+            If true the pairings and lengths of every game in the grid are drawn
+            up front and the games played together, see BatchGames. Defaults 
+            to the population's batched_games.
+        monomorphic: Boolean, default = None
+            If true subpopulations where every agent has the same phenotype 
+            don't play game by game. Their games are played together and 
+            shared out evenly with PairOutcome.play_shared, so every agent 
+            there has the same fitness. Defaults to the population's 
+            monomorphic_games. Reproduction and culling treat them as any
+            other subpopulation.
             
         Returns
         -------
-        dict{subpop_counts: List[List[Dict]], pop_counts[Dict]
-        A tally of how many times each behavior was exhibited by subpopulation.Agent
+        dict{subpop_counts: List[List[Dict]], pop_counts[Dict], monomorphic_demes: Integer}
+        A tally of how many times each behavior was exhibited by subpopulation.Agent,
+        and how many subpopulations were played as monomorphic, zero unless
+        *monomorphic*.
         
         Example (2 by 3 popluation):
         
@@ -80,11 +145,19 @@ class Population:
                                     {'a': 0, 'b': 0, 'c': 0, 'd': 80}, 
                                     {'a': 2, 'b': 48, 'c': 0, 'd': 48}]
                                 ], 
-            'pop_counts': {'a': 2, 'b': 68, 'c': 9, 'd': 307}
+            'pop_counts': {'a': 2, 'b': 68, 'c': 9, 'd': 307},
+            'monomorphic_demes': 1
         }
         
         """
-        cfg = AppSettings()
+        cfg = self.config
+        if batched is None:
+            batched = self.batched_games
+        if monomorphic is None:
+            monomorphic = self.monomorphic_games
+        shared = self.__play_monomorphic(interactions) if monomorphic else {}
+        if batched:
+            return self.__play_batched(interactions, shared)
         
         behavior_counts = []
         pop_counts = {}
@@ -97,14 +170,22 @@ class Population:
                 counts = {}
                 for h in range(len(cfg.behaviors)):
                     counts[cfg.behaviors[h]] = 0
+                if i * self.length + j in shared:
+                    for behavior, count in zip(cfg.behaviors, 
+                                               shared[i * self.length + j].tolist()):
+                        counts[behavior] += count
+                        pop_counts[behavior] += count
+                    row.append(counts)
+                    continue
+                rng = self.__rng(i, j, 'play')
                 for _ in range(interactions * self.subpop_size):
-                    index1 = random.randint(0, (self.subpop_size - 1))
-                    index2 = random.randint(0, (self.subpop_size - 1))
+                    index1 = rng.integers(0, self.subpop_size)
+                    index2 = rng.integers(0, self.subpop_size)
                     while index1 == index2:
-                        index2 = random.randint(0, self.subpop_size - 1)
+                        index2 = rng.integers(0, self.subpop_size)
                     agent1 = self.population[i][j][index1]
                     agent2 = self.population[i][j][index2]
-                    histories = Agent.interact(agent1, agent2)
+                    histories = Agent.interact(agent1, agent2, rng)
                     
                     for h in range(len(cfg.behaviors)):
                         counts[cfg.behaviors[h]] += \
@@ -115,34 +196,120 @@ class Population:
             behavior_counts.append(row)
                         
                     
-        return {'subpop_counts': behavior_counts, 'pop_counts': pop_counts}
+        return {
+            'subpop_counts': behavior_counts, 
+            'pop_counts': pop_counts,
+            'monomorphic_demes': len(shared)
+        }
+        
+    def __play_monomorphic(self, interactions):
+        # Plays the subpopulations where every agent has the same phenotype 
+        # with PairOutcome.play_shared, returning the behavior counts of each
+        # by its index in grid order.
+        shared = {}
+        for i in range(self.width):
+            for j in range(self.length):
+                agents = self.population[i][j][:self.subpop_size]
+                if len(agents) < 2:
+                    continue
+                dna = agents[0].dna
+                if any(agent.dna.phenotype() != dna.phenotype() for agent in agents):
+                    continue
+                
+                results = InteractionCache.shared().get(dna, dna).play_shared(
+                    interactions * self.subpop_size, len(agents), self.__rng(i, j, 'play'))
+                for agent, count, total, squares in zip(agents, results['counts'].tolist(),
+                                                        results['totals'].tolist(),
+                                                        results['squares'].tolist()):
+                    agent.record(count, total, squares)
+                shared[i * self.length + j] = results['behaviors']
+        return shared
+        
+    def __play_batched(self, interactions, shared):
+        # Plays every game in the grid outside the monomorphic subpopulations
+        # at once and records the totals on each agent, with the same result
+        # format as play_game.
+        behaviors = self.config.behaviors
+        agents = []
+        offsets = [0]
+        for row in self.population:
+            for subpop in row:
+                agents.extend(subpop)
+                offsets.append(len(agents))
+                
+        results = BatchGames(self.config).play_demes(
+            [agent.dna.strategy() for agent in agents], offsets, self.subpop_size,
+            interactions, self.__rngs('play'),
+            demes = [deme for deme in range(len(offsets) - 1) if deme not in shared])
+        for deme, counts in shared.items():
+            results['behaviors'][deme] = counts
+        
+        for agent, count, total, squares in zip(agents, results['counts'].tolist(),
+                                                results['totals'].tolist(),
+                                                results['squares'].tolist()):
+            agent.record(count, total, squares)
+            
+        subpop_counts = [dict(zip(behaviors, counts)) 
+                         for counts in results['behaviors'].tolist()]
+        return {
+            'subpop_counts': [subpop_counts[i * self.length:(i + 1) * self.length]
+                              for i in range(self.width)],
+            'pop_counts': dict(zip(behaviors, results['behaviors'].sum(axis = 0).tolist())),
+            'monomorphic_demes': len(shared)
+        }
 
                     
-    def mutate(self):
+    def mutate(self, batched = True):
         """
         Mutates each agent in the population.
+        
+        Parameters
+        ----------
+        batched: Boolean, default = True
+            If true the whole population is mutated at once with Chromosome.mutate_all,
+            drawing the random numbers for each kind of mutation in bulk. If false
+            each agent is mutated in turn. With per subpopulation streams each
+            subpopulation is batched on its own.
         """
-        for i in range(self.width):
-            for j in range(self.length):
-                for k in range(self.subpop_size):
-                    self.population[i][j][k].mutate()
+        if batched and self.streams is not None:
+            for i in range(self.width):
+                for j in range(self.length):
+                    Chromosome.mutate_all([
+                        self.population[i][j][k].dna for k in range(self.subpop_size)
+                    ], self.config, self.__rng(i, j, 'mutate'))
+        elif batched:
+            Chromosome.mutate_all([
+                self.population[i][j][k].dna
+                for i in range(self.width)
+                for j in range(self.length)
+                for k in range(self.subpop_size)
+            ], self.config, self.rng)
+        else:
+            for i in range(self.width):
+                for j in range(self.length):
+                    for k in range(self.subpop_size):
+                        self.population[i][j][k].mutate(self.__rng(i, j, 'mutate'))
+        self.counts.update()
+                    
     def mate(self):
         """
         Individuals within each subpopulation can swap slices of their chromosome
         with subpopulation mates.
         """
-        cfg = AppSettings()
+        cfg = self.config
         
         for i in range(self.width):
             for j in range(self.length):
+                rng = self.__rng(i, j, 'mate')
                 for _ in range(int(round(self.subpop_size * cfg.mating_rate * 0.5))):
-                    index1 = random.randint(0, (self.subpop_size - 1))
-                    index2 = random.randint(0, (self.subpop_size - 1))
+                    index1 = rng.integers(0, self.subpop_size)
+                    index2 = rng.integers(0, self.subpop_size)
                     while index1 == index2:
-                        index2 = random.randint(0, self.subpop_size - 1)
+                        index2 = rng.integers(0, self.subpop_size)
                     agent1 = self.population[i][j][index1]
                     agent2 = self.population[i][j][index2]
-                    Agent.mate(agent1, agent2)
+                    Agent.mate(agent1, agent2, rng)
+        self.counts.update()
 
     def reproduce(self, fecundity = 1, relative_fitnesses = True):
         """
@@ -163,6 +330,10 @@ class Population:
             equal reproduction across subpopulations. Absolute fitness results in subpopulation reproduction being relative to the mean fitness 
             in the subpopulation
             
+        Returns
+        -------
+        mean_fitnesses: numpy.ndarray
+            The mean fitness of each subpopulation, indexed [x][y].
         """
         
         if(relative_fitnesses):
@@ -181,6 +352,10 @@ class Population:
         have a survival probability, so that if survival is 0.1, 1 in 10 agents survive
         migration.
         
+        The number of surviving migrants from each subpopulation is drawn at once
+        and they are moved as a block, see Migration. With per subpopulation 
+        streams the draws for migrants come from their source's stream.
+        
         Parameters
         ----------
         survival: Float, default = 0.1
@@ -191,48 +366,132 @@ class Population:
             from the poisson distribution.
         """
         
-        migrants = []
-        for i in range(self.width):
-            row = []
-            for j in range(self.length):
-                row.append([])
-            migrants.append(row)
-            
-        for i in range(self.width):
-            for j in range(self.length):
-                while(len(self.population[i][j]) > self.subpop_size):
-                    index = random.randint(0, len(self.population[i][j]) - 1)
-                    if random.random() < survival:
-                        x = poisson.rvs(distance)
-                        x = i + (x * -1) if random.random() < 0.5 else i + x
-                        y = poisson.rvs(distance)
-                        y = j + (y * -1) if random.random() < 0.5 else j + y
+        subpops = [self.population[i][j] for i in range(self.width) for j in range(self.length)]
+        order, sizes = Migration.migrate(
+            [len(subpop) for subpop in subpops], self.subpop_size, self.width, self.length,
+            survival, distance, self.__rngs('migrate'))
+        
+        agents = [agent for subpop in subpops for agent in subpop]
+        self.__regroup_counts(agents, [len(subpop) for subpop in subpops], order, sizes)
+        agents = [agents[index] for index in order.tolist()]
+        start = 0
+        for deme, size in enumerate(sizes.tolist()):
+            self.population[deme // self.length][deme % self.length] = agents[start:(start + size)]
+            start += size
                         
-                        if x >= 0 and x < len(migrants) and y >= 0 and y < len(migrants[0]):
-                            migrants[x][y].append(self.population[i][j][index])
-                    del self.population[i][j][index]
-                    
-        for i in range(self.width):
-            for j in range(self.length):
-                self.population[i][j] = self.population[i][j] + migrants[i][j]
+    def emigrate(self, survival = 0.1, distance = 1, origin = (0, 0), grid = None):
+        """
+        Migrates the population as one tile of a larger grid, see 
+        TiledPopulation. The surplus agents leave their subpopulations as in
+        migrate, and the survivors are returned to be passed to `immigrate` 
+        of whichever tile they land in, this one included.
+        
+        Parameters
+        ----------
+        survival: Float, default = 0.1
+            The probability the agent survives migration.
+        distance: Integer, default = 1
+            The average distance an agent moves in both X and Y directions.
+        origin: (Integer, Integer), default = (0, 0)
+            Where the tile's first subpopulation is in the whole grid.
+        grid: (Integer, Integer), default = None
+            The dimensions of the whole grid, the population's own if not given.
+            
+        Returns
+        -------
+        migrants: List[(Integer, Integer, String)]
+            The subpopulation each survivor lands in and the one it left, by
+            their index in the whole grid's grid order, and its sequence.
+        """
+        subpops = [self.population[i][j] for i in range(self.width) for j in range(self.length)]
+        sizes = [len(subpop) for subpop in subpops]
+        destinations, migrants = Migration.destinations(
+            sizes, self.subpop_size, self.width, self.length, survival, distance,
+            self.__rngs('migrate'), origin, grid)
+        
+        grid_length = self.length if grid is None else grid[1]
+        start = 0
+        leaving = []
+        for deme, (subpop, size) in enumerate(zip(subpops, sizes)):
+            source = (deme // self.length + origin[0]) * grid_length + deme % self.length + origin[1]
+            staying = []
+            for agent, destination, migrant in zip(
+                    subpop, destinations[start:(start + size)].tolist(),
+                    migrants[start:(start + size)].tolist()):
+                if migrant:
+                    leaving.append((destination, source, agent.dna.sequence))
+                elif destination >= 0:
+                    staying.append(agent)
+                    continue
+                self.counts.remove(agent.dna)
+            self.population[deme // self.length][deme % self.length] = staying
+            start += size
+        return leaving
+        
+    def immigrate(self, migrants, origin = (0, 0), grid = None):
+        """
+        Adds the migrants that landed in this tile, from `emigrate` of any 
+        tile, after the residents of their subpopulations. They are placed in
+        the order of the subpopulations they left, as migrate places them.
+        
+        Parameters
+        ----------
+        migrants: List[(Integer, Integer, String)]
+            As returned by emigrate, each tile's in the order returned.
+        origin: (Integer, Integer), default = (0, 0)
+        grid: (Integer, Integer), default = None
+            As for emigrate.
+        """
+        grid_length = self.length if grid is None else grid[1]
+        for destination, _, sequence in sorted(migrants, key = lambda migrant: migrant[1]):
+            i = destination // grid_length - origin[0]
+            j = destination % grid_length - origin[1]
+            agent = Agent(sequence, self.config)
+            self.counts.add(agent.dna, i * self.length + j)
+            self.population[i][j].append(agent)
                         
-    def cull(self):
+    def cull(self, batched = True):
         """
         Randomly removes agents from subpopulations until they are down to carrying capacity
+        
+        Parameters
+        ----------
+        batched: Boolean, default = True
+            If true the survivors of every subpopulation are drawn at once, see
+            Culling. If false agents are removed one at a time.
         """
+        if batched:
+            subpops = [self.population[i][j] for i in range(self.width) for j in range(self.length)]
+            order, sizes = Culling.survivors(
+                [len(subpop) for subpop in subpops], self.subpop_size, self.__rngs('cull'))
+            
+            agents = [agent for subpop in subpops for agent in subpop]
+            self.__regroup_counts(agents, [len(subpop) for subpop in subpops], order, sizes)
+            agents = [agents[index] for index in order.tolist()]
+            start = 0
+            for deme, size in enumerate(sizes.tolist()):
+                self.population[deme // self.length][deme % self.length] = agents[start:(start + size)]
+                start += size
+            return
+            
         for i in range(self.width):
             for j in range(self.length):
+                rng = self.__rng(i, j, 'cull')
                 while(len(self.population[i][j]) > self.subpop_size):
-                    self.population[i][j].pop(
-                        random.randrange(len(self.population[i][j])))
+                    self.counts.remove(self.population[i][j].pop(
+                        rng.integers(0, len(self.population[i][j]))).dna)
                         
     def generation(self, interactions = 1, 
                          fecundity = 1, 
                          relative_fitnesses = True,
                          migration_distance = 1,
-                         migration_survival = 0.1):
+                         migration_survival = 0.1,
+                         migrate = None):
         """
-        Goes through one full lifecycle of a population.
+        Goes through one full lifecycle of a population. Payoffs are reset at 
+        the start so fitness only reflects the games played this generation.
+        Along with the behavior and fitness data it reports how many 
+        subpopulations were monomorphic and played out together, see play_game.
         
         parameters
         ---------
@@ -252,21 +511,79 @@ class Population:
             
         migration_survival: Float, default 0.1
             If chosen to migrate, the probability an agent survives migration. 
+            
+        migrate: Callable, default = None
+            Called with the population in place of `migrate`, as by 
+            TiledPopulation to exchange migrants with the other tiles.
         """
         
+        if self.streams is not None:
+            self.streams.next_generation()
+        self.reset()
         behavior_data = self.play_game(interactions)
         self.mutate()
         fitness_data = self.reproduce(fecundity, relative_fitnesses)
-        self.migrate(migration_distance, migration_survival)
+        if migrate is None:
+            self.migrate(survival = migration_survival, distance = migration_distance)
+        else:
+            migrate(self)
         self.cull()
         self.mate()
+        self.tidy()
         
         return {
             'behavior_data': behavior_data, 
-            'fitness_data': fitness_data
+            'fitness_data': fitness_data,
+            'monomorphic_demes': behavior_data['monomorphic_demes']
         }
         
-    def census(self):
+    def tidy(self):
+        """ 
+        Called at the end of each generation, as by ArrayPopulation to 
+        compact its genotype table. Agents hold their own sequences, so there
+        is nothing to do.
+        """
+        pass
+        
+    def census(self, phenotypes = False):
+        """
+        Counts the agents with each sequence, every agent in each 
+        subpopulation, from the counts kept up to date in `counts`, so it 
+        costs the number of distinct sequences rather than a pass over the
+        agents.
+        
+        Parameters
+        ----------
+        phenotypes: Boolean, default = False
+            Counts the agents with each phenotype instead, see 
+            Strategy.phenotype.
+            
+        Returns
+        -------
+        dict{subpop_data: List[List[Dict]], pop_data: Dict}
+            The counts by sequence or phenotype in each subpopulation and in
+            the whole population.
+        """
+        self.counts.update()
+        if self.check_census:
+            self.check()
+        return self.counts.data(self.length, phenotypes)
+        
+    def recount(self, phenotypes = False):
+        """
+        Counts the agents with each sequence from scratch, going through every
+        agent in every subpopulation. Returns the same as census, which is
+        kept up to date instead.
+        
+        Parameters
+        ----------
+        phenotypes: Boolean, default = False
+            Counts the agents with each phenotype instead.
+            
+        Returns
+        -------
+        dict{subpop_data: List[List[Dict]], pop_data: Dict}
+        """
         subpop_data = []
         pop_data = {}
         
@@ -274,78 +591,114 @@ class Population:
             row = []
             for j in range(self.length):
                 subpop_counts = {}
-                for k in range(self.subpop_size):
-                    if self.population[i][j][k].dna.sequence in subpop_counts:
-                        subpop_counts[self.population[i][j][k].dna.sequence] += 1
+                for agent in self.population[i][j]:
+                    dna = agent.dna
+                    key = dna.phenotype() if phenotypes else dna.sequence
+                    if key in subpop_counts:
+                        subpop_counts[key] += 1
                     else:
-                        subpop_counts[self.population[i][j][k].dna.sequence] = 1
+                        subpop_counts[key] = 1
                         
-                    if self.population[i][j][k].dna.sequence in pop_data:
-                        pop_data[self.population[i][j][k].dna.sequence] += 1
+                    if key in pop_data:
+                        pop_data[key] += 1
                     else:
-                        pop_data[self.population[i][j][k].dna.sequence] = 1
+                        pop_data[key] = 1
                 row.append(subpop_counts)
             subpop_data.append(row)
         
         return({'subpop_data': subpop_data, 'pop_data': pop_data})
-                    
-                    
+        
+    def check(self):
+        """
+        Checks the census against a full recount.
+        
+        Raises
+        ------
+        RuntimeError
+            If the counts kept up to date have drifted from the agents in the
+            grid, for instance after agents were put into it directly.
+        """
+        self.counts.update()
+        counted = self.counts.data(self.length)
+        recounted = self.recount()
+        if counted != recounted:
+            drifted = [(i, j) for i, row in enumerate(recounted['subpop_data'])
+                       for j, counts in enumerate(row)
+                       if counts != counted['subpop_data'][i][j]]
+            raise RuntimeError(f"The census has drifted from a recount in subpopulations {drifted}")
         
     def reset(self):
         """
-        Resets the population to starting state for the next genration in the simulation.Resets
+        Resets the population to starting state for the next genration in the simulation,
+        clearing every agent's payoffs.
         """
         
         for i in range(self.width):
             for j in range(self.length):
-                for k in range(self.subpop_size):
-                    self.population[i][j][k].reset
+                for agent in self.population[i][j]:
+                    agent.reset()
                         
             
+    def __rng(self, i, j, phase):
+        # The stream subpopulation (i, j) draws from in *phase*.
+        if self.streams is None:
+            return self.rng
+        return self.streams.stream(i, j, phase)
+        
+    def __rngs(self, phase):
+        # The stream for drawing for the whole grid at once in *phase*, or each 
+        # subpopulation's stream in grid order.
+        if self.streams is None:
+            return self.rng
+        return [self.streams.stream(i, j, phase) 
+                for i in range(self.width) for j in range(self.length)]
+            
+    def __regroup_counts(self, agents, old_sizes, order, sizes):
+        # Moves the counts of *agents*, the grid's agents in order, kept by
+        # *order* into the subpopulations of *sizes*, and drops the rest.
+        demes = numpy.arange(self.width * self.length)
+        old = numpy.repeat(demes, old_sizes)
+        new = numpy.repeat(demes, sizes)
+        kept = numpy.zeros(len(agents), dtype = bool)
+        kept[order] = True
+        for index in numpy.flatnonzero(~kept).tolist():
+            self.counts.remove(agents[index].dna)
+        moved = old[order] != new
+        for index, deme in zip(order[moved].tolist(), new[moved].tolist()):
+            self.counts.move(agents[index].dna, deme)
+            
     def __reproduce_with_relative_fitness(self, fecundity):
         """
         Agents reproduce according to relative fitness within its subpopulation. Each 
         subpopulation produces exactly *fecundity* * *subpop_size* new agents. The probability
         each agent reproduces is proportianal to its fitness relative the to subpopulations fitness.
         
+        The number of offspring of every agent is drawn at once, see Reproduction.relative.
+        
         parameters
         ---------
         fecundity: Integer
             The number of agents produced per agent in a subpopulation.
         """
         
-        data = []
-        
-        for i in range(self.width):
-            row = []
-            for j in range(self.length):
-                relative_fitnesses = []
-                for k in range(self.subpop_size):
-                    relative_fitnesses.append(self.population[i][j][k].fitness())
-                    
-                if sum(relative_fitnesses) == 0:
-                    mean_fitness = 1/len(relative_fitnesses)
-                else:
-                    mean_fitness = sum(relative_fitnesses)/len(relative_fitnesses)
-                    
-                row.append(mean_fitness)
-                
-                # Need to protect against dividing by zero if all the payoffs are zero.
-                # Since they are all equal (zero) assume each is equally likely to reproduce
-                if sum(relative_fitnesses) == 0:
-                    relative_fitnesses = numpy.cumsum(
-                        [(1/len(relative_fitnesses)) for _ in range(len(relative_fitnesses))] )
-                else:
-                    relative_fitnesses = numpy.cumsum(
-                        [(f/sum(relative_fitnesses)) for f in relative_fitnesses]).tolist()
-                for _ in range(fecundity * self.subpop_size):
-                    index = 0
-                    rand = random.random()
-                    while rand > relative_fitnesses[index]:
-                        index += 1
-                    self.population[i][j].append(copy.deepcopy(self.population[i][j][index]))
-            data.append(row)        
-        return data
+        fitnesses = numpy.array([
+            [agent.fitness() for agent in self.population[i][j][:self.subpop_size]]
+            for i in range(self.width)
+            for j in range(self.length)
+        ]).reshape(self.width * self.length, self.subpop_size)
+        counts, mean_fitnesses = Reproduction.relative(
+            fitnesses, fecundity, self.__rngs('reproduce'))
+        
+        parents = numpy.arange(self.subpop_size)
+        for deme, offspring in enumerate(counts):
+            subpop = self.population[deme // self.length][deme % self.length]
+            children = [
+                subpop[index].offspring() for index in numpy.repeat(parents, offspring).tolist()
+            ]
+            for child in children:
+                self.counts.add(child.dna, deme)
+            subpop.extend(children)
+        return mean_fitnesses.reshape(self.width, self.length)
                     
     def __reproduce_with_absolute_fitness(self, fecundity):
         """
@@ -353,6 +706,8 @@ class Population:
         The probability it reproduces is equal to its fitness/max_possible_fitness. The amount
         of reproduction in a population depends on the fitness of its agents.amount
         
+        The number of offspring of every agent is drawn at once, see Reproduction.absolute.
+        
         parameters
         ----------
         
@@ -360,27 +715,26 @@ class Population:
             The number of chances each agent is given to reproduce in a population.
         """
         
-        cfg = AppSettings()
-        
-        data = []
-        
-        max_payoff = max(cfg.payoffs.values())
-        for i in range(self.width):
-            row = []
-            for j in range(self.length):
-                popsize = len(self.population[i][j])
-                fitnesses = []
-                for k in range(popsize):
-                    fitnesses.append(self.population[i][j][k].fitness()/max_payoff)
-                    for _ in range(fecundity):
-                        if random.random() <= self.population[i][j][k].fitness()/max_payoff:
-                            self.population[i][j].append(copy.deepcopy(self.population[i][j][k]))
-                row.append( sum(fitnesses)/len(fitnesses) )
-            data.append(row)
-                
-                    
-                    
-        return data                
+        subpops = [self.population[i][j] for i in range(self.width) for j in range(self.length)]
+        sizes = numpy.array([len(subpop) for subpop in subpops], dtype = numpy.int64)
+        fitnesses = numpy.fromiter(
+            (agent.fitness() for subpop in subpops for agent in subpop),
+            dtype = float, count = int(sizes.sum()))
+        counts, mean_fitnesses = Reproduction.absolute(
+            fitnesses, sizes, fecundity, self.config.max_payoff, self.__rngs('reproduce'))
+        
+        start = 0
+        for deme, (subpop, size) in enumerate(zip(subpops, sizes.tolist())):
+            offspring = counts[start:(start + size)]
+            children = [
+                subpop[index].offspring()
+                for index in numpy.repeat(numpy.arange(size), offspring).tolist()
+            ]
+            for child in children:
+                self.counts.add(child.dna, deme)
+            subpop.extend(children)
+            start += size
+        return mean_fitnesses.reshape(self.width, self.length)
                     
             
     def __getitem__(self, key):
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+import numpy
+
+
+class RandomStream:
+    """
+    A seeded source of random numbers for the simulation.
+
+    Wraps a numpy Generator and hands out single draws from buffers filled in
+    bulk, which avoids the per call overhead of scipy's rvs and numpy's scalar
+    draws. Array draws go straight to the generator. The same seed always
+    gives the same sequence of draws.
+
+    Parameters
+    ----------
+    seed: Integer or numpy.random.SeedSequence, default = None
+        The seed, fresh entropy from the operating system if not given. The
+        seed used is available as `seed` so a run can be replayed.
+    buffer_size: Integer, default = 4096
+        How many numbers of each kind to draw at a time.
+    """
+
+    _default = None
+
+    def __init__(self, seed = None, buffer_size = 4096):
+        if isinstance(seed, numpy.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = numpy.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.generator = numpy.random.Generator(numpy.random.PCG64(self.seed_sequence))
+        self.buffer_size = buffer_size
+
+        self._uniforms = []
+        self._uniform_index = 0
+        self._geometrics = {}
+
+    def random(self, size = None):
+        """
+        Returns uniform floats in [0, 1).
+
+        Parameters
+        ----------
+        size: Integer, default = None
+            The number of draws, a single float if not given.
+        """
+        if size is not None:
+            return self.generator.random(size)
+
+        if self._uniform_index == len(self._uniforms):
+            self._uniforms = self.generator.random(self.buffer_size).tolist()
+            self._uniform_index = 0
+        self._uniform_index += 1
+        return self._uniforms[self._uniform_index - 1]
+
+    def integers(self, low, high, size = None):
+        """
+        Returns integers drawn uniformly from [low, high).
+
+        Parameters
+        ----------
+        low, high: Integer
+        size: Integer, default = None
+            The number of draws, a single integer if not given.
+        """
+        if size is not None:
+            return self.generator.integers(low, high, size)
+        return low + int(self.random() * (high - low))
+
+    def geometric(self, p, size = None):
+        """
+        Returns the number of trials up to and including the first success,
+        where each trial succeeds with probability *p*.
+
+        Parameters
+        ----------
+        p: Float
+        size: Integer, default = None
+            The number of draws, a single integer if not given.
+        """
+        if size is not None:
+            return self.generator.geometric(p, size)
+
+        draws = self._geometrics.get(p)
+        if draws is None or draws[1] == len(draws[0]):
+            draws = [self.generator.geometric(p, self.buffer_size).tolist(), 0]
+            self._geometrics[p] = draws
+        draws[1] += 1
+        return draws[0][draws[1] - 1]
+
+    def poisson(self, lam, size = None):
+        """
+        Returns poisson distributed integers with mean *lam*.
+
+        Single draws with a small mean, as for mutations, are taken by inverting
+        the cumulative distribution with one buffered uniform.
+
+        Parameters
+        ----------
+        lam: Float
+        size: Integer, default = None
+            The number of draws, a single integer if not given.
+        """
+        if size is not None:
+            return self.generator.poisson(lam, size)
+        if lam <= 0:
+            return 0
+        if lam >= 30:
+            return int(self.generator.poisson(lam))
+
+        u = self.random()
+        k = 0
+        pmf = math.exp(-lam)
+        cdf = pmf
+        while u > cdf:
+            k += 1
+            pmf *= lam/k
+            cdf += pmf
+            # Rounding can leave the cdf just short of one.
+            if pmf == 0:
+                break
+        return k
+
+    def binomial(self, n, p, size = None):
+        """ Returns binomially distributed integers. """
+        return self.generator.binomial(n, p, size)
+
+    def multinomial(self, n, pvals, size = None):
+        """
+        Returns how many of *n* draws fall in each category, for each row of
+        probabilities in *pvals*.
+        """
+        return self.generator.multinomial(n, pvals, size)
+
+    def multivariate_hypergeometric(self, colors, nsample):
+        """
+        Returns how many of *nsample* items drawn without replacement come from
+        each group, for groups of *colors* items.
+        """
+        return self.generator.multivariate_hypergeometric(colors, nsample)
+
+    def permutation(self, n):
+        """ Returns the integers [0, n) in a random order. """
+        return self.generator.permutation(n)
+
+    def group_ranks(self, sizes):
+        """
+        Ranks items in groups in a uniformly random order within each group.
+
+        The items are laid out group after group, *sizes* long. Taking the
+        items of a group ranked below k picks k of them uniformly at random
+        without replacement.
+
+        Parameters
+        ----------
+        sizes: numpy.ndarray
+            The number of items in each group.
+
+        Returns
+        -------
+        ranks: numpy.ndarray
+            The rank of each item within its group, from zero.
+        """
+        sizes = numpy.asarray(sizes, dtype = numpy.int64)
+        groups = numpy.repeat(numpy.arange(len(sizes)), sizes)
+        keys = (groups << 32) + self.generator.integers(0, 2**32, size = len(groups))
+        order = numpy.argsort(keys)
+
+        ranks = numpy.empty(len(groups), dtype = numpy.int64)
+        ranks[order] = numpy.arange(len(groups)) - numpy.repeat(numpy.cumsum(sizes) - sizes, sizes)
+        return ranks
+
+    def shuffle(self, values):
+        """ Shuffles a list or array in place. """
+        self.generator.shuffle(values)
+
+    @classmethod
+    def default(cls):
+        """
+        Returns the stream used when none is given, creating it unseeded on
+        first use.
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @classmethod
+    def seed_default(cls, seed = None):
+        """
+        Replaces the default stream with one seeded with *seed*.
+
+        Returns
+        -------
+        stream: RandomStream
+        """
+        cls._default = cls(seed)
+        return cls._default
+
+
+class DemeStreams:
+    """
+    Independent random streams for each subpopulation and phase of a
+    generation, all derived from one root seed.
+
+    The stream for a deme and phase in a generation is seeded with the root
+    entropy and the spawn key (x, y, phase, generation), the same children
+    `SeedSequence.spawn` gives but addressed directly, so a deme's draws
+    never depend on which other demes were drawn for, in what order or in
+    which process. Running the grid split over any number of workers then
+    gives the same result as running it in one.
+
+    Streams are created on first use and kept until `next_generation`, each
+    advancing only as its deme and phase consume it. As every generation's
+    streams can be derived again from the root seed, only the current
+    generation's are held, however long the run.
+
+    Parameters
+    ----------
+    seed: Integer, default = None
+        The root seed, fresh entropy from the operating system if not given.
+        The seed used is available as `seed` so a run can be replayed.
+    buffer_size: Integer, default = 64
+        The buffer size of each stream, small since there is one per deme
+        and phase.
+    origin: (Integer, Integer), default = (0, 0)
+        Added to the coordinates streams are asked for, so a population
+        holding one tile of a larger grid, with its own coordinates starting
+        from zero, draws from the streams of its place in the whole grid.
+    """
+
+    phases = ('init', 'play', 'mutate', 'reproduce', 'migrate', 'cull', 'mate')
+
+    def __init__(self, seed = None, buffer_size = 64, origin = (0, 0)):
+        self.seed_sequence = numpy.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.buffer_size = buffer_size
+        self.origin = origin
+        self.generation = 0
+        self.streams = {}
+
+    def next_generation(self):
+        """
+        Moves on to the next generation's streams, dropping the current ones.
+        Populations call it at the start of each generation.
+        """
+        self.generation += 1
+        self.streams = {}
+
+    def stream(self, x, y, phase):
+        """
+        Returns the stream for the deme at (x, y) in *phase* of the current
+        generation.
+
+        Parameters
+        ----------
+        x, y: Integer
+            The deme's coordinates.
+        phase: String
+            One of `phases`.
+
+        Returns
+        -------
+        stream: RandomStream
+        """
+        key = (x, y, phase)
+        stream = self.streams.get(key)
+        if stream is None:
+            seed = numpy.random.SeedSequence(
+                self.seed,
+                spawn_key = (x + self.origin[0], y + self.origin[1], self.phases.index(phase),
+                             self.generation))
+            stream = RandomStream(seed, self.buffer_size)
+            self.streams[key] = stream
+        return stream
+
+    def replace(self, x, y, phase, stream):
+        """
+        Puts *stream*, the stream for the deme at (x, y) in *phase* advanced in
+        another process, in place of the one held, so draws carry on from
+        where it left off.
+
+        Parameters
+        ----------
+        x, y: Integer
+            The deme's coordinates.
+        phase: String
+            One of `phases`.
+        stream: RandomStream
+        """
+        self.streams[(x, y, phase)] = stream
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+
+
+class Reproduction:
+    """
+    Draws the number of offspring of every agent in a grid of subpopulations at
+    once, for Population and ArrayPopulation.
+
+    The draws come from one stream for the whole grid or, when each
+    subpopulation has its own stream, from each subpopulation's stream in turn.
+    """
+
+    @staticmethod
+    def relative(fitnesses, fecundity, rngs):
+        """
+        Draws offspring in proportion to relative fitness.
+
+        Each subpopulation has exactly *fecundity* times as many offspring as
+        agents, shared among its agents by one multinomial draw with
+        probabilities fitness/sum(fitness). If every agent in a subpopulation
+        has zero fitness each is equally likely to be a parent.
+
+        Parameters
+        ----------
+        fitnesses: numpy.ndarray
+            The fitness of each agent, a row for each subpopulation in grid order.
+        fecundity: Integer
+            The number of offspring per agent.
+        rngs: RandomStream or List[RandomStream]
+            A stream for the whole grid, or one for each subpopulation.
+
+        Returns
+        -------
+        counts: numpy.ndarray
+            The number of offspring of each agent, shaped like *fitnesses*.
+        mean_fitnesses: numpy.ndarray
+            The mean fitness of each subpopulation, 1/subpop_size where every
+            agent has zero fitness.
+        """
+        demes, subpop_size = fitnesses.shape
+        totals = fitnesses.sum(axis = 1)
+        barren = totals == 0
+
+        probabilities = numpy.empty(fitnesses.shape)
+        probabilities[barren] = 1/subpop_size
+        probabilities[~barren] = fitnesses[~barren]/totals[~barren, None]
+
+        mean_fitnesses = numpy.where(barren, 1/subpop_size, totals/subpop_size)
+
+        births = fecundity * subpop_size
+        if isinstance(rngs, list):
+            counts = numpy.array([
+                rng.multinomial(births, deme_probabilities)
+                for rng, deme_probabilities in zip(rngs, probabilities)
+            ]).reshape(fitnesses.shape)
+        else:
+            counts = rngs.multinomial(births, probabilities)
+
+        return counts, mean_fitnesses
+
+    @staticmethod
+    def absolute(fitnesses, sizes, fecundity, max_payoff, rngs):
+        """
+        Draws offspring by absolute fitness.
+
+        Each agent gets *fecundity* chances to reproduce, each succeeding with
+        probability fitness/max_payoff, so its number of offspring is one
+        binomial draw however large the fecundity.
+
+        Parameters
+        ----------
+        fitnesses: numpy.ndarray
+            The fitness of every agent, grouped by subpopulation in grid order.
+        sizes: numpy.ndarray
+            The number of agents in each subpopulation.
+        fecundity: Integer
+            The number of chances each agent has to reproduce.
+        max_payoff: Float
+            The largest payoff.
+        rngs: RandomStream or List[RandomStream]
+            A stream for the whole grid, or one for each subpopulation.
+
+        Returns
+        -------
+        counts: numpy.ndarray
+            The number of offspring of each agent.
+        mean_fitnesses: numpy.ndarray
+            The mean of fitness/max_payoff in each subpopulation, zero for an
+            empty one.
+        """
+        probabilities = numpy.minimum(fitnesses/max_payoff, 1)
+
+        if isinstance(rngs, list):
+            ends = numpy.cumsum(sizes).tolist()
+            counts = numpy.zeros(len(fitnesses), dtype = numpy.int64)
+            for rng, start, end in zip(rngs, [0] + ends, ends):
+                counts[start:end] = rng.binomial(fecundity, probabilities[start:end])
+        else:
+            counts = rngs.binomial(fecundity, probabilities)
+
+        totals = numpy.bincount(
+            numpy.repeat(numpy.arange(len(sizes)), sizes),
+            weights = probabilities, minlength = len(sizes))
+        mean_fitnesses = numpy.divide(
+            totals, sizes, out = numpy.zeros(len(sizes)), where = sizes > 0)
+
+        return counts, mean_fitnesses
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from multiprocessing import shared_memory
+
+import numpy
+
+
+class SharedArrays:
+    """
+    Named numpy arrays kept in `multiprocessing.shared_memory` blocks, so
+    worker processes can attach to them by name and read and write them in
+    place instead of having them pickled.
+
+    Assigning an array copies it into its block. Blocks are allocated with
+    room to grow, so arrays that change size from one generation to the next
+    only move to a new, larger block, with a new name, when they outgrow it.
+    Handles should be taken after the arrays were last assigned.
+
+    Parameters
+    ----------
+    arrays: Dict[String, numpy.ndarray], default = None
+        The arrays to start with.
+    """
+
+    def __init__(self, arrays = None):
+        self.owner = True
+        self.blocks = {}
+        self.arrays = {}
+        self.retired = []
+        for name, array in ({} if arrays is None else arrays).items():
+            self[name] = array
+
+    def __setitem__(self, name, array):
+        array = numpy.ascontiguousarray(array)
+        block = self.blocks.get(name)
+        if block is None or block.size < array.nbytes:
+            if block is not None:
+                self.__retire(name)
+            # Doubling leaves room for the population to grow before the
+            # block has to move.
+            block = shared_memory.SharedMemory(create = True, size = max(2 * array.nbytes, 64))
+            self.blocks[name] = block
+
+        view = numpy.ndarray(array.shape, dtype = array.dtype, buffer = block.buf)
+        view[...] = array
+        self.arrays[name] = view
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def handle(self):
+        """
+        Returns what another process needs to attach to the arrays, small and
+        cheap to pickle.
+
+        Returns
+        -------
+        handle: Dict[String, (String, Tuple, String)]
+            The block name, shape and dtype of each array.
+        """
+        return {
+            name: (self.blocks[name].name, array.shape, array.dtype.str)
+            for name, array in self.arrays.items()
+        }
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Returns the arrays of *handle*, from another process, as views of
+        their blocks. Changes are seen by every process attached.
+
+        The blocks stay owned by the process that made them, attaching
+        processes only close them. Before Python 3.13 attaching also registers
+        the blocks with the process's resource tracker, which frees them when
+        the process exits, so workers should be started by multiprocessing
+        after the first arrays are shared, and so share the owner's tracker.
+
+        Parameters
+        ----------
+        handle: Dict
+            From `handle`.
+
+        Returns
+        -------
+        arrays: SharedArrays
+        """
+        shared = cls.__new__(cls)
+        shared.owner = False
+        shared.blocks = {}
+        shared.arrays = {}
+        shared.retired = []
+        for name, (block_name, shape, dtype) in handle.items():
+            try:
+                block = shared_memory.SharedMemory(name = block_name, track = False)
+            except TypeError:
+                block = shared_memory.SharedMemory(name = block_name)
+            shared.blocks[name] = block
+            shared.arrays[name] = numpy.ndarray(shape, dtype = numpy.dtype(dtype),
+                                                buffer = block.buf)
+        return shared
+
+    def close(self):
+        """
+        Detaches from the blocks and, in the process that made them, frees
+        them. Arrays taken from this object must not be used afterwards.
+        """
+        for name in list(self.blocks):
+            self.__retire(name)
+        self.arrays = {}
+        self.__release()
+
+    def __retire(self, name):
+        # Frees the name at once but only unmaps the block once no arrays
+        # still point into it.
+        block = self.blocks.pop(name)
+        self.arrays.pop(name, None)
+        if self.owner:
+            block.unlink()
+        self.retired.append(block)
+        self.__release()
+
+    def __release(self):
+        mapped = []
+        for block in self.retired:
+            try:
+                block.close()
+            except BufferError:
+                mapped.append(block)
+        self.retired = mapped
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
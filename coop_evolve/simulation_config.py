@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from app_settings import AppSettings
+
+
+class SimulationConfig:
+    """
+    A frozen snapshot of the settings used by a simulation run, with the values
+    derived from them precomputed.
+
+    Build it once per run and pass it to Population, Agent and Chromosome so the
+    hot paths don't have to reread the settings. Code that isn't given one uses
+    `SimulationConfig.default()`, built from AppSettings.
+
+    Attributes
+    ----------
+    behaviors: String
+        The possible plays, the last is the default behavior.
+    default_behavior: String
+    behavior_index: Dict{String: Integer}
+        The position of each behavior in behaviors.
+    behavior_codes: numpy.ndarray
+        The position of each behavior in behaviors indexed by its ascii code,
+        for reading histories as arrays.
+    nucleotides: String
+        Every character that can be used in a dna string.
+    nucleotide_codes: numpy.ndarray
+        The nucleotides as uint8 codes.
+    chromosome_length, mutation_length, interaction_length: Number
+        The expected lengths from settings.
+    chromosome_p, mutation_p, interaction_p: Float
+        The probability a random chromosome, insertion or deletion, or game
+        continues for another character or move, length/(1 + length).
+    mutation_rate, crossover_rate, mating_rate: Float
+    payoffs: Dict{String: Number}
+        The payoffs from settings, keyed by opponent's move then agent's move.
+    payoff_table: Tuple[Tuple[Number]]
+        The payoffs as a table indexed [opponent's behavior][agent's behavior],
+        zero where no payoff is defined.
+    max_payoff, mean_payoff: Float
+        The largest payoff and the mean of the defined payoffs.
+    strategy_cache_size, interaction_cache_size: Integer
+    """
+
+    __slots__ = (
+        'behaviors', 'default_behavior', 'behavior_index', 'behavior_codes',
+        'nucleotides', 'nucleotide_codes',
+        'chromosome_length', 'mutation_length', 'interaction_length',
+        'chromosome_p', 'mutation_p', 'interaction_p',
+        'mutation_rate', 'crossover_rate', 'mating_rate',
+        'payoffs', 'payoff_table', 'max_payoff', 'mean_payoff',
+        'strategy_cache_size', 'interaction_cache_size'
+    )
+
+    _default = None
+
+    def __init__(self, behaviors,
+                       gene_delimiter,
+                       receptor_delimiter,
+                       wildcards,
+                       chromosome_length,
+                       mutation_length,
+                       interaction_length,
+                       mutation_rate,
+                       crossover_rate,
+                       mating_rate,
+                       payoffs,
+                       strategy_cache_size,
+                       interaction_cache_size):
+        values = {
+            'behaviors': behaviors,
+            'default_behavior': behaviors[-1],
+            'behavior_index': {behavior: index for index, behavior in enumerate(behaviors)},
+            'nucleotides': behaviors + gene_delimiter + receptor_delimiter + wildcards,
+            'chromosome_length': chromosome_length,
+            'mutation_length': mutation_length,
+            'interaction_length': interaction_length,
+            'chromosome_p': chromosome_length/(1 + chromosome_length),
+            'mutation_p': mutation_length/(1 + mutation_length),
+            'interaction_p': interaction_length/(1 + interaction_length),
+            'mutation_rate': mutation_rate,
+            'crossover_rate': crossover_rate,
+            'mating_rate': mating_rate,
+            'payoffs': dict(payoffs),
+            'payoff_table': tuple(
+                tuple(payoffs.get(opponent + behavior, 0) for behavior in behaviors)
+                for opponent in behaviors
+            ),
+            'max_payoff': max(payoffs.values()),
+            'mean_payoff': sum(payoffs.values())/len(payoffs),
+            'strategy_cache_size': strategy_cache_size,
+            'interaction_cache_size': interaction_cache_size
+        }
+
+        codes = numpy.frombuffer(values['nucleotides'].encode('ascii'), dtype=numpy.uint8).copy()
+        codes.flags.writeable = False
+        values['nucleotide_codes'] = codes
+
+        lookup = numpy.zeros(256, dtype=numpy.int64)
+        for index, behavior in enumerate(behaviors):
+            lookup[ord(behavior)] = index
+        lookup.flags.writeable = False
+        values['behavior_codes'] = lookup
+
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"SimulationConfig is frozen, can't set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"SimulationConfig is frozen, can't delete {name}")
+
+    def payoff(self, moves):
+        """
+        The payoff for a pair of moves, the opponent's then the agent's, or zero
+        if none is defined.
+        """
+        return self.payoffs.get(moves, 0)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (SimulationConfig._from_values, (self._values(),))
+
+    def _values(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @staticmethod
+    def _from_values(values):
+        config = object.__new__(SimulationConfig)
+        for name, value in values.items():
+            object.__setattr__(config, name, value)
+        return config
+
+    @classmethod
+    def from_settings(cls, cfg = None):
+        """
+        Builds a config from the application settings.
+
+        Parameters
+        ----------
+        cfg: AppSettings, default = None
+            The settings to use, AppSettings() if not given.
+        """
+        if cfg is None:
+            cfg = AppSettings()
+        return cls(
+            behaviors = cfg.behaviors,
+            gene_delimiter = cfg.gene_delimiter,
+            receptor_delimiter = cfg.receptor_delimiter,
+            wildcards = cfg.wildcards,
+            chromosome_length = cfg.chromosome_length,
+            mutation_length = cfg.mutation_length,
+            interaction_length = cfg.interaction_length,
+            mutation_rate = cfg.mutation_rate,
+            crossover_rate = cfg.crossover_rate,
+            mating_rate = cfg.mating_rate,
+            payoffs = cfg.payoffs,
+            strategy_cache_size = cfg.strategy_cache_size,
+            interaction_cache_size = cfg.interaction_cache_size
+        )
+
+    @classmethod
+    def default(cls):
+        """ Returns the config built from AppSettings, building it on first use. """
+        if cls._default is None:
+            cls._default = cls.from_settings()
+        return cls._default
@@ -10,10 +10,19 @@ import time
 
 from app_settings import AppSettings
 
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.deme_scheduler import DemeScheduler
+from coop_evolve.distributed import GridCoordinator
+from coop_evolve.frequency_population import FrequencyPopulation
 from coop_evolve.population import Population
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.simulation_config import SimulationConfig
+from coop_evolve.tiled_population import TiledPopulation
 
 class SimulationRun:
     
+    storages = {'agents': Population, 'arrays': ArrayPopulation, 'frequencies': FrequencyPopulation}
+    
     def __init__(self, generations = 10000,
                        width = 100,
                        length = 100,
@@ -23,9 +32,22 @@ class SimulationRun:
                        migration_distance = 1,
                        initial_sequence = None,
                        fecundity = 1,
-                       sampling_frequency = 10
+                       sampling_frequency = 10,
+                       seed = None,
+                       storage = 'agents',
+                       batched_games = False,
+                       monomorphic_games = False,
+                       tiles = None,
+                       nodes = None,
+                       workers = None
                  ):
-        cfg = AppSettings()             
+        self.config = SimulationConfig.from_settings()
+        
+        # Every random number in the run comes from streams derived from one
+        # root seed, one per subpopulation and phase, so the seed recorded with
+        # the run is enough to replay it however the grid is split up.
+        self.streams = DemeStreams(seed)
+        self.seed = self.streams.seed
                      
         self.generations = generations
         self.width = width
@@ -38,15 +60,113 @@ class SimulationRun:
         self.fecundity = fecundity
         self.sampling_frequency = sampling_frequency
         
-        self.population = Population(
+        # 'agents' keeps an Agent object per agent, 'arrays' keeps genotype ids
+        # in arrays, using far less memory, and 'frequencies' keeps a count per
+        # genotype in each subpopulation, which already plays each pair of
+        # genotypes once.
+        if storage not in self.storages:
+            raise ValueError(f"Unknown storage {storage}, expected one of {list(self.storages)}")
+        if batched_games and storage == 'frequencies':
+            raise ValueError("batched_games doesn't apply to the frequencies storage")
+        if monomorphic_games and storage == 'frequencies':
+            raise ValueError("monomorphic_games doesn't apply to the frequencies storage, "
+                             "which already plays each pair of genotypes once")
+        if tiles is not None and storage == 'frequencies':
+            raise ValueError("The frequencies storage can't be split into tiles")
+        if nodes is not None and tiles is None:
+            raise ValueError("Nodes run tiles, so tiles must be given with nodes")
+        if workers is not None and (storage != 'arrays' or tiles is not None):
+            raise ValueError("Workers run the subpopulations of the arrays storage without tiles")
+        self.storage = storage
+        self.batched_games = batched_games
+        self.monomorphic_games = monomorphic_games
+        # The number of subpopulations played as monomorphic each generation.
+        self.monomorphic_demes = []
+        self.tiles = tiles
+        self.nodes = nodes
+        self.workers = workers
+        self.scheduler = None
+        
+        options = {}
+        if self.batched_games:
+            options['batched_games'] = True
+        if self.monomorphic_games:
+            options['monomorphic_games'] = True
+        if self.nodes is not None:
+            # Tiles run by node processes connected over TCP, see
+            # GridCoordinator, started here for 'local' or waited for on the
+            # (host, port) given.
+            if self.nodes != 'local':
+                options.update(address = tuple(self.nodes), launch = False)
+            self.population = GridCoordinator(
+                width = self.width, 
+                length = self.length, 
+                subpop_size = self.subpop_size,
+                sequence = self.initial_sequence,
+                config = self.config,
+                streams = self.streams,
+                tiles = self.tiles,
+                storage = self.storages[storage],
+                **options
+            )
+            return
+        if self.tiles is not None:
+            # The grid split into tiles run by worker processes, see 
+            # TiledPopulation, giving the same results.
+            self.population = TiledPopulation(
+                width = self.width, 
+                length = self.length, 
+                subpop_size = self.subpop_size,
+                sequence = self.initial_sequence,
+                config = self.config,
+                streams = self.streams,
+                tiles = self.tiles,
+                storage = self.storages[storage],
+                **options
+            )
+            return
+        if self.workers is not None:
+            # The subpopulations' phases run on worker processes that steal
+            # work from each other, see DemeScheduler, giving the same results.
+            self.scheduler = DemeScheduler(self.workers)
+            options['scheduler'] = self.scheduler
+        self.population = self.storages[storage](
             width = self.width, 
             length = self.length, 
             subpop_size = self.subpop_size,
-            sequence = self.initial_sequence
+            sequence = self.initial_sequence,
+            config = self.config,
+            streams = self.streams,
+            **options
         )
                 
         
     def run(self, simulation_id = None):
+        """
+        Runs the simulation, recording it in the database, and closes the
+        population when it ends or fails, see `close`.
+        
+        Returns
+        -------
+        run_id: Integer
+        """
+        try:
+            return self.__run(simulation_id)
+        finally:
+            self.close()
+            
+    def close(self):
+        """
+        Stops the processes running the population's tiles, and for a
+        GridCoordinator its nodes and listener, or its scheduler's workers,
+        and frees the shared memory the population and scheduler use.
+        """
+        if self.scheduler is not None:
+            self.scheduler.close()
+        if isinstance(self.population, (ArrayPopulation, TiledPopulation)):
+            self.population.close()
+        
+    def __run(self, simulation_id):
         print("entering method")
         cfg = AppSettings()
         conn = psycopg2.connect(
@@ -62,22 +182,24 @@ class SimulationRun:
         if self.initial_sequence == None:
             query = f"INSERT INTO {cfg.schema_name}.runs (\
                             simulation_id, generations, width, length, subpop_size, \
-                            relative_fitnesses, migration_distance, migration_survival) \
+                            relative_fitnesses, migration_distance, migration_survival, \
+                            seed) \
                      VALUES ( \
                         {simulation_id}, {self.generations}, {self.width}, {self.length}, \
                         {self.subpop_size}, {self.relative_fitness}, \
-                        {self.migration_distance}, {self.migration_survival} \
+                        {self.migration_distance}, {self.migration_survival}, \
+                        {self.seed} \
                      )"
         else:
             query = f"INSERT INTO {cfg.schema_name}.runs (\
                             simulation_id, generations, width, length, subpop_size, \
                             relative_fitnesses, migration_distance, migration_survival, \
-                            initial_sequence ) \
+                            initial_sequence, seed ) \
                      VALUES ( \
                         {simulation_id}, {self.generations}, {self.width}, {self.length}, \
                         {self.subpop_size}, {self.relative_fitness}, \
                         {self.migration_distance}, {self.migration_survival}, \
-                        '{self.initial_sequence}'\
+                        '{self.initial_sequence}', {self.seed}\
                       )"
         print("query created")
         print(query)
@@ -100,11 +222,14 @@ class SimulationRun:
             print(g)
             data = self.population.generation(
                 relative_fitnesses=self.relative_fitness,
-                interactions = cfg.interaction_length,
+                interactions = self.config.interaction_length,
                 fecundity = self.fecundity,
                 migration_distance = self.migration_distance,
                 migration_survival = self.migration_survival
                 )
+            self.monomorphic_demes.append(data['monomorphic_demes'])
+            if self.monomorphic_games:
+                print(f"monomorphic demes: {data['monomorphic_demes']}")
                 
             if (g-1)%(self.sampling_frequency) == 0:
                 print("collecting data")
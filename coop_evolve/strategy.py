@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+
+from collections import OrderedDict
+
+from coop_evolve.simulation_config import SimulationConfig
+
+
+class ReceptorTrie:
+    """
+    The receptors of a strategy indexed in a trie and compiled into a
+    nondeterministic finite automaton.
+
+    Each character of a receptor is one step, a behavior matches itself and each
+    wildcard matches any behavior, `?` zero or one time, `*` zero or more times
+    and `+` one or more times. Receptors sharing a prefix share the trie nodes
+    for it, so a matcher state is the set of nodes whose path matches the history
+    so far and advancing it only touches those nodes, however many genes there
+    are.
+
+    Only the first gene with a given receptor is kept since it shadows the rest.
+    Likewise once a gene matching every longer history has matched, nodes that
+    only lead to later genes are dropped from the state.
+
+    Parameters
+    ----------
+    receptors: List[String]
+        The receptors in gene order.
+    """
+
+    behaviors = 'abcd'
+
+    def __init__(self, receptors):
+        # children[node] maps a step to the next node, loops[node] is True when
+        # the node is reached by a `*` or `+` step and can match again, and
+        # genes[node] is the index of the gene whose receptor ends at the node.
+        self.children = [{}]
+        self.parents = [None]
+        self.loops = [False]
+        self.genes = [None]
+
+        for gene, receptor in enumerate(receptors):
+            node = 0
+            for step in receptor:
+                child = self.children[node].get(step)
+                if child is None:
+                    child = len(self.children)
+                    self.children[node][step] = child
+                    self.children.append({})
+                    self.parents.append(node)
+                    self.loops.append(step in '*+')
+                    self.genes.append(None)
+                node = child
+            if self.genes[node] is None:
+                self.genes[node] = gene
+
+        # firsts[node] is the first gene ending at or below the node. Children
+        # are always created after their parents.
+        self.firsts = [len(receptors) if gene is None else gene for gene in self.genes]
+        for node in range(len(self.children) - 1, 0, -1):
+            parent = self.parents[node]
+            self.firsts[parent] = min(self.firsts[parent], self.firsts[node])
+
+        self.start = self.closure({0})
+
+    def closure(self, nodes):
+        """ Adds the nodes reachable by skipping `?` and `*` steps. """
+        pending = list(nodes)
+        while pending:
+            children = self.children[pending.pop()]
+            for step in '?*':
+                child = children.get(step)
+                if child is not None and child not in nodes:
+                    nodes.add(child)
+                    pending.append(child)
+
+        # A matched gene whose last step is `*` or `+` matches whatever follows,
+        # so no later gene can ever respond.
+        bound = min(
+            (self.genes[node] for node in nodes 
+             if self.loops[node] and self.genes[node] is not None),
+            default = None
+        )
+        if bound is not None:
+            nodes = [node for node in nodes if self.firsts[node] <= bound]
+        return frozenset(nodes)
+
+    def advance(self, nodes, move):
+        """
+        Returns the matcher state after the history grows by *move*.
+
+        Parameters
+        ----------
+        nodes: frozenset
+            The current matcher state.
+        move: String
+            The next character of the history.
+        """
+        wildcard = move in self.behaviors
+        following = set()
+        for node in nodes:
+            children = self.children[node]
+            child = children.get(move)
+            if child is not None:
+                following.add(child)
+            if wildcard:
+                for step in '?*+':
+                    child = children.get(step)
+                    if child is not None:
+                        following.add(child)
+                if self.loops[node]:
+                    following.add(node)
+        return self.closure(following)
+
+    def match(self, nodes):
+        """
+        Returns the index of the first gene whose receptor matches the whole
+        history in *nodes*, or None.
+        """
+        matched = [self.genes[node] for node in nodes if self.genes[node] is not None]
+        return min(matched) if matched else None
+
+
+class Strategy:
+    """
+    A chromosome's strategy compiled once so it can be reused for every move.
+
+    The chromosome is parsed into (receptor, effector) pairs and the receptors
+    are indexed in a ReceptorTrie. Its states are combined into a deterministic
+    automaton, built lazily as histories reach new states, so a growing history
+    costs one table lookup per move instead of matching every receptor against
+    the whole history.
+
+    Parameters
+    ----------
+    sequence: String
+        The chromosome sequence or phenotype.
+    config: SimulationConfig, default = None
+        The run's settings, giving the response when no gene matches.
+        SimulationConfig.default() if not given.
+    """
+
+    regex = '(?P<receptor>[abcd?*+]+):[*?+:]*(?P<effector>[abcd])[abcd?*+:]*/'
+
+    def __init__(self, sequence, config = None):
+        self.sequence = sequence
+        self.config = SimulationConfig.default() if config is None else config
+        self.genes = re.findall(self.regex, sequence)
+        self.trie = ReceptorTrie([receptor for receptor, _ in self.genes])
+        self.effectors = [effector for _, effector in self.genes]
+        self.default = self.config.default_behavior
+
+        # The deterministic automaton, states are numbered in the order they
+        # are reached. Each state is a set of trie nodes.
+        self.states = {}
+        self.keys = []
+        self.transitions = []
+        self.outputs = []
+        self.start = self.__state(self.trie.start)
+
+    def advance(self, state, move):
+        """
+        Returns the state after the history grows by *move*.
+
+        Parameters
+        ----------
+        state: Integer
+            A state of this strategy, starting from `start`.
+        move: String
+            The next character of the history.
+        """
+        following = self.transitions[state].get(move)
+        if following is None:
+            following = self.__state(self.trie.advance(self.keys[state], move))
+            self.transitions[state][move] = following
+        return following
+
+    def output(self, state):
+        """ The response for the history that reached *state*. """
+        return self.outputs[state]
+
+    def response(self, history):
+        """
+        Returns the effector of the first gene whose receptor matches the history,
+        or the default behavior if none match.
+
+        Parameters
+        ----------
+        history: String
+            The opponent's moves so far.
+        """
+        state = self.start
+        for move in history:
+            state = self.advance(state, move)
+        return self.outputs[state]
+
+    @classmethod
+    def phenotype(cls, sequence, config = None):
+        """
+        Returns the canonical sequence of the strategy *sequence* encodes, the
+        same for every sequence with the same responses.
+
+        Only the (receptor, effector) pairs that can ever respond are kept, in
+        order, written as `receptor:effector/`. Junk between genes is dropped,
+        each run of wildcards in a receptor is rewritten to the shortest run
+        matching the same number of moves, a gene whose receptor repeats an
+        earlier one is shadowed by it, genes after one that matches every
+        history never respond and trailing genes giving the default behavior
+        change nothing. Canonical sequences are their own phenotype.
+
+        Parameters
+        ----------
+        sequence: String
+            A chromosome sequence.
+        config: SimulationConfig, default = None
+            The run's settings, SimulationConfig.default() if not given.
+
+        Returns
+        -------
+        phenotype: String
+        """
+        if config is None:
+            config = SimulationConfig.default()
+
+        genes = []
+        receptors = set()
+        for receptor, effector in re.findall(cls.regex, sequence):
+            receptor = re.sub('[?*+]+', cls.__wildcards, receptor)
+            if receptor in receptors:
+                continue
+            receptors.add(receptor)
+            genes.append((receptor, effector))
+            if receptor == '*':
+                break
+
+        while genes and genes[-1][1] == config.default_behavior:
+            genes.pop()
+        return ''.join(f"{receptor}:{effector}/" for receptor, effector in genes)
+
+    @staticmethod
+    def __wildcards(run):
+        # A run of wildcards matches at least one move per `+` and, with a `*`
+        # any number more, otherwise up to one more per `?`.
+        run = run.group(0)
+        if '*' in run:
+            return '+' * run.count('+') + '*'
+        return '+' * run.count('+') + '?' * run.count('?')
+
+    def __state(self, nodes):
+        state = self.states.get(nodes)
+        if state is None:
+            state = len(self.transitions)
+            self.states[nodes] = state
+            self.keys.append(nodes)
+            self.transitions.append({})
+            gene = self.trie.match(nodes)
+            self.outputs.append(self.default if gene is None else self.effectors[gene])
+        return state
+
+    def __deepcopy__(self, memo):
+        # Strategies are only ever extended with states that follow from the
+        # sequence, so copies can share them.
+        return self
+
+
+class StrategyCache:
+    """
+    A bounded, least recently used cache of compiled strategies keyed by
+    phenotype and config, see Strategy.phenotype.
+
+    Many agents share the same genotype, and many genotypes the same
+    phenotype, so compiling each distinct phenotype once saves reparsing the
+    chromosome on every move. The hit, miss and eviction counters are kept so
+    the cache can be sized for a run.
+
+    Parameters
+    ----------
+    maxsize: Integer, default = None
+        The maximum number of strategies held. Defaults to
+        `strategy_cache_size` in settings.
+    """
+
+    _shared = None
+
+    def __init__(self, maxsize = None):
+        if maxsize is None:
+            maxsize = SimulationConfig.default().strategy_cache_size
+        self.maxsize = maxsize
+        self.strategies = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, sequence, config = None):
+        """
+        Returns the compiled strategy for the sequence's phenotype, compiling
+        and storing it if it is not already cached.
+
+        Strategies are cached by phenotype and config, as the phenotype
+        drops trailing genes giving the config's default behavior, which the
+        strategy then gives when no gene matches.
+
+        Parameters
+        ----------
+        sequence: String
+            A chromosome sequence or phenotype.
+        config: SimulationConfig, default = None
+            The run's settings, SimulationConfig.default() if not given.
+
+        Returns
+        -------
+        strategy: Strategy
+            Compiled from the phenotype, which is its `sequence`.
+        """
+        config = SimulationConfig.default() if config is None else config
+        # Phenotypes are their own phenotype, so one already cached needs no
+        # canonicalizing.
+        key = (sequence, config)
+        if key not in self.strategies:
+            key = (Strategy.phenotype(sequence, config), config)
+        strategy = self.strategies.get(key)
+        if strategy is not None:
+            self.hits += 1
+            self.strategies.move_to_end(key)
+            return strategy
+
+        self.misses += 1
+        strategy = Strategy(key[0], config)
+        self.strategies[key] = strategy
+        if len(self.strategies) > self.maxsize:
+            self.strategies.popitem(last = False)
+            self.evictions += 1
+        return strategy
+
+    def clear(self):
+        """ Empties the cache and resets the counters. """
+        self.strategies.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns
+        -------
+        Dict{hits, misses, evictions, size, maxsize}
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.strategies),
+            'maxsize': self.maxsize
+        }
+
+    def __len__(self):
+        return len(self.strategies)
+
+    @classmethod
+    def shared(cls):
+        """ Returns the process wide cache, creating it on first use. """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
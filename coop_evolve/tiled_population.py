@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import time
+import traceback
+
+import numpy
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.simulation_config import SimulationConfig
+
+
+class TiledPopulation:
+    """
+    A width by length grid of subpopulations split into rectangular tiles,
+    each held and run by its own worker process.
+
+    Every subpopulation draws from its own streams, see DemeStreams, so each
+    tile plays, mutates, reproduces, culls and mates its subpopulations on its
+    own and gets the same results it would as part of the whole grid. Only
+    migration crosses tiles. Each tile draws its surplus agents' moves with
+    `emigrate` and sends every other tile the survivors landing in it,
+    directly rather than through the coordinating process. Migration
+    distances are unbounded, so a tile can't know which tiles will send it
+    migrants, and it sends each tile a message every generation, an empty
+    one if no migrants land there. Arrivals are placed by `immigrate` in
+    the order migrate would place them, so a generation gives the same
+    results as a Population or ArrayPopulation with the same streams.
+
+    Parameters
+    ----------
+    width, length: Integer
+        The dimensions of the grid.
+    subpop_size: Integer
+        The number of agents in each subpopulation.
+    sequence: String, default = None
+        The initial sequence of every agent, random if not given.
+    config: SimulationConfig, default = None
+        The run's settings, SimulationConfig.default() if not given.
+    streams: DemeStreams, default = None
+        The streams to draw from, only their seed is passed on to the tiles.
+        Freshly seeded if not given.
+    tiles: (Integer, Integer), default = (2, 2)
+        The number of tiles along x and y. Tiles differ in size by at most one
+        subpopulation along each axis.
+    storage: Class, default = ArrayPopulation
+        The storage each tile keeps its agents in, Population or
+        ArrayPopulation.
+    batched_games: Boolean, default = False
+        If true each tile plays its games together, see BatchGames.
+    monomorphic_games: Boolean, default = False
+        If true each tile plays its monomorphic subpopulations as one shared
+        outcome, see Population.play_game.
+    """
+
+    def __init__(self, width, length, subpop_size, sequence = None, config = None,
+                 streams = None, tiles = (2, 2), storage = ArrayPopulation,
+                 batched_games = False, monomorphic_games = False):
+        self.width = width
+        self.length = length
+        self.subpop_size = subpop_size
+        self.config = SimulationConfig.default() if config is None else config
+        self.streams = DemeStreams() if streams is None else streams
+
+        if not (0 < tiles[0] <= width and 0 < tiles[1] <= length):
+            raise ValueError(f"Can't split a {width} by {length} grid into {tiles} tiles")
+        self.tiles = tiles
+        xs = [(width * k) // tiles[0] for k in range(tiles[0] + 1)]
+        ys = [(length * k) // tiles[1] for k in range(tiles[1] + 1)]
+        self.bounds = [(xs[a], xs[a + 1], ys[b], ys[b + 1])
+                       for a in range(tiles[0]) for b in range(tiles[1])]
+
+        # The tile holding each subpopulation, for routing migrants.
+        owners = numpy.zeros((width, length), dtype = numpy.int64)
+        for tile, (x0, x1, y0, y1) in enumerate(self.bounds):
+            owners[x0:x1, y0:y1] = tile
+        self.owners = owners
+
+        self.connections = []
+        self.workers = []
+        self._start(sequence, storage, {'batched_games': batched_games,
+                                        'monomorphic_games': monomorphic_games})
+        self.__gather()
+
+    def _start(self, sequence, storage, options):
+        # Starts a worker process for each tile, adding the connection each is
+        # run over to self.connections in tile order. options are passed on to
+        # each tile's storage.
+        context = multiprocessing.get_context()
+        inboxes = [context.Queue() for _ in self.bounds]
+        for tile, bounds in enumerate(self.bounds):
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(
+                target = TiledPopulation._work,
+                args = (worker_connection, tile, bounds, self.owners, self.subpop_size,
+                        sequence, self.config, self.streams.seed, storage, options, inboxes),
+                daemon = True)
+            worker.start()
+            self.connections.append(connection)
+            self.workers.append(worker)
+
+    def popsize(self):
+        """
+        The number of agents currently in the population.
+
+        Returns
+        -------
+        popsize: Integer
+        """
+        return sum(self.__request('popsize'))
+
+    def generation(self, interactions = 1,
+                         fecundity = 1,
+                         relative_fitnesses = True,
+                         migration_distance = 1,
+                         migration_survival = 0.1):
+        """
+        Goes through one full lifecycle of the population, as
+        Population.generation, with every tile working at once.
+
+        Along with Population.generation's data it reports how long each tile
+        took, so imbalance between tiles shows.
+
+        Returns
+        -------
+        dict{behavior_data, fitness_data, monomorphic_demes, tile_times, tile_waits}
+            As Population.generation, with the seconds each tile spent working
+            and waiting for migrants from other tiles, each indexed by tile
+            [a][b].
+        """
+        results = self.__request('generation', interactions, fecundity, relative_fitnesses,
+                                 migration_distance, migration_survival)
+
+        behaviors = self.config.behaviors
+        subpop_counts = [[None] * self.length for _ in range(self.width)]
+        fitness_data = numpy.zeros((self.width, self.length))
+        for (x0, x1, y0, y1), result in zip(self.bounds, results):
+            for i, row in enumerate(result['behavior_data']['subpop_counts']):
+                subpop_counts[x0 + i][y0:y1] = row
+            fitness_data[x0:x1, y0:y1] = result['fitness_data']
+
+        shape = self.tiles
+        return {
+            'behavior_data': {
+                'subpop_counts': subpop_counts,
+                'pop_counts': {
+                    behavior: sum(result['behavior_data']['pop_counts'][behavior]
+                                  for result in results)
+                    for behavior in behaviors
+                },
+                'monomorphic_demes': sum(result['monomorphic_demes'] for result in results)
+            },
+            'fitness_data': fitness_data,
+            'monomorphic_demes': sum(result['monomorphic_demes'] for result in results),
+            'tile_times': numpy.array([result['time'] for result in results]).reshape(shape),
+            'tile_waits': numpy.array([result['wait'] for result in results]).reshape(shape)
+        }
+
+    def census(self, phenotypes = False):
+        """
+        Counts the agents with each sequence, or phenotype, as
+        Population.census.
+        """
+        subpop_data = [[None] * self.length for _ in range(self.width)]
+        pop_data = {}
+        for (x0, _, y0, y1), census in zip(self.bounds, self.__request('census', phenotypes)):
+            for i, row in enumerate(census['subpop_data']):
+                subpop_data[x0 + i][y0:y1] = row
+            for key, count in census['pop_data'].items():
+                pop_data[key] = pop_data.get(key, 0) + count
+        return({'subpop_data': subpop_data, 'pop_data': pop_data})
+
+    def close(self):
+        """ Stops the worker processes. """
+        for connection, worker in zip(self.connections, self.workers):
+            if worker.is_alive():
+                try:
+                    connection.send(('close',))
+                except (BrokenPipeError, OSError):
+                    pass
+            worker.join(timeout = 5)
+            if worker.is_alive():
+                worker.terminate()
+        self.connections = []
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __request(self, command, *args):
+        # Sends every tile the command and returns their replies in tile order.
+        for connection in self.connections:
+            connection.send((command,) + args)
+        return self.__gather()
+
+    def __gather(self):
+        replies = []
+        for connection in self.connections:
+            status, reply = connection.recv()
+            if status == 'error':
+                self.close()
+                raise RuntimeError(f"A tile failed:\n{reply}")
+            replies.append(reply)
+        return replies
+
+    @staticmethod
+    def _work(connection, tile, bounds, owners, subpop_size, sequence, config, seed, storage,
+              options, inboxes):
+        # The loop each worker process runs, holding the population of one tile
+        # and passing migrants through the tiles' queues.
+        def exchange(outgoing):
+            for other, inbox in enumerate(inboxes):
+                if other != tile:
+                    inbox.put(outgoing[other])
+            arrivals = []
+            for _ in range(len(inboxes) - 1):
+                arrivals.extend(inboxes[tile].get())
+            return arrivals
+
+        TiledPopulation._serve(connection, tile, bounds, owners, subpop_size, sequence, config,
+                               seed, storage, options, exchange)
+
+    @staticmethod
+    def _serve(connection, tile, bounds, owners, subpop_size, sequence, config, seed, storage,
+               options, exchange):
+        # Builds a tile's population and answers the coordinator's commands
+        # until it closes. exchange takes the migrants for each tile and returns
+        # those other tiles sent this one.
+        try:
+            x0, x1, y0, y1 = bounds
+            origin = (x0, y0)
+            grid = owners.shape
+            population = storage(
+                x1 - x0, y1 - y0, subpop_size, sequence = sequence, config = config,
+                streams = DemeStreams(seed, origin = origin), **options)
+            connection.send(('ok', None))
+        except Exception:
+            connection.send(('error', traceback.format_exc()))
+            return
+
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                return
+            command, args = message[0], message[1:]
+            if command == 'close':
+                return
+            try:
+                if command == 'generation':
+                    reply = TiledPopulation._generation(
+                        population, tile, origin, grid, owners, exchange, *args)
+                elif command == 'census':
+                    reply = population.census(*args)
+                elif command == 'popsize':
+                    reply = population.popsize()
+                else:
+                    raise ValueError(f"Unknown command {command}")
+                connection.send(('ok', reply))
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+
+    @staticmethod
+    def _generation(population, tile, origin, grid, owners, exchange, interactions, fecundity,
+                    relative_fitnesses, migration_distance, migration_survival):
+        # One generation of a tile, the population's own with migrants
+        # exchanged with every other tile in place of migration.
+        start = time.perf_counter()
+        waits = []
+
+        def migrate(population):
+            migrants = population.emigrate(survival = migration_survival,
+                                           distance = migration_distance,
+                                           origin = origin, grid = grid)
+            outgoing = [[] for _ in range(owners.max() + 1)]
+            for migrant in migrants:
+                outgoing[owners.flat[migrant[0]]].append(migrant)
+            waiting = time.perf_counter()
+            arrivals = outgoing[tile] + exchange(outgoing)
+            waits.append(time.perf_counter() - waiting)
+            population.immigrate(arrivals, origin, grid)
+
+        data = population.generation(interactions, fecundity, relative_fitnesses,
+                                     migrate = migrate)
+        data['time'] = time.perf_counter() - start - waits[0]
+        data['wait'] = waits[0]
+        return data
@@ -39,6 +39,11 @@ class TestAgentStrategy:
         agent = Agent(sequence = "")
         assert agent.strategy() == []
         
+    def test_strategy_keeps_every_gene(self):
+        """ Genes the phenotype drops are still part of the strategy """
+        agent = Agent(sequence = "x*c:c/*c:d/*:c/a:d/")
+        assert agent.strategy() == [('*c', 'c'), ('*c', 'd'), ('*', 'c'), ('a', 'd')]
+        
 class TestAgentResponse:
     """ Tests that the correct response is returned for a given interaction history"""
     
@@ -73,8 +78,8 @@ class TestAgentInteraction:
             agent2 = Agent("*:d/")
             Agent.interact(agent1, agent2)
             
-            lengths.append(len(agent1.payoffs))
-            diffs.append( abs(len(agent1.payoffs) - len(agent2.payoffs)) )
+            lengths.append(agent1.play_count)
+            diffs.append( abs(agent1.play_count - agent2.play_count) )
         
         
         assert sum(diffs) == 0
@@ -170,7 +175,7 @@ class TestFitness:
     def test_payoffs_length_greater_than_zero(self):
         agent = Agent()
         payoffs = [1, 2, 3, 4, 5, 6]
-        agent.payoffs = payoffs
+        agent.add_payoffs(payoffs)
         assert agent.fitness() == sum(payoffs)/len(payoffs)
         
     def test_payoffs_length_zero(self):
@@ -180,6 +185,40 @@ class TestFitness:
         
         
     
+class TestPayoffTotals:
+    """ Tests the running payoff totals """
+    
+    def test_variance(self):
+        agent = Agent()
+        payoffs = [[3, 0, 10], [], [7], [0, 0, 3, 10, 7]]
+        for game in payoffs:
+            agent.add_payoffs(game)
+            
+        flat = [payoff for game in payoffs for payoff in game]
+        mean = sum(flat)/len(flat)
+        
+        assert agent.play_count == len(flat)
+        assert agent.fitness() == pytest.approx(mean)
+        assert agent.payoff_variance() == pytest.approx(
+            sum((payoff - mean)**2 for payoff in flat)/(len(flat) - 1))
+        
+    def test_no_variance(self):
+        agent = Agent()
+        assert agent.payoff_variance() == 0
+        agent.add_payoffs([5])
+        assert agent.payoff_variance() == 0
+        
+    def test_interaction_totals(self):
+        """ Agents keep only totals from their games """
+        agent1 = Agent("*:c/")
+        agent2 = Agent("*:c/")
+        for _ in range(20):
+            Agent.interact(agent1, agent2)
+        
+        assert not hasattr(agent1, 'payoffs')
+        assert agent1.payoff_sum == 7 * agent1.play_count
+        assert agent1.payoff_variance() == 0
+        
 class TestPayOff:
     """ Tests the payoff method """
     
@@ -195,11 +234,33 @@ class TestReset:
     
     def test_payoff_reset(self):
         agent = Agent()
-        agent.payoffs = [1, 2, 3]
+        agent.add_payoffs([1, 2, 3])
         
         agent.reset()
         
-        assert len(agent.payoffs) == 0
+        assert agent.play_count == 0
+        assert agent.payoff_sum == 0
+        assert agent.fitness() == agent.config.mean_payoff
+        
+class TestOffspring:
+    """ Tests offspring share their parent's chromosome """
+    
+    def test_offspring(self):
+        parent = Agent("abcd:c/")
+        parent.add_payoffs([1, 2, 3])
+        child = parent.offspring()
+        
+        assert child.dna.codes is parent.dna.codes
+        assert child.dna.strategy() is parent.dna.strategy()
+        assert child.play_count == 0
+        assert child.response("abcd") == "c"
+        
+    def test_mutated_offspring(self):
+        parent = Agent("a"*100)
+        child = parent.offspring()
+        child.mutate()
+        
+        assert parent.dna.sequence == "a"*100
         
 class TestPassThroughMethods:
     """ Test methods that pass through to chromosome """
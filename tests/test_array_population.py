@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.array_population ArrayPopulation` class."""
+
+import pytest
+
+from coop_evolve.agent import Agent
+from coop_evolve.genotype_table import GenotypeTable
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.population import Population
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.shared_arrays import SharedArrays
+
+
+class TestCreation:
+    """ Tests creating the population """
+    
+    def test_dimensions(self):
+        population = ArrayPopulation(5, 4, 3)
+        
+        assert len(population.population) == 5
+        assert len(population[0]) == 4
+        assert len(population[0][1]) == 3
+        assert population.popsize() == 60
+        
+    def test_specified_sequence(self):
+        population = ArrayPopulation(2, 2, 3, sequence = "abcd")
+        
+        assert len(population.table) == 1
+        assert population[1][1][2].dna.sequence == "abcd"
+        
+    def test_index_errors(self):
+        population = ArrayPopulation(2, 2, 3)
+        
+        with pytest.raises(IndexError):
+            population[2]
+        with pytest.raises(IndexError):
+            population[0][0][3]
+        assert population[-1][-1][-1].sequence == population[1][1][2].sequence
+        
+class TestViews:
+    """ Tests the views read and write the arrays """
+    
+    def test_setting_item(self):
+        population = ArrayPopulation(2, 2, 3)
+        agent = Agent("abcd")
+        agent.add_payoffs([3, 0])
+        population[0][1][2] = agent
+        
+        assert population[0][1][2].dna.sequence == "abcd"
+        assert population[0][1][2].fitness() == 1.5
+        
+    def test_setting_sequence(self):
+        population = ArrayPopulation(2, 2, 3, sequence = "abcd")
+        population[1][0][1].sequence = "a:b/"
+        
+        assert population[1][0][1].response("a") == "b"
+        assert population[1][0][0].response("a") == "d"
+        
+    def test_strategy_matches_population(self):
+        """ Both storages give an agent's own genes, not its phenotype's """
+        sequence = "ab:a/xx*?:b:c/ab:c/c:d/"
+        agents = [ArrayPopulation(1, 1, 2, sequence = sequence)[0][0][1],
+                  Population(1, 1, 2, sequence = sequence)[0][0][1]]
+        
+        assert agents[0].strategy() == agents[1].strategy()
+        assert len(agents[0].strategy()) == 4
+        
+    def test_iteration(self):
+        population = ArrayPopulation(2, 3, 4)
+        agents = [agent for row in population for subpop in row for agent in subpop]
+        assert len(agents) == 24
+        
+class TestMatchesPopulation:
+    """ Tests that with the same random numbers both storages give the same results """
+    
+    @pytest.mark.parametrize("relative_fitnesses", [True, False])
+    def test_generations(self, relative_fitnesses):
+        populations = [
+            Population(3, 2, 8, rng = RandomStream(7)),
+            ArrayPopulation(3, 2, 8, rng = RandomStream(7))
+        ]
+        for _ in range(4):
+            data = [
+                population.generation(fecundity = 2, relative_fitnesses = relative_fitnesses)
+                for population in populations
+            ]
+            
+            assert data[0]['behavior_data'] == data[1]['behavior_data']
+            for row1, row2 in zip(data[0]['fitness_data'], data[1]['fitness_data']):
+                assert row1 == pytest.approx(row2)
+            assert populations[0].census() == populations[1].census()
+            
+    def test_deme_streams(self):
+        populations = [
+            Population(2, 3, 6, streams = DemeStreams(3)),
+            ArrayPopulation(2, 3, 6, streams = DemeStreams(3))
+        ]
+        for _ in range(3):
+            for population in populations:
+                population.generation()
+        
+        assert populations[0].census() == populations[1].census()
+        
+    @pytest.mark.parametrize("batched", [False, True])
+    def test_monomorphic_demes(self, batched):
+        populations = [
+            Population(3, 2, 8, sequence = "abcd:a/*:b/", rng = RandomStream(5),
+                       batched_games = batched, monomorphic_games = True),
+            ArrayPopulation(3, 2, 8, sequence = "abcd:a/*:b/", rng = RandomStream(5),
+                            batched_games = batched, monomorphic_games = True)
+        ]
+        for _ in range(3):
+            data = [population.generation(fecundity = 2) for population in populations]
+            
+            assert data[0]['monomorphic_demes'] == data[1]['monomorphic_demes']
+            assert data[0]['behavior_data'] == data[1]['behavior_data']
+            assert (data[0]['fitness_data'] == data[1]['fitness_data']).all()
+            assert populations[0].census() == populations[1].census()
+        
+    def test_batched_games(self):
+        populations = [
+            Population(3, 2, 8, rng = RandomStream(9), batched_games = True),
+            ArrayPopulation(3, 2, 8, rng = RandomStream(9), batched_games = True)
+        ]
+        for _ in range(3):
+            data = [population.generation() for population in populations]
+            
+            assert data[0]['behavior_data'] == data[1]['behavior_data']
+            assert populations[0].census() == populations[1].census()
+        
+    def test_per_agent_mutation(self):
+        populations = [
+            Population(2, 2, 10, sequence = "a"*50, rng = RandomStream(4)),
+            ArrayPopulation(2, 2, 10, sequence = "a"*50, rng = RandomStream(4))
+        ]
+        for population in populations:
+            population.mutate(batched = False)
+            
+        assert populations[0].census() == populations[1].census()
+        
+    def test_phenotypes(self):
+        populations = [
+            Population(3, 2, 8, rng = RandomStream(9)),
+            ArrayPopulation(3, 2, 8, rng = RandomStream(9))
+        ]
+        for population in populations:
+            population.generation()
+            
+        assert populations[0].census(phenotypes = True) == \
+               populations[1].census(phenotypes = True)
+            
+class TestPhases:
+    """ Tests the phases keep the arrays consistent """
+    
+    def test_population_stability(self):
+        population = ArrayPopulation(3, 3, 10)
+        for _ in range(3):
+            population.generation(fecundity = 3)
+            assert population.popsize() == 90
+            assert len(population.genotypes) == len(population.payoff_sums) == 90
+            
+    def test_migration_distance(self):
+        population = ArrayPopulation(3, 3, 8)
+        population.generation(fecundity = 2, migration_distance = 2)
+        
+        assert population.popsize() == 72
+            
+    def test_absolute_fitness_growth(self):
+        """ Fit agents have more offspring with absolute fitness """
+        population = ArrayPopulation(1, 1, 4, sequence = "abcd")
+        population.payoff_sums[:] = [10, 0, 0, 10]
+        population.play_counts[:] = 1
+        
+        population.reproduce(fecundity = 3, relative_fitnesses = False)
+        
+        # Only the agents with the maximum payoff reproduce, every time.
+        assert len(population[0][0]) == 10
+        assert population.payoff_sums.tolist() == [10, 0, 0, 10] + [0]*6
+        assert population.genotypes.tolist() == [0]*10
+        
+    def test_reset(self):
+        population = ArrayPopulation(2, 2, 5)
+        population.play_game()
+        assert population.play_counts.sum() > 0
+        
+        population.reset()
+        assert population.play_counts.sum() == 0
+        assert population.payoff_sums.sum() == 0
+        
+    def test_compaction(self):
+        population = ArrayPopulation(2, 2, 10)
+        census = population.census()
+        population.genotypes[:] = population.genotypes[0]
+        population.compact()
+        
+        assert len(population.table) == 1
+        assert population.census()['pop_data'] == {population[0][0][0].sequence: 40}
+        assert population[0][0][0].sequence in census['pop_data']
+        
+    def test_tidy(self):
+        """ The table is only compacted once it has doubled in size """
+        population = ArrayPopulation(2, 2, 10, sequence = "ab:c/")
+        population.table.intern("ba:c/")
+        population.tidy()
+        
+        assert len(population.table) == 2
+        population.table.intern("cd:c/")
+        population.tidy()
+        
+        assert len(population.table) == 1
+
+
+class TestSharing:
+    """ Tests populations kept in shared memory """
+    
+    def test_matches_unshared(self):
+        populations = [
+            ArrayPopulation(3, 2, 6, streams = DemeStreams(4)),
+            ArrayPopulation(3, 2, 6, streams = DemeStreams(4), shared = True)
+        ]
+        for _ in range(3):
+            data = [population.generation(fecundity = 2) for population in populations]
+            
+            assert data[0]['behavior_data'] == data[1]['behavior_data']
+            assert populations[0].census() == populations[1].census()
+        populations[1].unshare()
+        
+    def test_handle(self):
+        population = ArrayPopulation(3, 2, 6, rng = RandomStream(4))
+        population.generation(fecundity = 2)
+        attached = SharedArrays.attach(population.share())
+        
+        assert attached['sizes'].tolist() == population.sizes.tolist()
+        sequences = GenotypeTable.unpacked(
+            attached['sequence_codes'], attached['sequence_offsets'])
+        assert sequences[attached['genotypes'][0]] == population[0][0][0].sequence
+        
+        attached['payoff_sums'][0] = 3
+        attached['play_counts'][0] = 1
+        assert population[0][0][0].fitness() == 3
+        attached.close()
+        population.unshare()
+        
+    def test_unshare(self):
+        population = ArrayPopulation(3, 2, 6, shared = True)
+        census = population.census()
+        population.unshare()
+        
+        assert population.shared is None
+        assert population.census() == census
+        population.generation()
+        
+    def test_close(self):
+        with ArrayPopulation(3, 2, 6, shared = True) as population:
+            population.generation()
+            
+        assert population.shared is None
+        population.generation()
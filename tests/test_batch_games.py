@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.batch_games` BatchGames and StateTable classes."""
+
+import numpy
+
+from scipy.stats import binom
+
+from coop_evolve.batch_games import BatchGames
+from coop_evolve.batch_games import StateTable
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.interaction import PairOutcome
+from coop_evolve.population import Population
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.strategy import Strategy
+
+
+class TestStateTable:
+    """ Tests strategies' states are numbered together """
+    
+    def test_start(self):
+        table = StateTable()
+        strategy1 = Strategy("ab:c/")
+        strategy2 = Strategy("ab:c/")
+        
+        assert table.start(strategy1) == 0
+        assert table.start(strategy2) == 1
+        assert table.start(strategy1) == 0
+        
+    def test_advance(self):
+        table = StateTable()
+        strategy = Strategy("*d:a/*c:b/")
+        start = table.start(strategy)
+        index = table.config.behavior_index
+        
+        states = numpy.array([start, start])
+        moves = numpy.array([index['d'], index['c']])
+        following = table.advance(states, moves)
+        
+        assert table.behaviors[table.outputs[following[0]]] == 'a'
+        assert table.behaviors[table.outputs[following[1]]] == 'b'
+        assert (table.transitions[start, moves] == following).all()
+        
+    def test_grows(self):
+        table = StateTable()
+        strategies = [Strategy(f"a{'b' * n}:c/") for n in range(40)]
+        states = [table.start(strategy) for strategy in strategies]
+        
+        assert states == list(range(40))
+        assert len(table.outputs) >= 40
+        assert len(table.transitions) == len(table.outputs)
+        
+
+class TestPlay:
+    """ Tests games played together match games played one at a time """
+    
+    def test_matches_pair_outcome(self):
+        rng = RandomStream(5)
+        strategies = [Chromosome(None, rng = rng).strategy() for _ in range(20)]
+        players1 = rng.integers(0, 20, 500)
+        players2 = rng.integers(0, 20, 500)
+        lengths = rng.geometric(0.1, 500) - 1
+        
+        results = BatchGames().play(strategies, players1, players2, lengths)
+        behaviors = BatchGames().config.behaviors
+        
+        for game in range(500):
+            outcome = PairOutcome(strategies[players1[game]], strategies[players2[game]])
+            history1, history2, total1, total2 = outcome.play(lengths[game])
+            
+            assert results['totals1'][game] == total1
+            assert results['totals2'][game] == total2
+            assert results['squares1'][game] == outcome.squares1[lengths[game]]
+            assert results['squares2'][game] == outcome.squares2[lengths[game]]
+            assert results['counts'][game].tolist() == [
+                (history1 + history2).count(behavior) for behavior in behaviors]
+            
+    def test_no_games(self):
+        results = BatchGames().play([Strategy("ab:c/")], [], [], [])
+        
+        assert len(results['totals1']) == 0
+        assert results['counts'].shape == (0, 4)
+        
+
+class TestPairings:
+    """ Tests the draws of who plays whom and for how long """
+    
+    def test_distinct_players(self):
+        index1, index2, lengths = BatchGames().pairings(5, 100, 20, RandomStream())
+        
+        assert len(index1) == len(index2) == len(lengths) == 2000
+        assert (index1 != index2).all()
+        assert ((index1 >= 0) & (index1 < 5)).all()
+        assert ((index2 >= 0) & (index2 < 5)).all()
+        assert (lengths >= 0).all()
+        
+    def test_uniform_players(self):
+        reps = 10000
+        index1, index2, _ = BatchGames().pairings(4, reps, 1, RandomStream())
+        
+        # Each ordered pair of distinct agents is equally likely, 1/12.
+        pairs = numpy.bincount(index1 * 4 + index2, minlength = 16).reshape(4, 4)/reps
+        conf_99 = (binom.var(reps, 1/12))**(1/2)/reps * 4
+        
+        assert (numpy.diag(pairs) == 0).all()
+        off_diagonal = pairs[~numpy.eye(4, dtype = bool)]
+        assert (abs(off_diagonal - 1/12) < conf_99).all()
+        
+        
+class TestPlayDemes:
+    """ Tests playing every subpopulation of a grid """
+    
+    def test_totals(self):
+        strategies = [Strategy("*:c/"), Strategy("*:d/")]
+        kinds = numpy.array([0, 1, 1, 0, 0, 0])
+        offsets = numpy.array([0, 3, 6])
+        results = BatchGames().play_demes(
+            strategies, offsets, 3, 2, RandomStream(2), kinds = kinds)
+        
+        assert results['behaviors'].shape == (2, 4)
+        assert results['behaviors'].sum() == results['counts'].sum()
+        # Cooperators only ever meet cooperators in the second subpopulation
+        assert results['behaviors'][1].tolist() == [0, 0, results['counts'][3:].sum(), 0]
+        assert (results['totals'][3:] == 7 * results['counts'][3:]).all()
+        
+    def test_deme_streams(self):
+        strategies = [Strategy("*:c/")] * 8
+        results = []
+        for _ in range(2):
+            streams = DemeStreams(4)
+            rngs = [streams.stream(0, y, 'play') for y in range(2)]
+            results.append(BatchGames().play_demes(
+                strategies, [0, 4, 8], 4, 1, rngs)['counts'].tolist())
+            
+        assert results[0] == results[1]
+        
+    def test_demes(self):
+        strategies = [Strategy("*:c/")] * 9
+        results = BatchGames().play_demes(
+            strategies, [0, 3, 6, 9], 3, 2, RandomStream(6), demes = [0, 2])
+        
+        assert results['counts'][3:6].tolist() == [0, 0, 0]
+        assert results['behaviors'][1].tolist() == [0, 0, 0, 0]
+        assert results['counts'].sum() == results['behaviors'].sum()
+        
+    def test_single_agent(self):
+        results = BatchGames().play_demes([Strategy("*:c/")], [0, 1], 1, 1, RandomStream())
+        
+        assert results['counts'].tolist() == [0]
+
+
+class TestMatchesScalarEngine:
+    """ 
+    Tests the batched engine's results are distributed as the scalar engine's
+    """
+    
+    def test_behavior_frequencies(self):
+        reps = 20
+        frequencies = {}
+        for batched in [False, True]:
+            totals = numpy.zeros(4)
+            for rep in range(reps):
+                population = Population(2, 2, 10, sequence = "*d:a/*c:b/*:d/", 
+                                        rng = RandomStream(rep + batched * reps))
+                counts = population.play_game(5, batched = batched)['pop_counts']
+                totals += list(counts.values())
+            frequencies[batched] = totals/totals.sum()
+            
+        # Every agent plays the same so frequencies only vary with the mix of 
+        # game lengths, which is the same for both engines.
+        assert abs(frequencies[True] - frequencies[False]).max() < 0.02
+        
+    def test_play_counts(self):
+        means = {}
+        for batched in [False, True]:
+            population = Population(5, 5, 20, sequence = "*:c/", rng = RandomStream(7))
+            population.play_game(2, batched = batched)
+            means[batched] = numpy.mean(
+                [agent.play_count for row in population.population 
+                 for subpop in row for agent in subpop])
+            
+        # Each agent plays 4 games on average, and the mean is over 1000 games
+        # with geometrically distributed lengths.
+        p = population.config.interaction_p
+        mean_length = p/(1 - p)
+        conf_99 = 4 * 4 * (p/(1 - p)**2/1000)**(1/2)
+        assert abs(means[True] - means[False]) < conf_99 * 2**(1/2)
+        assert abs(means[True] - 4 * mean_length) < conf_99
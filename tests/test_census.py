@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.census` module."""
+
+from coop_evolve.census import Census
+from coop_evolve.chromosome import Chromosome
+
+
+class TestCounts:
+    
+    def test_add_and_remove(self):
+        census = Census(2)
+        dnas = [Chromosome("aa"), Chromosome("aa"), Chromosome("bb")]
+        census.add(dnas[0], 0)
+        census.add(dnas[1], 1)
+        census.add(dnas[2], 1)
+        census.remove(dnas[1])
+        
+        assert census.demes == [{"aa": 1}, {"bb": 1}]
+        assert census.totals == {"aa": 1, "bb": 1}
+        
+    def test_move(self):
+        census = Census(3)
+        dna = Chromosome("aa")
+        census.add(dna, 0)
+        census.move(dna, 2)
+        
+        assert census.demes == [{}, {}, {"aa": 1}]
+        assert census.totals == {"aa": 1}
+        
+    def test_uncounted_ignored(self):
+        census = Census(1)
+        census.remove(Chromosome("aa"))
+        census.move(Chromosome("aa"), 0)
+        
+        assert census.totals == {}
+        
+    def test_layout(self):
+        census = Census(6)
+        census.add(Chromosome("aa"), 4)
+        
+        assert census.data(3)['subpop_data'] == [[{}, {}, {}], [{}, {"aa": 1}, {}]]
+        
+        
+class TestChanges:
+    
+    def test_changes_counted_on_update(self):
+        census = Census(1)
+        dna = Chromosome("aa")
+        census.add(dna, 0)
+        dna.sequence = "bb"
+        
+        assert census.totals == {"aa": 1}
+        census.update()
+        assert census.totals == {"bb": 1}
+        assert census.changes == []
+        
+    def test_counted_once(self):
+        census = Census(1)
+        dna = Chromosome("aaaaaaaa")
+        census.add(dna, 0)
+        for _ in range(5):
+            dna.mutate()
+        dna.sequence = "cc"
+        census.update()
+        
+        assert census.totals == {"cc": 1}
+        
+    def test_removed_changes_ignored(self):
+        census = Census(1)
+        dna = Chromosome("aa")
+        census.add(dna, 0)
+        dna.sequence = "bb"
+        census.remove(dna)
+        census.update()
+        
+        assert census.totals == {}
+        
+    def test_copies_not_counted(self):
+        census = Census(1)
+        dna = Chromosome("aa")
+        census.add(dna, 0)
+        copy = dna.copy()
+        copy.sequence = "bb"
+        census.update()
+        
+        assert census.totals == {"aa": 1}
+        assert census.changes == []
+        
+        
+class TestPhenotypes:
+    
+    def test_phenotypes(self):
+        census = Census(2)
+        for sequence, deme in [("*c:c/", 0), ("d:/*c:c/", 0), ("*a:a/", 1)]:
+            census.add(Chromosome(sequence), deme)
+            
+        data = census.data(1, phenotypes = True)
+        
+        assert data['subpop_data'] == [[{"*c:c/": 2}], [{"*a:a/": 1}]]
+        assert data['pop_data'] == {"*c:c/": 2, "*a:a/": 1}
+        
+    def test_dropped_with_sequence(self):
+        census = Census(1)
+        dna = Chromosome("*a:a/")
+        census.add(dna, 0)
+        census.data(1, phenotypes = True)
+        census.remove(dna)
+        
+        assert census.phenotypes == {}
@@ -4,6 +4,7 @@
 """Tests for `coop_evolve.chromosome` class."""
 
 import math
+import numpy
 import pytest
 import re
 
@@ -13,6 +14,7 @@ from scipy.stats import nbinom
 from scipy.stats import poisson
 
 from coop_evolve.chromosome import Chromosome
+from coop_evolve.random_stream import RandomStream
 
 
 class TestChromosomeCreation:
@@ -51,6 +53,39 @@ class TestChromosomeCreation:
                 expected_length + conf_99
                 )
         
+class TestChromosomeCodes:
+    """Tests the bytearray representation of the sequence."""
+    
+    def test_codes(self):
+        chrom = Chromosome("ab:c/")
+        assert chrom.codes == bytearray(b"ab:c/")
+        assert len(chrom) == 5
+        
+    def test_sequence_follows_codes(self):
+        """The sequence string is rebuilt after the codes change."""
+        chrom = Chromosome("a"*100)
+        while chrom.sequence == "a"*100:
+            chrom.mutate()
+        assert chrom.sequence == chrom.codes.decode('ascii')
+        
+    def test_random_nucleotides(self):
+        codes = Chromosome.random_nucleotides(1000)
+        assert len(codes) == 1000
+        assert set(codes.decode('ascii')) <= set(Chromosome.nucleotides())
+        
+    def test_seeded_chromosomes(self):
+        """The same seed gives the same random chromosome and mutations."""
+        dna1 = Chromosome(rng = RandomStream(42))
+        dna2 = Chromosome(rng = RandomStream(42))
+        assert dna1.sequence == dna2.sequence
+        
+        rng1 = RandomStream(7)
+        rng2 = RandomStream(7)
+        for _ in range(10):
+            dna1.mutate(rng1)
+            dna2.mutate(rng2)
+        assert dna1.sequence == dna2.sequence
+        
 class TestChromosomeHelperMethods:
     """ Tests various class methods form chromosomes"""
     
@@ -248,6 +283,32 @@ class TestCrossingOver:
         
         assert expected_delta - conf_99 < observed_delta < expected_delta + conf_99
         
+    def test_crossover_matches_repeated_swaps(self):
+        """Tests the one pass crossover gives the same sequences as swapping tails one position at a time"""
+        
+        cfg = AppSettings()
+        
+        for seed in range(100):
+            seq1 = "a"*30 + "c"*20
+            seq2 = "b"*40
+            
+            rng = RandomStream(seed)
+            num = rng.poisson(cfg.crossover_rate * 40)
+            positions = rng.integers(0, 40, size=num)
+            
+            expected1 = seq1
+            expected2 = seq2
+            for pos in positions:
+                old1 = expected1
+                expected1 = expected1[:pos] + expected2[pos:]
+                expected2 = expected2[:pos] + old1[pos:]
+                
+            dna1 = Chromosome(seq1)
+            dna2 = Chromosome(seq2)
+            Chromosome.crossover(dna1, dna2, RandomStream(seed))
+            
+            assert dna1.sequence == expected1
+            assert dna2.sequence == expected2
         
         
 
@@ -261,4 +322,97 @@ class TestMutate:
         
         dna.mutate()
         
-        assert dna.sequence != old_dna
\ No newline at end of file
+        assert dna.sequence != old_dna        
+        
+class TestMutants:
+    """ Tests mutating only the chromosomes mutate acts on """
+    
+    @pytest.mark.parametrize("length", [0, 1, 30])
+    def test_mutation_probability(self, length):
+        reps = 5000
+        rng = RandomStream(length)
+        acted = 0
+        for _ in range(reps):
+            copy = Chromosome("a" * length).copy()
+            copy.mutate(rng)
+            acted += type(copy.codes) is not bytes
+            
+        expected = Chromosome.mutation_probability(length)
+        conf_99 = (binom.var(reps, expected))**(1/2)/reps * 4
+        assert abs(acted/reps - expected) < conf_99
+        
+    def test_mutant(self):
+        dna = Chromosome("a"*100)
+        mutants = [dna.mutant(RandomStream(seed)) for seed in range(20)]
+        
+        assert dna.sequence == "a"*100
+        assert all(mutant.sequence != "a"*100 for mutant in mutants)
+        
+    def test_mutants(self):
+        chromosomes = [Chromosome("ab"*20), Chromosome("a"), Chromosome("cd"*10)]
+        mutants = Chromosome.mutants(chromosomes, [50, 3, 0], rng = RandomStream(2))
+        
+        assert [len(children) for children in mutants] == [50, 3, 0]
+        assert chromosomes[0].sequence == "ab"*20
+        assert sum(mutant.sequence != "ab"*20 for mutant in mutants[0]) > 40
+        
+    def test_mutants_match_mutant(self):
+        """ Batched mutants have the same length distribution as one at a time """
+        reps = 2000
+        dna = Chromosome("abcd"*10)
+        batched = [len(mutant) for mutant in 
+                   Chromosome.mutants([dna], [reps], rng = RandomStream(3))[0]]
+        single = [len(dna.mutant(RandomStream(seed))) for seed in range(reps)]
+        
+        sd = (numpy.var(single)/reps * 2)**(1/2)
+        assert abs(numpy.mean(batched) - numpy.mean(single)) < sd * 4
+        
+class TestCopy:
+    """ Tests copies share their codes until one is changed """
+    
+    def test_shared(self):
+        dna = Chromosome("abcd:a/")
+        strategy = dna.strategy()
+        copy = dna.copy()
+        
+        assert copy.codes is dna.codes
+        assert copy.sequence is dna.sequence
+        assert copy.strategy() is strategy
+        
+    def test_changed_copy(self):
+        dna = Chromosome("a"*100)
+        copy = dna.copy()
+        copy.substitutions(RandomStream(1))
+        copy.insertion(RandomStream(2))
+        
+        assert dna.sequence == "a"*100
+        assert copy.sequence != "a"*100
+        assert copy.codes is not dna.codes
+        
+    def test_changed_original(self):
+        dna = Chromosome("abcdabcd")
+        copy = dna.copy()
+        dna.inversion(RandomStream(3))
+        dna.deletion(RandomStream(4))
+        
+        assert copy.sequence == "abcdabcd"
+        
+    def test_mutate_all(self):
+        parents = [Chromosome("a"*50) for _ in range(20)]
+        children = [dna.copy() for dna in parents]
+        changed = Chromosome.mutate_all(children)
+        
+        assert len(changed) > 0
+        assert all(dna.sequence == "a"*50 for dna in parents)
+        assert all(children[index].codes is parents[index].codes 
+                   for index in range(20) if index not in changed)
+                   
+    def test_crossover(self):
+        dna1 = Chromosome("a"*100)
+        dna2 = Chromosome("b"*100)
+        copy1 = dna1.copy()
+        copy2 = dna2.copy()
+        Chromosome.crossover(copy1, copy2)
+        
+        assert dna1.sequence == "a"*100
+        assert dna2.sequence == "b"*100
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.culling Culling` class."""
+
+import numpy
+
+from scipy.stats import binom
+
+from coop_evolve.culling import Culling
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.random_stream import RandomStream
+
+
+class TestSurvivors:
+    """ Tests culling keeps a uniform random subset of each subpopulation """
+    
+    def test_sizes(self):
+        sizes = numpy.array([7, 2, 3, 12])
+        order, new_sizes = Culling.survivors(sizes, 3, RandomStream())
+        
+        assert new_sizes.tolist() == [3, 2, 3, 3]
+        assert len(order) == 11
+        assert order.tolist() == sorted(order.tolist())
+        assert order[3:8].tolist() == [7, 8, 9, 10, 11]
+        
+    def test_survival_probabilities(self):
+        reps = 2000
+        order, _ = Culling.survivors(numpy.full(reps, 10), 4, RandomStream())
+        survived = numpy.bincount(order % 10, minlength = 10)/reps
+        
+        # Every agent survives with probability 4/10
+        conf_99 = (binom.var(reps, 0.4))**(1/2)/reps * 4
+        assert (abs(survived - 0.4) < conf_99).all()
+        
+    def test_deme_streams(self):
+        sizes = numpy.array([5, 9, 1])
+        results = []
+        for _ in range(2):
+            streams = DemeStreams(3)
+            rngs = [streams.stream(0, y, 'cull') for y in range(3)]
+            results.append(Culling.survivors(sizes, 2, rngs)[0].tolist())
+            
+        assert results[0] == results[1]
+        assert len(results[0]) == 5
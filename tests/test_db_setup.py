@@ -154,7 +154,7 @@ class TestDBReset:
         result = [item[0] for item in cur.fetchall()]
         result.sort()
         expected = ['id', 'simulation_id', 'generations', 'width', 'length', 'subpop_size', 'relative_fitnesses', 
-                    'migration_distance', 'migration_survival', 'initial_sequence']
+                    'migration_distance', 'migration_survival', 'initial_sequence', 'seed']
         expected.sort()
         assert result == expected
         
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.deme_scheduler` module."""
+
+import multiprocessing
+
+import numpy
+import pytest
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.deme_scheduler import DemeScheduler
+from coop_evolve.random_stream import DemeStreams
+
+
+class TestMatchesSerial:
+    """ Tests that scheduled on workers the phases give the population's own results """
+
+    @pytest.mark.parametrize("relative_fitnesses", [True, False])
+    def test_generations(self, relative_fitnesses):
+        serial = ArrayPopulation(4, 3, 6, streams = DemeStreams(5))
+        with DemeScheduler(3) as scheduler:
+            scheduled = ArrayPopulation(4, 3, 6, streams = DemeStreams(5), scheduler = scheduler)
+            for _ in range(4):
+                data = [
+                    population.generation(fecundity = 2, migration_distance = 1,
+                                          migration_survival = 0.5,
+                                          relative_fitnesses = relative_fitnesses)
+                    for population in [serial, scheduled]
+                ]
+
+                assert data[0]['behavior_data'] == data[1]['behavior_data']
+                assert (data[0]['fitness_data'] == data[1]['fitness_data']).all()
+                assert (scheduled.genotypes == serial.genotypes).all()
+                assert scheduled.table.sequences == serial.table.sequences
+
+    def test_monomorphic_demes(self):
+        serial = ArrayPopulation(2, 2, 10, sequence = "*d:d/*:c/", streams = DemeStreams(2),
+                                 monomorphic_games = True)
+        with DemeScheduler(2) as scheduler:
+            scheduled = ArrayPopulation(2, 2, 10, sequence = "*d:d/*:c/",
+                                        streams = DemeStreams(2), scheduler = scheduler,
+                                        monomorphic_games = True)
+            for population in [serial, scheduled]:
+                population[0][0][0].sequence = "*:d/"
+            data = [population.play_game(2) for population in [serial, scheduled]]
+
+            assert data[1]['monomorphic_demes'] == 3
+            assert data[0] == data[1]
+            assert (scheduled.payoff_sums == serial.payoff_sums).all()
+
+    def test_needs_streams(self):
+        with pytest.raises(ValueError):
+            ArrayPopulation(2, 2, 2, scheduler = DemeScheduler(1))
+
+
+class TestStats:
+
+    def test_stats(self):
+        with DemeScheduler(2) as scheduler:
+            population = ArrayPopulation(3, 3, 4, streams = DemeStreams(1), scheduler = scheduler)
+            population.generation()
+
+            assert set(scheduler.stats) == set(DemeScheduler.phases)
+            for stats in scheduler.stats.values():
+                assert stats['tasks'].sum() == 9
+                assert (stats['busy'] > 0).any()
+                assert 0 < stats['utilization'] <= 1
+            assert len(scheduler.costs['play']) == 9
+
+    def test_unknown_phase(self):
+        with DemeScheduler(1) as scheduler:
+            with pytest.raises(ValueError):
+                scheduler.run(ArrayPopulation(1, 1, 2, streams = DemeStreams(1)), 'cull')
+
+    def test_closed(self):
+        scheduler = DemeScheduler(2)
+        population = ArrayPopulation(2, 2, 3, streams = DemeStreams(1), scheduler = scheduler)
+        population.mutate()
+        processes = scheduler.processes
+        scheduler.close()
+
+        assert not any(process.is_alive() for process in processes)
+        assert population.shared is None
+        population.genotypes[0] = 0
+
+
+class TestStealing:
+    """ Tests taking tasks from the queues """
+
+    def test_own_tasks_first(self):
+        tasks = numpy.array([4, 2, 0, 3, 1])
+        ends = numpy.array([[0, 3], [3, 5]])
+        lock = multiprocessing.Lock()
+
+        assert [DemeScheduler._take(lock, tasks, ends, 1) for _ in range(2)] == \
+               [(3, False), (1, False)]
+
+    def test_steals_shortest_of_busiest(self):
+        tasks = numpy.array([4, 2, 0, 3, 1, 5])
+        ends = numpy.array([[0, 3], [3, 5], [5, 5]])
+        lock = multiprocessing.Lock()
+
+        taken = [DemeScheduler._take(lock, tasks, ends, 2) for _ in range(6)]
+
+        assert taken == [(0, True), (2, True), (1, True), (4, True), (3, True), (None, False)]
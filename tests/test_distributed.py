@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.distributed` module."""
+
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.distributed import AUTHKEY_VARIABLE
+from coop_evolve.distributed import GridCoordinator
+from coop_evolve.distributed import MigrantCodec
+from coop_evolve.population import Population
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.simulation_config import SimulationConfig
+
+
+class TestMigrantCodec:
+
+    def test_round_trip(self):
+        encoder = MigrantCodec()
+        decoder = MigrantCodec()
+        migrants = [(7, 2, "abcd"), (3, 2, "ba"), (7, 5, "abcd"), (120, 0, "")]
+
+        assert decoder.decode(encoder.encode(migrants)) == migrants
+        assert decoder.decode(encoder.encode([])) == []
+
+    def test_sequences_sent_once(self):
+        encoder = MigrantCodec()
+        decoder = MigrantCodec()
+        migrants = [(1, 0, "abcdabcdabcd"), (2, 0, "dcbadcbadcba"), (3, 1, "abcdabcdabcd")]
+        message = encoder.encode(migrants)
+
+        assert len(message) == 8 + 2 * (4 + 12) + 3 * 4 * 3
+        assert decoder.decode(message) == migrants
+        
+    def test_messages_stand_alone(self):
+        """ Numbering restarts with each message, so the codecs keep nothing between them """
+        encoder = MigrantCodec()
+        migrants = [(1, 0, "abcdabcdabcd"), (2, 0, "dcbadcbadcba")]
+        first = encoder.encode(migrants)
+        
+        assert encoder.encode(migrants) == first
+        assert MigrantCodec().decode(encoder.encode(migrants[::-1])) == migrants[::-1]
+        
+    @pytest.mark.parametrize("sequence", ["", "a", "ab:c/*d:a/", "*?+:/dcba*"])
+    def test_nucleotides(self, sequence):
+        nucleotides = SimulationConfig.default().nucleotides
+        encoder = MigrantCodec(nucleotides)
+        decoder = MigrantCodec(nucleotides)
+        migrants = [(0, 1, sequence), (2, 3, sequence + "b"), (4, 5, "d")]
+        message = encoder.encode(migrants)
+        
+        assert decoder.decode(message) == migrants
+        characters = 2 * len(sequence) + 2
+        assert len(message) == 8 + 3 * 4 + (characters + 1) // 2 + 3 * 3 * 4
+        
+    def test_unknown_nucleotides(self):
+        with pytest.raises(ValueError):
+            MigrantCodec("abcd").encode([(0, 1, "abe")])
+
+
+class TestMatchesSerial:
+    """ Tests that nodes connected over TCP give the same results as one population """
+
+    @pytest.mark.parametrize("storage", [Population, ArrayPopulation])
+    @pytest.mark.parametrize("tiles", [(1, 1), (2, 2)])
+    def test_generations(self, storage, tiles):
+        serial = storage(4, 3, 6, streams = DemeStreams(5))
+        with GridCoordinator(4, 3, 6, streams = DemeStreams(5), tiles = tiles,
+                             storage = storage) as grid:
+            assert grid.census() == serial.census()
+            for _ in range(3):
+                data = [
+                    population.generation(fecundity = 2, migration_distance = 1,
+                                          migration_survival = 0.5)
+                    for population in [serial, grid]
+                ]
+
+                assert data[0]['behavior_data'] == data[1]['behavior_data']
+                assert (data[0]['fitness_data'] == data[1]['fitness_data']).all()
+                assert grid.census() == serial.census()
+            assert data[1]['tile_times'].shape == tiles
+
+    def test_nodes_started_elsewhere(self):
+        """ Nodes started on their own, as on other hosts, join the grid """
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            host, port = probe.getsockname()
+        environment = dict(os.environ, **{AUTHKEY_VARIABLE: b'key'.hex()})
+        nodes = [
+            subprocess.Popen([sys.executable, '-m', 'coop_evolve.distributed', host, str(port)],
+                             env = environment)
+            for _ in range(2)
+        ]
+        
+        serial = ArrayPopulation(2, 2, 4, streams = DemeStreams(7))
+        try:
+            with GridCoordinator(2, 2, 4, streams = DemeStreams(7), tiles = (2, 1),
+                                 address = (host, port), authkey = b'key',
+                                 launch = False, timeout = 60) as grid:
+                for population in [serial, grid]:
+                    population.generation(migration_distance = 1, migration_survival = 1)
+                    
+                assert grid.census() == serial.census()
+            assert [node.wait(timeout = 10) for node in nodes] == [0, 0]
+        finally:
+            for node in nodes:
+                node.kill()
+                
+                
+class TestNodes:
+    
+    def test_missing_nodes(self):
+        with pytest.raises(TimeoutError):
+            GridCoordinator(2, 2, 2, tiles = (2, 1), launch = False, timeout = 0.5)
+
+    def test_closed(self):
+        grid = GridCoordinator(2, 2, 2, tiles = (2, 1))
+        nodes = grid.workers
+        grid.close()
+
+        assert all(node.poll() is not None for node in nodes)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.frequency_population` FrequencyPopulation class."""
+
+import pytest
+
+from scipy.stats import binom
+
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.frequency_population import FrequencyPopulation
+from coop_evolve.random_stream import DemeStreams
+
+
+def mixed(cooperators, defectors, width = 1, length = 1):
+    """ A population with *cooperators* always playing c and *defectors* always d per subpopulation """
+    population = FrequencyPopulation(width, length, cooperators + defectors, sequence = "*:c/")
+    cooperate = population.table.intern("*:c/")
+    defect = population.table.intern("*:d/")
+    counts = {genotype: count for genotype, count in 
+              [(cooperate, cooperators), (defect, defectors)] if count > 0}
+    population.counts = [dict(counts) for _ in population.counts]
+    population.reset()
+    return population, cooperate, defect
+
+
+class TestCreation:
+    """ Tests a population starts with the right counts """
+    
+    def test_specified_sequence(self):
+        population = FrequencyPopulation(2, 3, 5, sequence = "abcd")
+        
+        assert population.popsize() == 30
+        assert population.census()['pop_data'] == {"abcd": 30}
+        assert population.census()['subpop_data'][1][2] == {"abcd": 5}
+        
+    def test_phenotype_census(self):
+        population = FrequencyPopulation(1, 2, 5, sequence = "*c:c/")
+        population.counts[1] = {population.table.intern("d:/*c:c/"): 5}
+        
+        assert population.census(phenotypes = True)['pop_data'] == {"*c:c/": 10}
+        assert population.play_game()['monomorphic_demes'] == 2
+        
+    def test_random_sequences(self):
+        population = FrequencyPopulation(2, 2, 10)
+        
+        assert population.popsize() == 40
+        assert sum(population.census()['pop_data'].values()) == 40
+        
+
+class TestPlayGame:
+    """ Tests games are played on counts with the scalar engine's statistics """
+    
+    def test_fitness(self):
+        population, cooperate, defect = mixed(10, 0)
+        population.play_game()
+        
+        assert population.fitness()[0][cooperate] == 7
+        
+    def test_behavior_frequencies(self):
+        population, _, _ = mixed(60, 40, 3, 3)
+        data = population.play_game(5)
+        
+        # Every agent plays equally often in expectation, so 60% of moves are c
+        counts = data['pop_counts']
+        moves = counts['c'] + counts['d']
+        assert counts['a'] == counts['b'] == 0
+        assert abs(counts['c']/moves - 0.6) < 0.02
+        
+    @pytest.mark.parametrize("subpop_size, interactions", [(50, 1), (5, 20)])
+    def test_interaction_lengths(self, subpop_size, interactions):
+        """ Each agent plays about 2 * interactions * interaction_length moves """
+        population = FrequencyPopulation(10, 10, subpop_size)
+        population.play_game(interactions)
+        
+        moves = sum(sum(plays.values()) for plays in population.play_counts)
+        mean = moves/population.popsize()
+        
+        p = population.config.interaction_p
+        games = 100 * subpop_size * interactions
+        conf_99 = 2 * games * (p/(1 - p)**2/games)**(1/2) * 4/population.popsize() * 2
+        assert abs(mean - 2 * interactions * p/(1 - p)) < conf_99
+        
+    def test_data_collection(self):
+        population = FrequencyPopulation(2, 2, 10)
+        data = population.play_game()
+        
+        assert sorted(data['subpop_counts'][1][0]) == ['a', 'b', 'c', 'd']
+        assert data['pop_counts']['d'] > 0
+        
+    def test_monomorphic_demes(self):
+        population, cooperate, defect = mixed(5, 5, 2, 2)
+        population.counts[3] = {cooperate: 10}
+        
+        assert population.play_game()['monomorphic_demes'] == 1
+        
+    def test_single_agent(self):
+        population = FrequencyPopulation(1, 1, 1)
+        data = population.play_game()
+        
+        assert sum(data['pop_counts'].values()) == 0
+        
+
+class TestReproduction:
+    """ Tests offspring are drawn on counts """
+    
+    def test_relative_fitness(self):
+        reps = 200
+        population, cooperate, defect = mixed(5, 5, 10, 20)
+        population.payoff_sums = [{cooperate: 3, defect: 1} for _ in population.counts]
+        population.play_counts = [{cooperate: 1, defect: 1} for _ in population.counts]
+        
+        mean_fitnesses = population.reproduce(fecundity = 2)
+        
+        assert population.popsize() == reps * 30
+        assert mean_fitnesses.shape == (10, 20)
+        assert mean_fitnesses[0][0] == pytest.approx(2)
+        
+        # Cooperators have 3/4 of the 20 offspring in each subpopulation
+        born = sum(counts[cooperate] - 5 for counts in population.counts)/(reps * 20)
+        conf_99 = (binom.var(reps * 20, 0.75))**(1/2)/(reps * 20) * 4
+        assert abs(born - 0.75) < conf_99
+        
+    def test_absolute_fitness(self):
+        population, cooperate, defect = mixed(4, 0)
+        population.payoff_sums = [{cooperate: 10}]
+        population.play_counts = [{cooperate: 1}]
+        
+        mean_fitnesses = population.reproduce(fecundity = 3, relative_fitnesses = False)
+        
+        # The maximum payoff always reproduces
+        assert population.counts == [{cooperate: 16}]
+        assert mean_fitnesses[0][0] == 1
+        
+    def test_barren(self):
+        population, cooperate, defect = mixed(3, 3)
+        population.payoff_sums = [{cooperate: 0, defect: 0}]
+        population.play_counts = [{cooperate: 1, defect: 1}]
+        
+        mean_fitnesses = population.reproduce()
+        
+        assert population.popsize() == 12
+        assert mean_fitnesses[0][0] == pytest.approx(1/6)
+        
+
+class TestMutation:
+    """ Tests mutation moves a binomial share of each genotype """
+    
+    def test_mutated_fraction(self):
+        population = FrequencyPopulation(1, 1, 2000, sequence = "abcd" * 5)
+        population.mutate()
+        
+        unchanged = population.counts[0].get(population.table.intern("abcd" * 5), 0)/2000
+        touched = Chromosome.mutation_probability(20, population.config)
+        
+        # Some acted on sequences end up unchanged, so at least this many are.
+        assert population.popsize() == 2000
+        assert unchanged > 1 - touched - (binom.var(2000, touched))**(1/2)/2000 * 4
+        
+    def test_payoff_shares(self):
+        population = FrequencyPopulation(1, 1, 100, sequence = "abcd" * 5)
+        genotype = population.table.intern("abcd" * 5)
+        population.payoff_sums = [{genotype: 500.0}]
+        population.play_counts = [{genotype: 100.0}]
+        population.mutate()
+        
+        assert sum(population.payoff_sums[0].values()) == pytest.approx(500)
+        assert sum(population.play_counts[0].values()) == pytest.approx(100)
+        assert all(fitness == pytest.approx(5) for fitness in population.fitness()[0].values())
+        
+        
+class TestMigration:
+    """ Tests the surplus leaves and some survive """
+    
+    def test_migration_survival(self):
+        population, _, _ = mixed(20, 20, 5, 5)
+        population.subpop_size = 10
+        population.migrate(survival = 0.5, distance = 0)
+        
+        # With no distance survivors stay home, 30 leave per subpopulation.
+        survivors = population.popsize() - 250
+        conf_99 = (binom.var(750, 0.5))**(1/2) * 4
+        assert abs(survivors - 375) < conf_99
+        
+    def test_leavers_by_genotype(self):
+        population, cooperate, defect = mixed(30, 10, 20, 20)
+        population.subpop_size = 20
+        population.migrate(survival = 0, distance = 1)
+        
+        # Leavers are a uniform subset, so 3/4 of those left are cooperators
+        cooperators = sum(counts.get(cooperate, 0) for counts in population.counts)/8000
+        conf_99 = (0.75 * 0.25/8000)**(1/2) * 4
+        assert population.popsize() == 8000
+        assert abs(cooperators - 0.75) < conf_99
+        
+        
+class TestCull:
+    """ Tests culling keeps a uniform subset """
+    
+    def test_cull(self):
+        population, cooperate, defect = mixed(8, 2, 20, 20)
+        population.subpop_size = 5
+        population.cull()
+        
+        assert [sum(counts.values()) for counts in population.counts] == [5] * 400
+        cooperators = sum(counts.get(cooperate, 0) for counts in population.counts)/2000
+        conf_99 = (0.8 * 0.2/2000)**(1/2) * 4
+        assert abs(cooperators - 0.8) < conf_99
+        
+
+class TestGeneration:
+    """ Tests the lifecycle keeps the population consistent """
+    
+    @pytest.mark.parametrize("relative_fitnesses", [True, False])
+    def test_generations(self, relative_fitnesses):
+        population = FrequencyPopulation(3, 3, 10)
+        for _ in range(3):
+            data = population.generation(fecundity = 2, relative_fitnesses = relative_fitnesses)
+            assert data['fitness_data'].shape == (3, 3)
+            assert all(count > 0 for counts in population.counts for count in counts.values())
+            
+            if relative_fitnesses:
+                assert population.popsize() == 90
+            else:
+                assert population.popsize() <= 90
+                
+    def test_migration_distance(self):
+        population = FrequencyPopulation(3, 3, 8)
+        population.generation(fecundity = 2, migration_distance = 2)
+        
+        assert population.popsize() == 72
+        
+    def test_survival_not_a_probability(self):
+        with pytest.raises(ValueError):
+            FrequencyPopulation(2, 2, 4).migrate(survival = 1.5)
+        
+    def test_mate(self):
+        population = FrequencyPopulation(2, 2, 10)
+        population.mate()
+        
+        assert population.popsize() == 40
+        
+    def test_deme_streams(self):
+        populations = [FrequencyPopulation(2, 3, 6, streams = DemeStreams(5)) for _ in range(2)]
+        for population in populations:
+            for _ in range(3):
+                population.generation()
+                
+        assert populations[0].census() == populations[1].census()
+        
+    def test_compaction(self):
+        population = FrequencyPopulation(2, 2, 10)
+        sequence = population.census()['subpop_data'][0][0]
+        genotype = population.counts[0].popitem()[0]
+        population.counts = [{genotype: 10} for _ in population.counts]
+        population.compact()
+        
+        assert len(population.table) == 1
+        assert population.counts == [{0: 10}] * 4
+        assert population.table.sequence(0) in sequence
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.genotype_table GenotypeTable` class."""
+
+import numpy
+
+from coop_evolve.genotype_table import GenotypeTable
+
+
+class TestInterning:
+    """ Tests sequences are stored once """
+    
+    def test_ids(self):
+        table = GenotypeTable()
+        
+        assert table.intern("abcd") == 0
+        assert table.intern("ab:c/") == 1
+        assert table.intern("abcd") == 0
+        assert len(table) == 2
+        assert table.sequence(1) == "ab:c/"
+        
+    def test_shared_chromosome(self):
+        table = GenotypeTable()
+        genotype = table.intern("a:b/")
+        
+        assert table.chromosome(genotype) is table.chromosome(genotype)
+        assert table.strategy(genotype).response("a") == "b"
+        
+    def test_outcome(self):
+        table = GenotypeTable()
+        cooperator = table.intern("*:c/")
+        defector = table.intern("")
+        
+        history1, history2, total1, total2 = table.outcome(cooperator, defector).play(3)
+        assert history1 == "ccc"
+        assert history2 == "ddd"
+        assert total1 == 0
+        assert total2 == 30
+        
+class TestCompaction:
+    """ Tests unused genotypes are dropped """
+    
+    def test_compact(self):
+        table = GenotypeTable()
+        for sequence in ["a", "b", "c", "d"]:
+            table.intern(sequence)
+            
+        genotypes = table.compact(numpy.array([3, 1, 3], dtype = numpy.int32))
+        
+        assert len(table) == 2
+        assert genotypes.dtype == numpy.int32
+        assert [table.sequence(genotype) for genotype in genotypes] == ["d", "b", "d"]
+        assert table.intern("b") == 0
+        assert table.intern("a") == 2
+        assert table.compactions == 1
+        
+class TestPacking:
+    
+    def test_packed(self):
+        table = GenotypeTable()
+        for sequence in ["abcd", "", "*c:c/"]:
+            table.intern(sequence)
+        codes, offsets = table.packed()
+        
+        assert offsets.tolist() == [0, 4, 4, 9]
+        assert GenotypeTable.unpacked(codes, offsets) == ["abcd", "", "*c:c/"]
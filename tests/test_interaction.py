@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.interaction` module."""
+
+import numpy
+import pytest
+
+from coop_evolve.agent import Agent
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.interaction import InteractionCache
+from coop_evolve.interaction import PairOutcome
+from coop_evolve.random_stream import RandomStream
+
+
+class TestPairOutcome:
+    """ Tests the played out games between two genotypes """
+    
+    def test_matches_move_by_move_play(self):
+        """ The outcome should be the same as playing the game one move at a time """
+        for _ in range(20):
+            agent1 = Agent()
+            agent2 = Agent()
+            
+            history1 = ""
+            history2 = ""
+            payoff1 = 0
+            payoff2 = 0
+            for _ in range(30):
+                history1 += agent1.response(history2)
+                history2 += agent2.response(history1)
+                payoff1 += Agent.payoff(history2[-1] + history1[-1])
+                payoff2 += Agent.payoff(history1[-1] + history2[-1])
+                
+            outcome = PairOutcome(agent1.dna.strategy(), agent2.dna.strategy())
+            
+            assert outcome.play(30) == (history1, history2, payoff1, payoff2)
+            
+    def test_known_game(self):
+        """ Tit for tat against always defect """
+        outcome = PairOutcome(Chromosome("*d:d/*:c/").strategy(), Chromosome("*:d/").strategy())
+        
+        assert outcome.play(3) == ("cdd", "ddd", 6, 16)
+        assert outcome.totals1 == [0, 0, 3, 6]
+        
+    def test_shorter_game_after_longer(self):
+        outcome = PairOutcome(Chromosome("*d:d/*:c/").strategy(), Chromosome("*:d/").strategy())
+        outcome.play(10)
+        
+        assert outcome.play(2) == ("cd", "dd", 3, 13)
+        assert outcome.play(0) == ("", "", 0, 0)
+        
+class TestPlayMany:
+    """ Tests playing many games between the same pair at once """
+    
+    def tit_for_tat_outcome(self):
+        return PairOutcome(Chromosome("*d:d/*:c/").strategy(), Chromosome("*:d/").strategy())
+    
+    def test_matches_games_played_one_at_a_time(self):
+        outcome = self.tit_for_tat_outcome()
+        results = outcome.play_many(20, RandomStream(3))
+        
+        # Few games have their lengths drawn one by one, as Agent.interact
+        lengths = RandomStream(3).geometric(1 - outcome.config.interaction_p, 20) - 1
+        games = [outcome.play(length) for length in lengths.tolist()]
+        
+        assert results['moves'] == lengths.sum()
+        assert results['totals1'] == sum(game[2] for game in games)
+        assert results['totals2'] == sum(game[3] for game in games)
+        assert results['squares1'] == sum(outcome.squares1[length] for length in lengths)
+        assert results['counts'].tolist() == [
+            sum((game[0] + game[1]).count(behavior) for game in games) for behavior in "abcd"]
+            
+    def test_many_games(self):
+        outcome = self.tit_for_tat_outcome()
+        p = outcome.config.interaction_p
+        games = 5000
+        results = outcome.play_many(games, RandomStream(4))
+        
+        mean = p/(1 - p)
+        conf_99 = (p/(1 - p)**2/games)**(1/2) * 4
+        assert abs(results['moves']/games - mean) < conf_99
+        assert results['counts'].sum() == 2 * results['moves']
+        
+    def test_game_lengths(self):
+        p = 10/11
+        lengths = PairOutcome.game_lengths(p)
+        
+        assert lengths.sum() == pytest.approx(1)
+        assert (lengths * numpy.arange(len(lengths))).sum() == pytest.approx(10)
+        assert PairOutcome.game_lengths(p) is lengths
+        
+    def test_play_shared(self):
+        dna = Chromosome("*d:d/*:c/")
+        outcome = PairOutcome(dna.strategy(), dna.strategy())
+        results = outcome.play_shared(30, 7, RandomStream(5))
+        
+        assert results['counts'].max() - results['counts'].min() <= 1
+        assert results['counts'].sum() == results['behaviors'].sum()
+        # Tit for tat against itself always cooperates
+        assert results['totals'] == pytest.approx(7 * results['counts'])
+        
+
+class TestInteractionCache:
+    """ Tests the LRU outcome cache """
+    
+    def test_hits_and_misses(self):
+        cache = InteractionCache(maxsize = 10)
+        
+        dna1 = Chromosome("*d:d/*:c/")
+        dna2 = Chromosome("*:d/")
+        
+        first = cache.get(dna1, dna2)
+        second = cache.get(Chromosome("*d:d/*:c/"), Chromosome("*:d/"))
+        
+        # The order of the pair matters since the first agent moves first.
+        cache.get(dna2, dna1)
+        
+        assert first is second
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 2
+        
+    def test_keyed_by_phenotype(self):
+        cache = InteractionCache(maxsize = 10)
+        
+        first = cache.get(Chromosome("*d:d/*:c/"), Chromosome("*:d/"))
+        second = cache.get(Chromosome(":*d:d/*:c/c:a/"), Chromosome(""))
+        
+        assert first is second
+        assert len(cache) == 1
+        
+    def test_evictions(self):
+        cache = InteractionCache(maxsize = 1)
+        
+        cache.get(Chromosome("a:a/"), Chromosome("b:b/"))
+        cache.get(Chromosome("b:b/"), Chromosome("a:a/"))
+        
+        assert cache.evictions == 1
+        assert len(cache) == 1
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.migration Migration` class."""
+
+import numpy
+import pytest
+
+from scipy.stats import binom
+from scipy.stats import poisson
+
+from coop_evolve.migration import Migration
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.random_stream import RandomStream
+
+
+class TestDisplacements:
+    """ Tests displacements follow a poisson distance in a random direction """
+    
+    @pytest.mark.parametrize("distance", [0.5, 1, 4])
+    def test_mean_distance(self, distance):
+        reps = 10000
+        displacements = Migration.displacements(distance, reps, RandomStream())
+        
+        conf_99 = (poisson.var(distance)/reps)**(1/2) * 4
+        assert distance - conf_99 < abs(displacements).mean() < distance + conf_99
+        assert abs(displacements.mean()) < (2 * distance/reps)**(1/2) * 4
+        
+    def test_no_distance(self):
+        assert (Migration.displacements(0, 100, RandomStream()) == 0).all()
+        
+class TestMigrate:
+    """ Tests surplus agents leave and the survivors arrive """
+    
+    def test_residents_stay(self):
+        sizes = numpy.array([5, 2, 8, 3])
+        order, new_sizes = Migration.migrate(sizes, 3, 2, 2, 0, 1, RandomStream())
+        
+        assert new_sizes.tolist() == [3, 2, 3, 3]
+        assert order[3:5].tolist() == [5, 6]
+        assert set(order[:3].tolist()) <= {0, 1, 2, 3, 4}
+        assert len(set(order.tolist())) == len(order)
+        
+    def test_survival(self):
+        reps = 1000
+        
+        # Survivors can't leave a 1 x 1 grid if they don't move.
+        rng = RandomStream()
+        arrivals = []
+        for _ in range(reps):
+            _, new_sizes = Migration.migrate([20], 10, 1, 1, 0.3, 0, rng)
+            arrivals.append(new_sizes[0] - 10)
+                
+        conf_99 = (binom.var(10, 0.3)/reps)**(1/2) * 4
+        assert 3 - conf_99 < sum(arrivals)/reps < 3 + conf_99
+        
+    @pytest.mark.parametrize("survival", [-0.1, 2])
+    def test_survival_not_a_probability(self, survival):
+        with pytest.raises(ValueError):
+            Migration.migrate([20], 10, 1, 1, survival, 1, RandomStream())
+            
+    def test_arrivals_after_residents(self):
+        order, new_sizes = Migration.migrate([10], 2, 1, 1, 1, 0, RandomStream())
+        assert new_sizes.tolist() == [10]
+        assert sorted(order.tolist()) == list(range(10))
+        
+    def test_deme_streams(self):
+        """ Per subpopulation streams give the same result however often they're made """
+        sizes = numpy.array([6, 4, 9, 3, 7, 2])
+        results = []
+        for _ in range(2):
+            streams = DemeStreams(12)
+            rngs = [streams.stream(x, y, 'migrate') for x in range(2) for y in range(3)]
+            results.append(Migration.migrate(sizes, 3, 2, 3, 0.5, 1, rngs))
+            
+        assert results[0][0].tolist() == results[1][0].tolist()
+        assert results[0][1].tolist() == results[1][1].tolist()
+        assert (results[0][1] >= numpy.minimum(sizes, 3)).all()
+        
+    def test_tile(self):
+        """ A tile of the grid gives the same destinations as the whole grid """
+        sizes = numpy.array([6, 4, 9, 3, 7, 2])
+        streams = DemeStreams(12)
+        rngs = [streams.stream(x, y, 'migrate') for x in range(2) for y in range(3)]
+        whole, migrants = Migration.destinations(sizes, 3, 2, 3, 1, 1, rngs)
+        
+        # The second row as a 1 by 3 tile
+        streams = DemeStreams(12, origin = (1, 0))
+        rngs = [streams.stream(0, y, 'migrate') for y in range(3)]
+        tile, tile_migrants = Migration.destinations(
+            sizes[3:], 3, 1, 3, 1, 1, rngs, origin = (1, 0), grid = (2, 3))
+        
+        assert tile.tolist() == whole[19:].tolist()
+        assert tile_migrants.tolist() == migrants[19:].tolist()
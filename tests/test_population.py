@@ -4,6 +4,7 @@
 """Tests for `coop_evolve.population Population` class."""
 
 import collections
+import numpy
 import pytest
 import random
 
@@ -11,6 +12,7 @@ from app_settings import AppSettings
 
 from coop_evolve.agent import Agent
 from coop_evolve.population import Population
+from coop_evolve.random_stream import DemeStreams
 
 from scipy.stats import nbinom
 from scipy.stats import poisson
@@ -76,7 +78,8 @@ class TestPopulationCreation:
 class TestPlayingGame:
     """ Test aspects of playing the game """
     
-    def test_interaction_lengths(self):
+    @pytest.mark.parametrize("batched", [False, True])
+    def test_interaction_lengths(self, batched):
         """ Tests that the interaction length is correct """
         
         cfg = AppSettings()
@@ -89,7 +92,7 @@ class TestPlayingGame:
         
         population = Population(width, length, subpop_size)
         
-        population.play_game(expected_interactions)
+        population.play_game(expected_interactions, batched = batched)
         
                
         assert population.popsize() == width * length * subpop_size
@@ -97,7 +100,7 @@ class TestPlayingGame:
         for i in range(width):
             for j in range(length):
                 for k in range(subpop_size):
-                    payoff_lengths.append(len(population[i][j][k].payoffs))
+                    payoff_lengths.append(population[i][j][k].play_count)
         mean_payoff_length = sum(payoff_lengths)/1000
         
         var_poisson = poisson.var(expected_interactions)
@@ -118,12 +121,41 @@ class TestPlayingGame:
                mean_payoff_length < \
                (expected_payoff_length + conf_99)
     
-    def test_data_collection(self):
+    @pytest.mark.parametrize("batched", [False, True])
+    def test_monomorphic_demes(self, batched):
+        population = Population(3, 3, 10, sequence = "*d:d/*:c/", batched_games = batched,
+                                monomorphic_games = True)
+        population[0][0][0].dna.sequence = "*:d/"
+        data = population.play_game(2)
+        
+        assert data['monomorphic_demes'] == 8
+        for agent in population[1][1]:
+            assert agent.fitness() == pytest.approx(7)
+        assert sum(agent.play_count for agent in population[1][1]) == \
+               sum(data['subpop_counts'][1][1].values())
+        assert len(set(agent.play_count for agent in population[1][1])) <= 2
+        
+    def test_monomorphic_generation(self):
+        population = Population(2, 2, 10, sequence = "*d:d/*:c/", monomorphic_games = True)
+        data = population.generation()
+        
+        assert data['monomorphic_demes'] == 4
+        assert population.popsize() == 40
+        
+    def test_monomorphic_games_off(self):
+        population = Population(2, 2, 10, sequence = "*d:d/*:c/")
+        data = population.play_game(2)
+        
+        assert data['monomorphic_demes'] == 0
+        assert population.play_game(2, monomorphic = True)['monomorphic_demes'] == 4
+        
+    @pytest.mark.parametrize("batched", [False, True])
+    def test_data_collection(self, batched):
         width = 2
         length = 2
         subpop_size = 10
         
-        population = Population(width, length, subpop_size)
+        population = Population(width, length, subpop_size, batched_games = batched)
         
         data = population.play_game()
         
@@ -133,6 +165,41 @@ class TestPlayingGame:
         assert data['pop_counts']['a'] >= 0
         assert data['pop_counts']['d'] > 0
                
+class TestMutation:
+    """ Tests the batched mutation kernel against mutating agents one at a time """
+    
+    def mutation_stats(self, batched):
+        population = Population(1, 1, 2000, sequence = "a"*100)
+        population.mutate(batched = batched)
+        
+        lengths = [len(agent.dna.sequence) for agent in population[0][0]]
+        changed = [agent.dna.sequence.count("a") != 100 or len(agent.dna.sequence) != 100
+                   for agent in population[0][0]]
+        others = [len(agent.dna.sequence) - agent.dna.sequence.count("a") 
+                  for agent in population[0][0]]
+        n = len(lengths)
+        return {
+            'length': sum(lengths)/n,
+            'changed': sum(changed)/n,
+            'others': sum(others)/n
+        }
+    
+    def test_batched_matches_per_agent(self):
+        batched = self.mutation_stats(True)
+        per_agent = self.mutation_stats(False)
+        
+        # Insertions and deletions have variance 2 with a mutation_length of 1,
+        # so the difference in mean length has a standard error of about 0.045
+        assert abs(batched['length'] - per_agent['length']) < 0.3
+        assert abs(batched['changed'] - per_agent['changed']) < 0.08
+        assert abs(batched['others'] - per_agent['others']) < 0.6
+        
+    def test_all_agents_mutated(self):
+        population = Population(3, 3, 10, sequence = "a"*100)
+        population.mutate()
+        sequences = [agent.dna.sequence for row in population for subpop in row for agent in subpop]
+        assert sum(1 for sequence in sequences if sequence != "a"*100) > 45
+        
 class TestReproduction:
     
     def test_fecundity_relative_fitness(self):
@@ -167,7 +234,7 @@ class TestReproduction:
             k = 1
             for agent in population[0][0]:
                 agent.dna.sequence = "a"*k
-                agent.payoffs = [k]
+                agent.add_payoffs([k])
                 k += 1
             
             population.reproduce()
@@ -200,7 +267,7 @@ class TestReproduction:
             k = 1
             for agent in population[0][0]:
                 agent.dna.sequence = "a"*k
-                agent.payoffs = [k]
+                agent.add_payoffs([k])
                 k += 1
             
             population.reproduce(fecundity = fecundity, relative_fitnesses = False)
@@ -223,6 +290,8 @@ class TestReproduction:
         population.play_game()
         data = population.reproduce()
         
+        assert isinstance(data, numpy.ndarray)
+        assert data.shape == (width, length)
         assert len(data) == width
         assert len(data[0]) == length
         assert data[0][0] >= 0
@@ -282,9 +351,24 @@ class TestMigration:
         assert expected_distance - conf_99 < mean_y < expected_distance + conf_99
         
                 
+    def test_emigrate(self):
+        """ Emigrating and immigrating the whole grid is migrating it """
+        populations = [Population(3, 2, 5, streams = DemeStreams(8)) for _ in range(2)]
+        for population in populations:
+            population.reproduce(fecundity = 2)
+            
+        populations[0].migrate(0.5, 1)
+        populations[1].immigrate(populations[1].emigrate(0.5, 1))
+        
+        for i in range(3):
+            for j in range(2):
+                assert [agent.dna.sequence for agent in populations[0][i][j]] == \
+                       [agent.dna.sequence for agent in populations[1][i][j]]
+        
 class TestCulling:
     
-    def test_cull(self):
+    @pytest.mark.parametrize("batched", [True, False])
+    def test_cull(self, batched):
         """ Tests that population size is reduced to correct level. """
         width = 2
         length = 2
@@ -296,7 +380,7 @@ class TestCulling:
             for j in range(length):
                 population[i][j] += [Agent() for _ in range(random.randint(0, 5))]
                 
-        population.cull()
+        population.cull(batched = batched)
         
         assert population.popsize() == width * length * popsize
         
@@ -325,6 +409,59 @@ class TestCensus:
         assert result['subpop_data'][0][0]['aaaa'] == 4
         assert result['pop_data']['aaaa'] == 10
         
+    def test_phenotype_census(self):
+        population = Population(2, 2, 4, sequence = "*c:c/")
+        population[0][0][0].dna.sequence = "d:/*c:c/"
+        population[0][0][1].dna.sequence = "*a:a/"
+        
+        result = population.census(phenotypes = True)
+        
+        assert result['subpop_data'][0][0] == {"*c:c/": 3, "*a:a/": 1}
+        assert result['pop_data'] == {"*c:c/": 15, "*a:a/": 1}
+        assert len(population.census()['pop_data']) == 3
+        
+    def test_monomorphic_phenotypes(self):
+        population = Population(1, 2, 6, sequence = "*c:c/", monomorphic_games = True)
+        population[0][0][0].dna.sequence = "d:/*c:c/"
+        population[0][1][0].dna.sequence = "*a:a/"
+        
+        assert population.play_game()['monomorphic_demes'] == 1
+        
+    @pytest.mark.parametrize("relative_fitnesses", [True, False])
+    @pytest.mark.parametrize("streams", [False, True])
+    def test_kept_up_to_date(self, relative_fitnesses, streams):
+        population = Population(3, 2, 5, streams = DemeStreams(3) if streams else None,
+                                check_census = True)
+        for _ in range(3):
+            population.generation(fecundity = 2, migration_distance = 1, 
+                                  migration_survival = 0.5, 
+                                  relative_fitnesses = relative_fitnesses)
+            
+            assert population.census() == population.recount()
+            assert population.census(phenotypes = True) == population.recount(phenotypes = True)
+            
+    def test_unbatched_phases(self):
+        population = Population(2, 2, 4, check_census = True)
+        population.reproduce(fecundity = 2)
+        population.cull(batched = False)
+        population.mutate(batched = False)
+        
+        assert population.census() == population.recount()
+        
+    def test_counts_every_agent(self):
+        population = Population(2, 2, 3, sequence = "*c:c/", check_census = True)
+        population.reproduce(fecundity = 2)
+        
+        assert population.census()['pop_data'] == {"*c:c/": population.popsize()}
+        assert population.popsize() > 12
+        
+    def test_drift(self):
+        population = Population(2, 2, 3, sequence = "*c:c/", check_census = True)
+        population[1][0][2] = Agent("*d:d/")
+        
+        with pytest.raises(RuntimeError):
+            population.census()
+        
         
 class TestGeneration:
     
@@ -340,6 +477,29 @@ class TestGeneration:
         
         assert population.popsize() == width * length * popsize
         
+    def test_migration_arguments(self):
+        """ Migration distances over 1 aren't taken for the survival probability """
+        population = Population(3, 3, 8)
+        population.generation(fecundity = 2, migration_distance = 2)
+        
+        assert population.popsize() == 72
+        
+        calls = []
+        population.migrate = lambda **arguments: calls.append(arguments)
+        population.generation(migration_distance = 3, migration_survival = 0.25)
+        
+        assert calls == [{'survival': 0.25, 'distance': 3}]
+        
+    def test_migrate_hook(self):
+        """ A migrate function replaces the population's own migration """
+        population = Population(2, 2, 4)
+        population.migrate = lambda **arguments: pytest.fail("migrated")
+        calls = []
+        population.generation(fecundity = 2, migrate = calls.append)
+        
+        assert calls == [population]
+        assert population.popsize() == 16
+        
     def test_payoffs_happened(self):
         """ 
         Accuracy is tested elsewhere so this is just spot check(s) to ensure 
@@ -360,7 +520,7 @@ class TestGeneration:
         for i in range(width):
             for j in range(length):
                 for k in range(popsize):
-                    payoff_lengths += len(population[i][j][k].payoffs)
+                    payoff_lengths += population[i][j][k].play_count
         
         assert payoff_lengths > 0
         
@@ -383,6 +543,16 @@ class TestGeneration:
         
 class TestReset:
     
+    def test_generation_resets(self):
+        """ Payoffs only come from the current generation's games """
+        population = Population(2, 2, 5)
+        for agent in population[0][0]:
+            agent.add_payoffs([10]*1000)
+            
+        population.generation(fecundity = 1)
+        
+        assert all(agent.play_count < 1000 for row in population for subpop in row for agent in subpop)
+    
     def test_agents_are_reset(self):        
         width = 2
         length = 2
@@ -398,7 +568,9 @@ class TestReset:
         for i in range(width):
             for j in range(length):
                 for k in range(popsize):
-                    payoff_lengths += len(population[i][j][k].payoffs)
+                    payoff_lengths += population[i][j][k].play_count
+        
+        assert payoff_lengths == 0
         
     
 
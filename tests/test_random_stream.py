@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.random_stream RandomStream` class."""
+
+import numpy
+import pytest
+
+from scipy.stats import poisson
+
+from coop_evolve.population import Population
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.random_stream import RandomStream
+
+
+class TestSeeding:
+    """ Tests streams are reproducible """
+    
+    def test_same_seed(self):
+        rng1 = RandomStream(123)
+        rng2 = RandomStream(123)
+        
+        draws1 = [rng1.random(), rng1.integers(0, 10), rng1.geometric(0.5), rng1.poisson(0.3)]
+        draws2 = [rng2.random(), rng2.integers(0, 10), rng2.geometric(0.5), rng2.poisson(0.3)]
+        
+        assert draws1 == draws2
+        
+    def test_origin(self):
+        """ A tile's streams are those of its place in the whole grid """
+        tile = DemeStreams(42, origin = (2, 1))
+        assert tile.stream(0, 1, 'play').random() == DemeStreams(42).stream(2, 2, 'play').random()
+        
+    def test_seed_recorded(self):
+        assert RandomStream(123).seed == 123
+        assert RandomStream().seed is not None
+        
+    def test_buffer_refills(self):
+        """ Draws carry on past the end of a buffer """
+        rng1 = RandomStream(5, buffer_size = 3)
+        rng2 = RandomStream(5, buffer_size = 3)
+        assert [rng1.random() for _ in range(10)] == [rng2.random() for _ in range(10)]
+        assert len(set(rng1.random() for _ in range(10))) == 10
+        
+    def test_reproducible_population(self):
+        """ A population run with the same seed gives the same result """
+        populations = []
+        for _ in range(2):
+            population = Population(2, 2, 5, rng = RandomStream(99))
+            population.generation()
+            populations.append(population)
+            
+        sequences = [
+            [agent.dna.sequence for row in population for subpop in row for agent in subpop]
+            for population in populations
+        ]
+        assert sequences[0] == sequences[1]
+        
+class TestDistributions:
+    """ Tests the single draws have the right distributions """
+    
+    def test_integers(self):
+        rng = RandomStream()
+        draws = [rng.integers(2, 5) for _ in range(10000)]
+        assert set(draws) == {2, 3, 4}
+        
+    def test_geometric_mean(self):
+        rng = RandomStream()
+        reps = 10000
+        draws = [rng.geometric(0.25) for _ in range(reps)]
+        
+        # mean 1/p, variance (1 - p)/p^2
+        conf_99 = (12/reps)**(1/2) * 4
+        assert 4 - conf_99 < sum(draws)/reps < 4 + conf_99
+        assert min(draws) == 1
+        
+    @pytest.mark.parametrize("lam", [0.01, 2.5, 50])
+    def test_poisson_mean(self, lam):
+        rng = RandomStream()
+        reps = 10000
+        draws = [rng.poisson(lam) for _ in range(reps)]
+        
+        conf_99 = (poisson.var(lam)/reps)**(1/2) * 4
+        assert lam - conf_99 < sum(draws)/reps < lam + conf_99
+        
+    def test_poisson_zero(self):
+        assert RandomStream().poisson(0) == 0
+        
+    def test_multivariate_hypergeometric(self):
+        draws = numpy.array([
+            RandomStream(seed).multivariate_hypergeometric([5, 0, 3], 4) for seed in range(200)])
+        
+        assert (draws.sum(axis = 1) == 4).all()
+        assert (draws[:, 1] == 0).all()
+        assert (draws[:, 0] <= 5).all() and (draws[:, 2] <= 3).all()
+        
+class TestDemeStreams:
+    """ Tests the per subpopulation streams """
+    
+    def test_independent_of_order(self):
+        """ A deme's stream doesn't depend on which streams were made first """
+        streams1 = DemeStreams(42)
+        streams2 = DemeStreams(42)
+        
+        streams2.stream(1, 0, 'play').random()
+        streams2.stream(0, 0, 'mutate').random()
+        
+        assert streams1.stream(0, 0, 'play').random() == streams2.stream(0, 0, 'play').random()
+        
+    def test_distinct_streams(self):
+        streams = DemeStreams(42)
+        draws = {
+            streams.stream(x, y, phase).random()
+            for x in range(3) for y in range(3) for phase in DemeStreams.phases
+        }
+        assert len(draws) == 9 * len(DemeStreams.phases)
+        
+    def test_origin(self):
+        """ A tile's streams are those of its place in the whole grid """
+        tile = DemeStreams(42, origin = (2, 1))
+        assert tile.stream(0, 1, 'play').random() == DemeStreams(42).stream(2, 2, 'play').random()
+        
+    def test_replace(self):
+        """ A stream advanced elsewhere carries on where it left off """
+        streams = DemeStreams(42)
+        elsewhere = DemeStreams(42)
+        advanced = elsewhere.stream(1, 1, 'mate')
+        advanced.random()
+        streams.replace(1, 1, 'mate', advanced)
+        
+        assert streams.stream(1, 1, 'mate').random() == DemeStreams(42).stream(1, 1, 'mate').random(2)[1]
+        
+    def test_next_generation(self):
+        """ Each generation has its own streams, derived again from the seed """
+        streams = DemeStreams(42)
+        first = streams.stream(0, 1, 'cull').random()
+        streams.next_generation()
+        
+        assert streams.streams == {}
+        second = streams.stream(0, 1, 'cull').random()
+        assert second != first
+        
+        replayed = DemeStreams(42)
+        replayed.next_generation()
+        assert replayed.stream(0, 1, 'cull').random() == second
+        
+    def test_only_current_generation_kept(self):
+        streams = DemeStreams(3)
+        population = Population(3, 2, 5, streams = streams)
+        for _ in range(4):
+            population.generation()
+            
+        assert streams.generation == 4
+        assert len(streams.streams) <= 3 * 2 * len(DemeStreams.phases)
+        
+    def test_seed_recorded(self):
+        assert DemeStreams(42).seed == 42
+        assert DemeStreams().seed is not None
+        
+    def test_seed_sequence(self):
+        """ A stream can be seeded with a SeedSequence """
+        seed = numpy.random.SeedSequence(7, spawn_key = (1,))
+        assert RandomStream(seed).random() == RandomStream(seed).random()
+        
+    def test_reproducible_population(self):
+        """ Populations with per deme streams replay from the root seed """
+        populations = []
+        for _ in range(2):
+            population = Population(3, 2, 5, streams = DemeStreams(99))
+            for _ in range(2):
+                population.generation()
+            populations.append(population)
+            
+        sequences = [
+            [agent.dna.sequence for row in population for subpop in row for agent in subpop]
+            for population in populations
+        ]
+        assert sequences[0] == sequences[1]
+        
+    def test_deme_independent_of_grid(self):
+        """ A subpopulation's draws are the same whatever the rest of the grid """
+        small = Population(1, 1, 6, streams = DemeStreams(5))
+        large = Population(3, 3, 6, streams = DemeStreams(5))
+        
+        assert [agent.dna.sequence for agent in small[0][0]] == \
+            [agent.dna.sequence for agent in large[0][0]]
+            
+        small.play_game()
+        small.mutate()
+        large.play_game()
+        large.mutate()
+        
+        assert [agent.dna.sequence for agent in small[0][0]] == \
+            [agent.dna.sequence for agent in large[0][0]]
+        
+class TestGroupRanks:
+    """ Tests ranking items within groups """
+    
+    def test_ranks(self):
+        ranks = RandomStream().group_ranks([3, 0, 1, 4])
+        
+        assert sorted(ranks[:3].tolist()) == [0, 1, 2]
+        assert ranks[3] == 0
+        assert sorted(ranks[4:].tolist()) == [0, 1, 2, 3]
+        
+    def test_uniform(self):
+        reps = 2000
+        ranks = RandomStream().group_ranks(numpy.full(reps, 4)).reshape(reps, 4)
+        
+        # Each item is first a quarter of the time
+        conf_99 = (0.25 * 0.75/reps)**(1/2) * 4
+        assert (abs((ranks == 0).mean(axis = 0) - 0.25) < conf_99).all()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.reproduction Reproduction` class."""
+
+import numpy
+import pytest
+
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.random_stream import RandomStream
+from coop_evolve.reproduction import Reproduction
+
+
+class TestRelative:
+    """ Tests offspring are drawn in proportion to relative fitness """
+    
+    def test_offspring_totals(self):
+        fitnesses = numpy.array([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0]])
+        counts, mean_fitnesses = Reproduction.relative(fitnesses, 2, RandomStream())
+        
+        assert counts.shape == (2, 3)
+        assert counts.sum(axis = 1).tolist() == [6, 6]
+        assert mean_fitnesses.tolist() == [2.0, 1/3]
+        
+    def test_proportions(self):
+        reps = 2000
+        fitnesses = numpy.tile([1.0, 2.0, 3.0, 4.0], (reps, 1))
+        counts, _ = Reproduction.relative(fitnesses, 1, RandomStream())
+        
+        # Each agent's count is binomial(4, p), p = fitness/10
+        for index, p in enumerate([0.1, 0.2, 0.3, 0.4]):
+            conf_99 = (4 * p * (1 - p)/reps)**(1/2) * 4
+            assert 4 * p - conf_99 < counts[:, index].mean() < 4 * p + conf_99
+            
+    def test_zero_fitness_uniform(self):
+        reps = 2000
+        counts, _ = Reproduction.relative(numpy.zeros((reps, 4)), 1, RandomStream())
+        
+        conf_99 = (4 * 0.25 * 0.75/reps)**(1/2) * 4
+        assert (abs(counts.mean(axis = 0) - 1) < conf_99).all()
+        
+    def test_deme_streams(self):
+        """ Each subpopulation draws from its own stream """
+        fitnesses = numpy.array([[1.0, 2.0], [3.0, 4.0]])
+        streams = DemeStreams(8)
+        rngs = [streams.stream(0, 0, 'reproduce'), streams.stream(0, 1, 'reproduce')]
+        counts, _ = Reproduction.relative(fitnesses, 3, rngs)
+        
+        other = DemeStreams(8).stream(0, 1, 'reproduce')
+        assert counts[1].tolist() == other.multinomial(6, [3/7, 4/7]).tolist()
+        
+class TestAbsolute:
+    """ Tests offspring are drawn by absolute fitness """
+    
+    def test_offspring_rate(self):
+        reps = 2000
+        fitnesses = numpy.tile([0.0, 2.5, 5.0, 10.0], reps)
+        sizes = numpy.full(reps, 4)
+        counts, mean_fitnesses = Reproduction.absolute(fitnesses, sizes, 20, 10, RandomStream())
+        
+        counts = counts.reshape(reps, 4)
+        assert counts[:, 0].sum() == 0
+        assert (counts[:, 3] == 20).all()
+        
+        # binomial(20, 0.25) has variance 3.75
+        conf_99 = (3.75/reps)**(1/2) * 4
+        assert 5 - conf_99 < counts[:, 1].mean() < 5 + conf_99
+        assert mean_fitnesses == pytest.approx(numpy.full(reps, 0.4375))
+        
+    def test_uneven_demes(self):
+        fitnesses = numpy.array([10.0, 10.0, 10.0, 0.0, 0.0, 10.0])
+        sizes = numpy.array([3, 0, 1, 2])
+        streams = DemeStreams(1)
+        rngs = [streams.stream(0, y, 'reproduce') for y in range(4)]
+        counts, mean_fitnesses = Reproduction.absolute(fitnesses, sizes, 2, 10, rngs)
+        
+        assert counts.tolist() == [2, 2, 2, 0, 0, 2]
+        assert mean_fitnesses.tolist() == [1, 0, 0, 0.5]
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.shared_arrays` module."""
+
+import multiprocessing
+
+import numpy
+
+from coop_evolve.shared_arrays import SharedArrays
+
+
+def double(handle):
+    shared = SharedArrays.attach(handle)
+    shared['values'] *= 2
+    shared.close()
+    
+
+class TestSharedArrays:
+    
+    def test_copies(self):
+        with SharedArrays({'values': numpy.arange(5)}) as shared:
+            assert shared['values'].tolist() == [0, 1, 2, 3, 4]
+            assert 'values' in shared
+            
+    def test_grows(self):
+        with SharedArrays({'values': numpy.arange(5)}) as shared:
+            name = shared.handle()['values'][0]
+            
+            # There's room for twice as many before the block moves.
+            shared['values'] = numpy.arange(10)
+            assert shared.handle()['values'][0] == name
+            
+            shared['values'] = numpy.arange(100)
+            assert shared.handle()['values'][0] != name
+            assert shared['values'].sum() == 4950
+            
+    def test_attach(self):
+        with SharedArrays({'values': numpy.arange(5)}) as shared:
+            attached = SharedArrays.attach(shared.handle())
+            attached['values'][0] = 10
+            attached.close()
+            
+            assert shared['values'][0] == 10
+            
+    def test_worker_process(self):
+        with SharedArrays({'values': numpy.arange(5)}) as shared:
+            worker = multiprocessing.Process(target = double, args = (shared.handle(),))
+            worker.start()
+            worker.join()
+            
+            assert shared['values'].tolist() == [0, 2, 4, 6, 8]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.simulation_config SimulationConfig` class."""
+
+import pickle
+import pytest
+
+from app_settings import AppSettings
+
+from coop_evolve.agent import Agent
+from coop_evolve.population import Population
+from coop_evolve.simulation_config import SimulationConfig
+
+
+class TestSimulationConfigCreation:
+    """ Tests the config is built correctly from settings """
+    
+    def test_from_settings(self):
+        cfg = AppSettings()
+        config = SimulationConfig.from_settings()
+        
+        assert config.behaviors == cfg.behaviors
+        assert config.default_behavior == cfg.behaviors[-1]
+        assert config.nucleotides == "abcd/:*+?"
+        assert config.mutation_rate == cfg.mutation_rate
+        assert config.max_payoff == max(cfg.payoffs.values())
+        assert config.mean_payoff == sum(cfg.payoffs.values())/len(cfg.payoffs)
+        
+    def test_geometric_p(self):
+        cfg = AppSettings()
+        config = SimulationConfig.from_settings()
+        
+        assert config.chromosome_p == cfg.chromosome_length/(1 + cfg.chromosome_length)
+        assert config.mutation_p == cfg.mutation_length/(1 + cfg.mutation_length)
+        assert config.interaction_p == cfg.interaction_length/(1 + cfg.interaction_length)
+        
+    def test_payoff_table(self):
+        config = SimulationConfig.from_settings()
+        index = config.behavior_index
+        
+        assert config.payoff_table[index['c']][index['d']] == 10
+        assert config.payoff_table[index['d']][index['d']] == 3
+        assert config.payoff_table[index['a']][index['a']] == 0
+        
+    def test_default_built_once(self):
+        assert SimulationConfig.default() is SimulationConfig.default()
+        
+class TestSimulationConfigFrozen:
+    """ Tests the config can't be changed """
+    
+    def test_set_attribute(self):
+        config = SimulationConfig.from_settings()
+        with pytest.raises(AttributeError):
+            config.mutation_rate = 0.5
+            
+    def test_new_attribute(self):
+        config = SimulationConfig.from_settings()
+        with pytest.raises(AttributeError):
+            config.foo = 1
+            
+    def test_pickle(self):
+        config = SimulationConfig.from_settings()
+        copy = pickle.loads(pickle.dumps(config))
+        assert copy.payoff_table == config.payoff_table
+        assert copy.nucleotides == config.nucleotides
+        
+class TestSimulationConfigThreading:
+    """ Tests the config is passed down to agents and chromosomes """
+    
+    def test_population(self):
+        config = SimulationConfig.from_settings()
+        population = Population(2, 2, 2, config = config)
+        assert population[1][1][1].config is config
+        assert population[1][1][1].dna.config is config
+        
+    def test_payoffs(self):
+        cfg = AppSettings()
+        payoffs = dict(cfg.payoffs)
+        payoffs['aa'] = 20
+        config = SimulationConfig(
+            behaviors = cfg.behaviors,
+            gene_delimiter = cfg.gene_delimiter,
+            receptor_delimiter = cfg.receptor_delimiter,
+            wildcards = cfg.wildcards,
+            chromosome_length = cfg.chromosome_length,
+            mutation_length = cfg.mutation_length,
+            interaction_length = cfg.interaction_length,
+            mutation_rate = cfg.mutation_rate,
+            crossover_rate = cfg.crossover_rate,
+            mating_rate = cfg.mating_rate,
+            payoffs = payoffs,
+            strategy_cache_size = cfg.strategy_cache_size,
+            interaction_cache_size = cfg.interaction_cache_size
+        )
+        
+        assert Agent.payoff("aa", config) == 20
+        assert Agent("", config).fitness() == sum(payoffs.values())/len(payoffs)
@@ -45,6 +45,135 @@ class TestSimulationRunCreation:
         assert len(simulation.population[0]) == length
         assert len(simulation.population[0][0]) == subpop_size
         
+    def test_seed(self):
+        """ Runs with the same seed start from the same population """
+        run1 = SimulationRun(width = 2, length = 2, subpop_size = 3, seed = 2020)
+        run2 = SimulationRun(width = 2, length = 2, subpop_size = 3, seed = 2020)
+        
+        assert run1.seed == 2020
+        assert run1.population.streams is run1.streams
+        assert run1.population[1][1][2].dna.sequence == run2.population[1][1][2].dna.sequence
+        
+    def test_array_storage(self):
+        run1 = SimulationRun(width = 2, length = 2, subpop_size = 3, seed = 2020)
+        run2 = SimulationRun(width = 2, length = 2, subpop_size = 3, seed = 2020, 
+                             storage = 'arrays')
+        
+        assert len(run2.population[1][1]) == 3
+        assert run1.population.census() == run2.population.census()
+        
+    def test_batched_games(self):
+        run = SimulationRun(width = 2, length = 2, subpop_size = 3, batched_games = True)
+        
+        assert run.population.batched_games
+        
+    def test_monomorphic_games(self):
+        run = SimulationRun(width = 2, length = 2, subpop_size = 3, monomorphic_games = True)
+        
+        assert run.population.monomorphic_games
+        assert run.monomorphic_demes == []
+        
+    def test_monomorphic_games_off_by_default(self):
+        run = SimulationRun(width = 2, length = 2, subpop_size = 3)
+        
+        assert not run.population.monomorphic_games
+        
+    def test_monomorphic_games_frequencies(self):
+        with pytest.raises(ValueError):
+            SimulationRun(width = 2, length = 2, subpop_size = 3, storage = 'frequencies',
+                          monomorphic_games = True)
+        
+    def test_frequency_storage(self):
+        run = SimulationRun(width = 2, length = 2, subpop_size = 3, seed = 2020, 
+                            storage = 'frequencies')
+        
+        assert run.population.popsize() == 12
+        with pytest.raises(ValueError):
+            SimulationRun(width = 2, length = 2, subpop_size = 3, storage = 'frequencies',
+                          batched_games = True)
+        
+    def test_tiles(self):
+        run1 = SimulationRun(width = 4, length = 2, subpop_size = 3, seed = 2020, 
+                             storage = 'arrays')
+        run2 = SimulationRun(width = 4, length = 2, subpop_size = 3, seed = 2020, 
+                             storage = 'arrays', tiles = (2, 1))
+        
+        assert run1.population.census() == run2.population.census()
+        run2.population.close()
+        with pytest.raises(ValueError):
+            SimulationRun(width = 2, length = 2, subpop_size = 3, storage = 'frequencies',
+                          tiles = (2, 1))
+        
+    def test_nodes(self):
+        run1 = SimulationRun(width = 4, length = 2, subpop_size = 3, seed = 2020, 
+                             storage = 'arrays')
+        run2 = SimulationRun(width = 4, length = 2, subpop_size = 3, seed = 2020, 
+                             storage = 'arrays', tiles = (2, 1), nodes = 'local')
+        
+        assert run1.population.census() == run2.population.census()
+        run2.population.close()
+        with pytest.raises(ValueError):
+            SimulationRun(width = 2, length = 2, subpop_size = 3, nodes = 'local')
+        
+    def test_workers(self):
+        run = SimulationRun(width = 2, length = 2, subpop_size = 3, storage = 'arrays', 
+                            workers = 2)
+        
+        assert run.population.scheduler.workers == 2
+        with pytest.raises(ValueError):
+            SimulationRun(width = 2, length = 2, subpop_size = 3, workers = 2)
+        
+    def test_run_closes_shared_memory(self, monkeypatch):
+        run = SimulationRun(width = 2, length = 2, subpop_size = 3, storage = 'arrays')
+        run.population.share()
+        
+        def refuse(*args, **kwargs):
+            raise psycopg2.OperationalError("no database")
+        monkeypatch.setattr(psycopg2, 'connect', refuse)
+        with pytest.raises(psycopg2.OperationalError):
+            run.run(1)
+            
+        assert run.population.shared is None
+        
+    def test_run_closes_scheduler(self, monkeypatch):
+        run = SimulationRun(width = 2, length = 2, subpop_size = 3, storage = 'arrays',
+                            workers = 2)
+        run.population.mutate()
+        processes = list(run.scheduler.processes)
+        
+        def refuse(*args, **kwargs):
+            raise psycopg2.OperationalError("no database")
+        monkeypatch.setattr(psycopg2, 'connect', refuse)
+        with pytest.raises(psycopg2.OperationalError):
+            run.run(1)
+            
+        assert len(processes) == 2
+        assert not any(process.is_alive() for process in processes)
+        assert run.scheduler.queue is None
+        assert run.population.shared is None
+        
+    @pytest.mark.parametrize("nodes", [None, 'local'])
+    def test_run_closes_tiles(self, monkeypatch, nodes):
+        run = SimulationRun(width = 4, length = 2, subpop_size = 3, storage = 'arrays',
+                            tiles = (2, 1), nodes = nodes)
+        workers = list(run.population.workers)
+        
+        def refuse(*args, **kwargs):
+            raise psycopg2.OperationalError("no database")
+        monkeypatch.setattr(psycopg2, 'connect', refuse)
+        with pytest.raises(psycopg2.OperationalError):
+            run.run(1)
+            
+        assert run.population.workers == []
+        if nodes is None:
+            assert not any(worker.is_alive() for worker in workers)
+        else:
+            assert all(node.poll() is not None for node in workers)
+            
+    def test_unknown_storage(self):
+        with pytest.raises(ValueError):
+            SimulationRun(width = 2, length = 2, subpop_size = 3, storage = 'tables')
+        
 class TestSimulationRun:
 
 #     def test_stable_population_size(self):
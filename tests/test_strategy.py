@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.strategy` module."""
+
+import copy
+import pytest
+import random
+import re
+
+from app_settings import AppSettings
+
+from coop_evolve.chromosome import Chromosome
+from coop_evolve.simulation_config import SimulationConfig
+from coop_evolve.strategy import ReceptorTrie
+from coop_evolve.strategy import Strategy
+from coop_evolve.strategy import StrategyCache
+
+
+class TestStrategy:
+    """ Tests compiled strategies """
+    
+    def test_genes(self):
+        """ Tests the chromosome is parsed into (receptor, effector) pairs """
+        strategy = Strategy("*c:c/*d:+?d/aac*:*a/")
+        assert strategy.genes == [('*c', 'c'), ('*d', 'd'), ('aac*', 'a')]
+        
+    def test_response(self):
+        """ Tests the first matching receptor determines the response """
+        strategy = Strategy("*c:c/*d:+?d/aac*:*a/")
+        
+        assert strategy.response("aabc") == "c"
+        assert strategy.response("aabd") == "d"
+        assert strategy.response("aacb") == "a"
+        assert strategy.response("bbbb") == Chromosome.default_behavior()
+        
+    def test_deepcopy_shares_strategy(self):
+        strategy = Strategy("*c:c/")
+        assert copy.deepcopy(strategy) is strategy
+        
+    def test_incremental_response(self):
+        """ Advancing one move at a time gives the same response as the whole history """
+        strategy = Strategy("*c:c/*d:+?d/aac*:*a/")
+        
+        history = ""
+        state = strategy.start
+        for move in "aacbdcabd":
+            history += move
+            state = strategy.advance(state, move)
+            assert strategy.output(state) == strategy.response(history)
+            
+    def test_states_are_reused(self):
+        strategy = Strategy("*d:d/*:c/")
+        strategy.response("dddd")
+        strategy.response("dddd")
+        assert len(strategy.states) <= 3
+        
+class TestPhenotype:
+    """ Tests sequences are reduced to the genes that can respond """
+    
+    @pytest.mark.parametrize("sequence,phenotype", [
+        ("*c:c/", "*c:c/"),
+        ("d:/*c:c/ab", "*c:c/"),
+        ("*c:+?c:/", "*c:c/"),
+        ("*a:a/*a:b/", "*a:a/"),
+        ("a?*+?b:c/", "a+*b:c/"),
+        ("a++?b:c/a+?+b:a/", "a++?b:c/"),
+        ("?*:c/a:a/", "*:c/"),
+        ("c:d/a:b/b:d/", "c:d/a:b/"),
+        ("*:d/a:a/", ""),
+        ("", "")
+    ])
+    def test_phenotype(self, sequence, phenotype):
+        assert Strategy.phenotype(sequence) == phenotype
+        
+    def test_same_responses(self):
+        for _ in range(200):
+            dna = Chromosome(
+                "".join(random.choice(Chromosome.nucleotides()) for _ in range(40)))
+            phenotype = Strategy.phenotype(dna.sequence)
+            
+            assert Strategy.phenotype(phenotype) == phenotype
+            
+            strategy = Strategy(dna.sequence)
+            canonical = Strategy(phenotype)
+            for _ in range(10):
+                history = "".join(random.choice("abcd") for _ in range(random.randint(0, 6)))
+                assert canonical.response(history) == strategy.response(history)
+                
+    def test_cached_by_phenotype(self):
+        cache = StrategyCache(maxsize = 10)
+        
+        first = cache.get("*c:c/")
+        second = cache.get("/*c:c/*c:a/")
+        
+        assert first is second
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['size'] == 1
+        
+class TestReceptorTrie:
+    """ Tests receptor tries match the same histories as the receptor regular expressions """
+    
+    def test_matches_regex(self):
+        wildcards = re.compile("([?*+])")
+        for _ in range(200):
+            receptors = [
+                "".join(random.choice("abcd?*+") for _ in range(random.randint(1, 4)))
+                for _ in range(random.randint(1, 8))
+            ]
+            regexes = ["^" + re.sub(wildcards, r"[abcd]\g<1>", r) + "$" for r in receptors]
+            trie = ReceptorTrie(receptors)
+            
+            history = ""
+            nodes = trie.start
+            for _ in range(8):
+                expected = None
+                for gene, regex in enumerate(regexes):
+                    if re.match(regex, history) is not None:
+                        expected = gene
+                        break
+                assert trie.match(nodes) == expected
+                
+                move = random.choice("abcd")
+                history += move
+                nodes = trie.advance(nodes, move)
+                
+    def test_shared_prefixes(self):
+        """ Receptors with a common prefix share nodes """
+        trie = ReceptorTrie(["aab", "aac", "aa*"])
+        assert len(trie.children) == 6
+        
+    def test_first_gene_wins(self):
+        trie = ReceptorTrie(["*d", "b*", "*d"])
+        nodes = trie.advance(trie.advance(trie.start, "b"), "d")
+        assert trie.match(nodes) == 0
+        
+class TestStrategyCache:
+    """ Tests the LRU strategy cache """
+    
+    def test_hits_and_misses(self):
+        cache = StrategyCache(maxsize = 10)
+        
+        first = cache.get("*c:c/")
+        second = cache.get("*c:c/")
+        cache.get("*d:d/")
+        
+        assert first is second
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 2
+        assert cache.stats()['size'] == 2
+        
+    def test_evictions(self):
+        cache = StrategyCache(maxsize = 2)
+        
+        cache.get("a:a/")
+        cache.get("b:b/")
+        cache.get("a:a/")
+        cache.get("c:c/")
+        
+        assert cache.evictions == 1
+        assert len(cache) == 2
+        # b was the least recently used
+        config = SimulationConfig.default()
+        assert ("b:b/", config) not in cache.strategies
+        assert ("a:a/", config) in cache.strategies
+        
+    def test_config_default_behavior(self):
+        """ Strategies answer with their own config's default behavior """
+        cfg = AppSettings()
+        config = SimulationConfig(
+            behaviors = cfg.behaviors[::-1],
+            gene_delimiter = cfg.gene_delimiter,
+            receptor_delimiter = cfg.receptor_delimiter,
+            wildcards = cfg.wildcards,
+            chromosome_length = cfg.chromosome_length,
+            mutation_length = cfg.mutation_length,
+            interaction_length = cfg.interaction_length,
+            mutation_rate = cfg.mutation_rate,
+            crossover_rate = cfg.crossover_rate,
+            mating_rate = cfg.mating_rate,
+            payoffs = cfg.payoffs,
+            strategy_cache_size = cfg.strategy_cache_size,
+            interaction_cache_size = cfg.interaction_cache_size
+        )
+        cache = StrategyCache(maxsize = 10)
+        sequence = f"b:{config.default_behavior}/"
+        
+        strategy = cache.get(sequence, config)
+        default = cache.get(sequence)
+        
+        assert strategy.sequence == ""
+        assert strategy.response("b") == strategy.response("c") == config.default_behavior
+        assert default.response("c") == SimulationConfig.default().default_behavior
+        assert default.response("c") != config.default_behavior
+        assert Chromosome(sequence, config).strategy().response("c") == config.default_behavior
+        
+    def test_default_size(self):
+        cfg = AppSettings()
+        assert StrategyCache().maxsize == cfg.strategy_cache_size
+        
+    def test_clear(self):
+        cache = StrategyCache(maxsize = 2)
+        cache.get("a:a/")
+        cache.clear()
+        assert cache.stats() == {
+            'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 2
+        }
+        
+class TestChromosomeStrategy:
+    """ Tests chromosomes keep their compiled strategy in step with their sequence """
+    
+    def test_shared_between_chromosomes(self):
+        dna1 = Chromosome("*c:c/")
+        dna2 = Chromosome("*c:c/")
+        assert dna1.strategy() is dna2.strategy()
+        
+    def test_invalidated_on_assignment(self):
+        dna = Chromosome("*c:c/")
+        dna.strategy()
+        dna.sequence = "*d:a/"
+        assert dna.strategy().genes == [('*d', 'a')]
+        
+    def test_invalidated_on_crossover(self):
+        dna1 = Chromosome("*a:a/" * 20)
+        dna2 = Chromosome("*b:b/" * 20)
+        dna1.strategy()
+        dna2.strategy()
+        
+        while dna1.sequence == "*a:a/" * 20:
+            Chromosome.crossover(dna1, dna2)
+            
+        assert dna1.strategy().sequence == dna1.phenotype()
+        assert dna2.strategy().sequence == dna2.phenotype()
+        
+    def test_shared_between_phenotypes(self):
+        dna1 = Chromosome("*c:c/")
+        dna2 = Chromosome("d:/*c:?c/b:d/")
+        assert dna1.phenotype() == dna2.phenotype()
+        assert dna1.strategy() is dna2.strategy()
+        
+    def test_phenotype_follows_sequence(self):
+        dna = Chromosome("*c:c/")
+        copy = dna.copy()
+        assert copy.phenotype() == "*c:c/"
+        
+        dna.sequence = "*d:a/"
+        assert dna.phenotype() == "*d:a/"
+        assert copy.phenotype() == "*c:c/"
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `coop_evolve.tiled_population` module."""
+
+import pytest
+
+from coop_evolve.array_population import ArrayPopulation
+from coop_evolve.population import Population
+from coop_evolve.random_stream import DemeStreams
+from coop_evolve.tiled_population import TiledPopulation
+
+
+class TestCreation:
+    
+    def test_tiles(self):
+        with TiledPopulation(5, 4, 3, tiles = (2, 3)) as population:
+            assert population.bounds == [
+                (0, 2, 0, 1), (0, 2, 1, 2), (0, 2, 2, 4),
+                (2, 5, 0, 1), (2, 5, 1, 2), (2, 5, 2, 4)
+            ]
+            assert population.owners[4][3] == 5
+            assert population.popsize() == 60
+            
+    def test_too_many_tiles(self):
+        with pytest.raises(ValueError):
+            TiledPopulation(2, 2, 3, tiles = (3, 1))
+            
+    def test_sequence(self):
+        with TiledPopulation(2, 2, 3, sequence = "abcd", tiles = (2, 1)) as population:
+            assert population.census()['pop_data'] == {"abcd": 12}
+            assert population.census()['subpop_data'][1][1] == {"abcd": 3}
+            
+            
+class TestMatchesSerial:
+    """ Tests that split into tiles the grid gives the same results as in one piece """
+    
+    @pytest.mark.parametrize("storage", [Population, ArrayPopulation])
+    @pytest.mark.parametrize("tiles", [(1, 1), (2, 3), (4, 1)])
+    def test_generations(self, storage, tiles):
+        serial = storage(4, 3, 6, streams = DemeStreams(5))
+        with TiledPopulation(4, 3, 6, streams = DemeStreams(5), tiles = tiles,
+                             storage = storage) as tiled:
+            assert tiled.census() == serial.census()
+            for _ in range(3):
+                data = [
+                    population.generation(fecundity = 2, migration_distance = 1,
+                                          migration_survival = 0.5)
+                    for population in [serial, tiled]
+                ]
+                
+                assert data[0]['behavior_data'] == data[1]['behavior_data']
+                assert (data[0]['fitness_data'] == data[1]['fitness_data']).all()
+                assert tiled.census() == serial.census()
+                
+    def test_absolute_fitness(self):
+        serial = ArrayPopulation(3, 3, 6, streams = DemeStreams(6))
+        with TiledPopulation(3, 3, 6, streams = DemeStreams(6), tiles = (3, 3)) as tiled:
+            for _ in range(3):
+                serial.generation(relative_fitnesses = False, fecundity = 2)
+                tiled.generation(relative_fitnesses = False, fecundity = 2)
+                
+            assert tiled.popsize() == serial.popsize()
+            assert tiled.census(phenotypes = True) == serial.census(phenotypes = True)
+            
+            
+class TestTileTimes:
+    
+    def test_tile_times(self):
+        with TiledPopulation(4, 4, 4, tiles = (2, 2)) as population:
+            data = population.generation()
+            
+            assert data['tile_times'].shape == (2, 2)
+            assert (data['tile_times'] > 0).all()
+            assert (data['tile_waits'] >= 0).all()
+            
+    def test_closed(self):
+        population = TiledPopulation(2, 2, 2, tiles = (2, 1))
+        workers = population.workers
+        population.close()
+        
+        assert not any(worker.is_alive() for worker in workers)